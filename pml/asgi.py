@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pml.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up by get_asgi_application()
+from pml_app.websocket import events_websocket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Django only handles HTTP; the change feed's WebSocket endpoint is served directly
+    if scope['type'] == 'websocket':
+        await events_websocket(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'pml_app.middleware.RequestLogMiddleware',
+    'pml_app.middleware.CompressionMiddleware',
+    'pml_app.middleware.RequestTimingMiddleware',
+    'pml_app.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -90,6 +96,118 @@ DATABASES = {
     }
 }
 
+# Read replicas: PML_DB_REPLICA_HOSTS="db-replica-1,db-replica-2" adds one alias per
+# host with the primary's credentials. GET/HEAD requests read from a randomly chosen
+# replica; see pml_app/routers.py. pml/settings_replica.py is a local two-file
+# SQLite stand-in.
+for index, host in enumerate(filter(None, os.environ.get('PML_DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+PML_DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['pml_app.routers.ReplicaRouter']
+
+# How far replicas may lag behind the primary: a client that writes reads from the
+# primary for this many seconds, and responses read from a replica get no ETag
+# until the writes they depend on are this old
+PML_READ_YOUR_WRITES_SECONDS = 5
+
+
+# Cache
+# Local memory is per-process; point this at a shared backend (e.g. Redis or
+# Memcached) when running several workers so signal invalidation reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'detail': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pml-detail',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Cache alias holding detail endpoint responses (see pml_app/detail_cache.py), or None
+# to turn the cache off. Any backend works, e.g. FileBasedCache for a single host or
+# the shared backend; writes delete entries synchronously, and the timeout (seconds)
+# only bounds how long unread entries linger.
+PML_DETAIL_CACHE = 'detail'
+PML_DETAIL_CACHE_TIMEOUT = 60 * 60
+
+# Safety-net expiry (seconds) for the cached admin dashboard statistics
+PML_ADMIN_STATS_TIMEOUT = 300
+
+# Number of primary keys each process reserves at a time for manually
+# numbered tables (admins, managers, team members, projects, help)
+PML_ID_BLOCK_SIZE = 20
+
+# Rows fetched and serialized per chunk by list endpoints called with ?stream=1
+PML_STREAM_CHUNK_SIZE = 500
+
+# Per-request Server-Timing headers and slow-request logging (off by default).
+# A request is logged when it takes at least PML_SLOW_REQUEST_MS milliseconds or
+# runs at least PML_SLOW_REQUEST_QUERIES queries; None disables that threshold.
+PML_REQUEST_TIMING = os.environ.get('PML_REQUEST_TIMING') == '1'
+PML_SLOW_REQUEST_MS = 500
+PML_SLOW_REQUEST_QUERIES = 50
+
+# Log levels per logger. pml.requests logs every request with its ID and duration at
+# INFO and server errors at ERROR. Application modules log under their module path
+# (pml_app.views, pml_app.api_views, ...), so any of them can be set on its own.
+# PML_LOG_LEVELS="pml_app.views=DEBUG,pml.requests=INFO" overrides entries at runtime.
+PML_LOG_LEVELS = {
+    'pml_app': 'INFO',
+    'pml.requests': 'WARNING',
+    'pml.slow_requests': 'WARNING',
+}
+PML_LOG_LEVELS.update(
+    item.strip().split('=', 1) for item in os.environ.get('PML_LOG_LEVELS', '').split(',') if '=' in item
+)
+
+# `manage.py test` discards console records so test output stays readable;
+# tests that check log records attach their own handler
+TESTING = sys.argv[1:2] == ['test']
+
+# Records are formatted as JSON and written from background threads (see pml_app/log.py)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {'()': 'pml_app.log.RequestContextFilter'},
+    },
+    'formatters': {
+        'json': {'()': 'pml_app.log.JsonFormatter'},
+    },
+    'handlers': {
+        'console': {
+            '()': 'pml_app.log.BackgroundHandler',
+            'handler_class': 'logging.NullHandler' if TESTING else 'logging.StreamHandler',
+            'formatter': 'json',
+            'filters': ['request_context'],
+        },
+        'slow_requests': {
+            '()': 'pml_app.log.BackgroundHandler',
+            'handler_class': 'logging.handlers.RotatingFileHandler',
+            'handler_options': {
+                'filename': BASE_DIR / 'slow_requests.log',
+                'maxBytes': 5 * 1024 * 1024,
+                'backupCount': 3,
+                'delay': True,
+            },
+            'formatter': 'json',
+            'filters': ['request_context'],
+        },
+    },
+    'loggers': {
+        name: {
+            'handlers': ['slow_requests'] if name == 'pml.slow_requests' else ['console'],
+            'level': level.upper(),
+            'propagate': False,
+        }
+        for name, level in PML_LOG_LEVELS.items()
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,11 +257,59 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    # MessagePack bodies are offered when the optional msgpack package is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        *(['pml_app.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        *(['pml_app.renderers.MessagePackParser'] if find_spec('msgpack') else []),
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'pml_app.tokens.TokenSessionAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ]
 }
 
+# GET/HEAD responses of at least this many bytes are compressed, with brotli when the
+# client accepts it and the brotli package is installed, otherwise with gzip.
+# Quality 5 keeps brotli about as fast as gzip level 6 while producing smaller bodies.
+PML_COMPRESSION_MIN_BYTES = 1024
+PML_BROTLI_QUALITY = 5
+
+# /api/sync/ (see pml_app/sync.py): each new sync token starts this many seconds in
+# the past, to cover writes still in flight and replica lag (keep it above
+# PML_READ_YOUR_WRITES_SECONDS); tombstones of deleted rows are kept this many days,
+# and older tokens are answered with 410 Gone. manage.py pml_prune_tombstones
+# deletes expired tombstones.
+PML_SYNC_OVERLAP_SECONDS = 10
+PML_SYNC_TOMBSTONE_DAYS = 30
+
+# Change feed (see pml_app/events.py). InProcessBroker only reaches streams served by
+# the worker that made the write; with several workers use pml_app.events.CacheBroker
+# with PML_EVENT_CACHE pointing at a shared cache that increments atomically (Redis,
+# Memcached), whose streams poll it every PML_EVENT_POLL_SECONDS and can replay events
+# for PML_EVENT_RETENTION_SECONDS. Reconnecting clients can be replayed up to
+# PML_EVENT_BACKLOG missed events; streams send a keep-alive comment when idle.
+PML_EVENT_BROKER = 'pml_app.events.InProcessBroker'
+PML_EVENT_CACHE = 'default'
+PML_EVENT_POLL_SECONDS = 0.5
+PML_EVENT_RETENTION_SECONDS = 5 * 60
+PML_EVENT_BACKLOG = 1000
+PML_EVENT_HEARTBEAT_SECONDS = 15
+
+# Login tokens: lifetime in seconds, and how many resolved principals each process caches
+PML_TOKEN_MAX_AGE = 60 * 60 * 12
+PML_PRINCIPAL_CACHE_SIZE = 1024
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, restrict in production
 CORS_ALLOWED_ORIGINS = [
@@ -0,0 +1,26 @@
+"""Local primary/replica profile: two SQLite files stand in for MySQL and a replica.
+
+    export DJANGO_SETTINGS_MODULE=pml.settings_replica
+    python manage.py migrate
+    python manage.py pml_sync_replica --interval 2
+
+pml_sync_replica copies the primary into the replica file, once or every
+--interval seconds, which gives the replica a real, visible lag.
+
+The test suite runs under this profile too (python manage.py test pml_app);
+the replica is a TEST MIRROR there, and its reads go to the primary.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'primary.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+PML_DATABASE_REPLICAS = ['replica']
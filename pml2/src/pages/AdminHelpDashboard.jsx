@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from "react";
 import Header from "../components/Header";
 import Footer from "../components/Footer";
-import { getAllSupportRequests, updateSupportRequest } from "../services/supportService";
+import { getSupportRequestFeed, searchSupportRequests, updateSupportRequest } from "../services/supportService";
 
 function AdminHelpDashboard() {
   // State for support requests
@@ -10,18 +10,21 @@ function AdminHelpDashboard() {
   const [error, setError] = useState(null);
   const [selectedRequest, setSelectedRequest] = useState(null);
   const [responseText, setResponseText] = useState("");
+  const [searchQuery, setSearchQuery] = useState("");
+  const [nextPage, setNextPage] = useState(null);
   
   // Fetch support requests on component mount
   useEffect(() => {
     fetchSupportRequests();
   }, []);
   
-  // Function to fetch support requests
+  // Function to fetch the newest support requests; older ones load on demand
   const fetchSupportRequests = async () => {
     try {
       setLoading(true);
-      const data = await getAllSupportRequests();
+      const { results: data, next } = await getSupportRequestFeed();
       setSupportRequests(data);
+      setNextPage(next);
       
       // Select the first request by default if available
       if (data.length > 0 && !selectedRequest) {
@@ -35,6 +38,40 @@ function AdminHelpDashboard() {
     }
   };
   
+  // Append the next page of older requests
+  const loadMoreRequests = async () => {
+    try {
+      const { results, next } = await getSupportRequestFeed({ next: nextPage });
+      setSupportRequests(prevRequests => [...prevRequests, ...results]);
+      setNextPage(next);
+    } catch (err) {
+      console.error("Error loading more requests:", err);
+      alert("Failed to load more requests. Please try again.");
+    }
+  };
+  
+  // Search on the server instead of filtering the full list in the browser
+  const handleSearch = async (event) => {
+    event.preventDefault();
+    if (!searchQuery.trim()) {
+      fetchSupportRequests();
+      return;
+    }
+    
+    try {
+      setLoading(true);
+      const { results } = await searchSupportRequests(searchQuery.trim());
+      setSupportRequests(results);
+      setNextPage(null);
+      setSelectedRequest(results.length > 0 ? results[0] : null);
+    } catch (err) {
+      setError("Failed to search support requests");
+      console.error(err);
+    } finally {
+      setLoading(false);
+    }
+  };
+  
   // Function to update request status
   const updateStatus = async (id, newStatus) => {
     try {
@@ -119,6 +156,29 @@ function AdminHelpDashboard() {
               borderBottom: '2px solid #e2e8f0'
             }}>Support Requests Dashboard</h2>
             
+            <form onSubmit={handleSearch} style={{display: 'flex', gap: '10px', marginBottom: '20px'}}>
+              <input
+                type="search"
+                value={searchQuery}
+                onChange={(e) => setSearchQuery(e.target.value)}
+                placeholder="Search by subject, description, name or email"
+                style={{
+                  flex: 1,
+                  padding: '10px 12px',
+                  border: '1px solid #cbd5e1',
+                  borderRadius: '6px'
+                }}
+              />
+              <button type="submit" style={{
+                padding: '10px 18px',
+                backgroundColor: '#3b82f6',
+                color: 'white',
+                border: 'none',
+                borderRadius: '6px',
+                cursor: 'pointer'
+              }}>Search</button>
+            </form>
+            
             {loading ? (
               <div style={{textAlign: 'center', padding: '40px'}}>
                 <p>Loading support requests...</p>
@@ -269,6 +329,18 @@ function AdminHelpDashboard() {
                     ))}
                   </tbody>
                 </table>
+                {nextPage && (
+                  <div style={{textAlign: 'center', marginTop: '20px'}}>
+                    <button onClick={loadMoreRequests} style={{
+                      padding: '10px 18px',
+                      backgroundColor: '#f1f5f9',
+                      color: '#1e293b',
+                      border: '1px solid #cbd5e1',
+                      borderRadius: '6px',
+                      cursor: 'pointer'
+                    }}>Load older requests</button>
+                  </div>
+                )}
               </div>
             )}
           </div>
@@ -26,6 +26,7 @@ function ManagerDashboard() {
     task_name: "",
     manager_id: "",
     team_member_id: "",
+    project_id: "",
     priority: "medium"
   });
   const [formData, setFormData] = useState({
@@ -231,6 +232,7 @@ function ManagerDashboard() {
         task_name: taskFormData.task_name,
         manager_id: parseInt(taskFormData.manager_id),
         team_member_id: parseInt(taskFormData.team_member_id),
+        project_id: taskFormData.project_id ? parseInt(taskFormData.project_id) : null,
         priority: taskFormData.priority
       };
 
@@ -246,6 +248,7 @@ function ManagerDashboard() {
         task_name: "",
         manager_id: loggedInManagerId || "",
         team_member_id: "",
+        project_id: "",
         priority: "medium"
       });
       
@@ -292,11 +295,22 @@ function ManagerDashboard() {
       console.log('Project created successfully:', createdProject);
 
       // Now assign team members to the project using the many-to-many relationship
+      // The response lists one "Team member <id>: <reason>" line per member that was not assigned
+      let assignmentErrors = [];
       if (validTeamMembers.length > 0) {
         console.log('Assigning team members to project:', validTeamMembers);
         const teamMemberIds = validTeamMembers.map(id => parseInt(id));
-        await projectTeamMemberService.bulkCreate(createdProject.project_id, teamMemberIds);
-        console.log('Team members assigned successfully');
+        try {
+          const assignment = await projectTeamMemberService.bulkCreate(createdProject.project_id, teamMemberIds);
+          assignmentErrors = assignment.errors || [];
+        } catch (assignError) {
+          const data = assignError.response && assignError.response.data;
+          if (!data || !Array.isArray(data.errors)) {
+            throw assignError;
+          }
+          assignmentErrors = data.errors;
+        }
+        console.log('Team members assigned', assignmentErrors.length ? 'with errors:' : 'successfully', assignmentErrors);
       }
 
       // Reset form but keep manager_id
@@ -315,7 +329,11 @@ function ManagerDashboard() {
       setSelectedTeamMembers([""]);
       
       setShowForm(false);
-      alert("Project created successfully with team member assignments!");
+      if (assignmentErrors.length > 0) {
+        alert(`Project created, but some team members were not assigned:\n${assignmentErrors.join('\n')}`);
+      } else {
+        alert("Project created successfully with team member assignments!");
+      }
       
     } catch (error) {
       console.error('Error creating project or assigning team members:', error);
@@ -1089,6 +1107,24 @@ function ManagerDashboard() {
                       </select>
                     </div>
 
+                    <div className="form-group">
+                      <label htmlFor="project_id">Project</label>
+                      <select
+                        id="project_id"
+                        name="project_id"
+                        value={taskFormData.project_id}
+                        onChange={handleTaskInputChange}
+                        style={{ width: '100%', padding: '8px', border: '1px solid #ccc', borderRadius: '4px' }}
+                      >
+                        <option value="">-- No Project --</option>
+                        {projects.map(project => (
+                          <option key={project.project_id} value={project.project_id}>
+                            {project.project_name}
+                          </option>
+                        ))}
+                      </select>
+                    </div>
+
                     <div className="form-group">
                       <label htmlFor="priority">Priority*</label>
                       <select
@@ -75,7 +75,7 @@ function TeamMemberDashboard() {
       
       // Step 2: Filter relationships to find projects assigned to the logged-in team member
       const assignedRelationships = projectTeamMemberData.filter(relation => 
-        relation.team_member && relation.team_member.team_member_id === parseInt(loggedInTeamMemberId)
+        relation.team_member_id === parseInt(loggedInTeamMemberId)
       );
       
       console.log(`Found ${assignedRelationships.length} project assignments for team member ${loggedInTeamMemberId}:`, assignedRelationships);
@@ -87,7 +87,7 @@ function TeamMemberDashboard() {
       }
       
       // Step 3: Extract project IDs from the relationships
-      const assignedProjectIds = assignedRelationships.map(relation => relation.project.project_id);
+      const assignedProjectIds = assignedRelationships.map(relation => relation.project_id);
       console.log('Assigned project IDs:', assignedProjectIds);
       
       // Step 4: Get all projects and filter by assigned project IDs
@@ -623,39 +623,44 @@ function TeamMemberDashboard() {
                             )}
                           </td>
                           <td style={{ padding: '12px 15px', borderBottom: '1px solid #e5e7eb' }}>
-                            <div style={{ display: 'flex', alignItems: 'center', gap: '8px' }}>
-                              <input
-                                type="number"
-                                min="0"
-                                max="100"
-                                value={progressUpdates[project.project_id] !== undefined ? progressUpdates[project.project_id] : (project.progress || 0)}
-                                onChange={(e) => setProgressUpdates(prev => ({ ...prev, [project.project_id]: e.target.value }))}
-                                style={{
-                                  width: '60px',
-                                  padding: '4px 8px',
-                                  border: '1px solid #d1d5db',
-                                  borderRadius: '4px',
-                                  fontSize: '14px'
-                                }}
-                                placeholder="0-100"
-                              />
-                              <span>%</span>
-                              <button
-                                onClick={() => updateProjectProgress(project.project_id, progressUpdates[project.project_id] || project.progress || 0)}
-                                disabled={updatingProgress[project.project_id]}
-                                style={{
-                                  padding: '4px 8px',
-                                  backgroundColor: updatingProgress[project.project_id] ? '#d1d5db' : '#3b82f6',
-                                  color: 'white',
-                                  border: 'none',
-                                  borderRadius: '4px',
-                                  fontSize: '12px',
-                                  cursor: updatingProgress[project.project_id] ? 'not-allowed' : 'pointer'
-                                }}
-                              >
-                                {updatingProgress[project.project_id] ? 'Updating...' : 'Update'}
-                              </button>
-                            </div>
+                            {project.total_tasks > 0 ? (
+                              // Projects with tasks get their progress from task completion
+                              <span>{project.progress || 0}% ({project.completed_tasks}/{project.total_tasks} tasks done)</span>
+                            ) : (
+                              <div style={{ display: 'flex', alignItems: 'center', gap: '8px' }}>
+                                <input
+                                  type="number"
+                                  min="0"
+                                  max="100"
+                                  value={progressUpdates[project.project_id] !== undefined ? progressUpdates[project.project_id] : (project.progress || 0)}
+                                  onChange={(e) => setProgressUpdates(prev => ({ ...prev, [project.project_id]: e.target.value }))}
+                                  style={{
+                                    width: '60px',
+                                    padding: '4px 8px',
+                                    border: '1px solid #d1d5db',
+                                    borderRadius: '4px',
+                                    fontSize: '14px'
+                                  }}
+                                  placeholder="0-100"
+                                />
+                                <span>%</span>
+                                <button
+                                  onClick={() => updateProjectProgress(project.project_id, progressUpdates[project.project_id] || project.progress || 0)}
+                                  disabled={updatingProgress[project.project_id]}
+                                  style={{
+                                    padding: '4px 8px',
+                                    backgroundColor: updatingProgress[project.project_id] ? '#d1d5db' : '#3b82f6',
+                                    color: 'white',
+                                    border: 'none',
+                                    borderRadius: '4px',
+                                    fontSize: '12px',
+                                    cursor: updatingProgress[project.project_id] ? 'not-allowed' : 'pointer'
+                                  }}
+                                >
+                                  {updatingProgress[project.project_id] ? 'Updating...' : 'Update'}
+                                </button>
+                              </div>
+                            )}
                           </td>
                           <td style={{ padding: '12px 15px', borderBottom: '1px solid #e5e7eb' }}>
                             {project.manager && project.manager.name ? project.manager.name : 'Not assigned'}
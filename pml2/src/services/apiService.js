@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { attachSessionToken } from './authService';
 
 // API base URL - adjust this based on where your Django server is running
 const API_BASE_URL = 'http://localhost:8000/api';
@@ -10,6 +11,7 @@ const apiClient = axios.create({
     'Content-Type': 'application/json',
   },
 });
+attachSessionToken(apiClient);
 
 // User-related API calls (original model)
 export const userService = {
@@ -174,6 +176,17 @@ export const adminService = {
     }
   },
   
+  // Get cached system-wide dashboard statistics
+  getStats: async () => {
+    try {
+      const response = await apiClient.get('/admin/stats/');
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching admin statistics:', error);
+      throw error;
+    }
+  },
+  
   create: async (adminData) => {
     try {
       const response = await apiClient.post('/admins/create/', adminData);
@@ -227,6 +240,17 @@ export const managerService = {
     }
   },
   
+  // Get aggregated dashboard counts for one manager
+  getSummary: async (id) => {
+    try {
+      const response = await apiClient.get(`/managers/${id}/summary/`);
+      return response.data;
+    } catch (error) {
+      console.error(`Error fetching summary for manager ${id}:`, error);
+      throw error;
+    }
+  },
+  
   create: async (managerData) => {
     try {
       const response = await apiClient.post('/managers/create/', managerData);
@@ -313,9 +337,10 @@ export const teamMemberService = {
 
 // Project API service
 export const projectService = {
-  getAll: async () => {
+  // Lists return manager_id only unless the manager is expanded
+  getAll: async (params = { expand: 'manager' }) => {
     try {
-      const response = await apiClient.get('/projects/');
+      const response = await apiClient.get('/projects/', { params });
       return response.data;
     } catch (error) {
       console.error('Error fetching projects:', error);
@@ -376,9 +401,11 @@ export const projectService = {
 
 // Task API service
 export const taskService = {
-  getAll: async () => {
+  // Optional filters: manager_id, team_member_id, status, priority, page_size, cursor,
+  // fields and expand; lists return manager_id only unless the manager is expanded
+  getAll: async (params = { expand: 'manager' }) => {
     try {
-      const response = await apiClient.get('/tasks/');
+      const response = await apiClient.get('/tasks/', { params });
       return response.data;
     } catch (error) {
       console.error('Error fetching tasks:', error);
@@ -406,6 +433,17 @@ export const taskService = {
     }
   },
   
+  // Create many tasks in one request; nothing is saved if any item is invalid
+  bulkCreate: async (tasks) => {
+    try {
+      const response = await apiClient.post('/tasks/bulk-create/', { tasks });
+      return response.data;
+    } catch (error) {
+      console.error('Error bulk creating tasks:', error);
+      throw error;
+    }
+  },
+  
   update: async (id, taskData) => {
     try {
       const response = await apiClient.put(`/tasks/update/${id}/`, taskData);
@@ -451,6 +489,19 @@ export const projectTeamMemberService = {
     }
   },
   
+  // Replace a project's team with exactly the given team member IDs
+  replaceTeam: async (projectId, teamMemberIds) => {
+    try {
+      const response = await apiClient.put(`/project-team-members/project/${projectId}/`, {
+        team_member_ids: teamMemberIds
+      });
+      return response.data;
+    } catch (error) {
+      console.error(`Error replacing team for project ${projectId}:`, error);
+      throw error;
+    }
+  },
+  
   // Assign a single team member to a project
   create: async (assignmentData) => {
     try {
@@ -11,6 +11,27 @@ const authClient = axios.create({
   },
 });
 
+// Send the token issued at login with every request made through `client`.
+// The API recognises a client by it, e.g. to keep reads that follow the
+// client's own writes on the primary database. A token the API rejects
+// (expired, or the account was deleted) ends the stored login.
+export const attachSessionToken = (client) => {
+  client.interceptors.request.use((config) => {
+    const currentUser = authService.getCurrentUser();
+    if (currentUser && currentUser.token) {
+      config.headers.Authorization = `Bearer ${currentUser.token}`;
+    }
+    return config;
+  });
+  client.interceptors.response.use(null, (error) => {
+    if (error.response && error.response.status === 401 && error.config.headers.Authorization) {
+      authService.logout();
+    }
+    return Promise.reject(error);
+  });
+  return client;
+};
+
 // Authentication services
 export const authService = {
   // Admin login
@@ -73,6 +94,23 @@ export const authService = {
     }
   },
   
+  // Resolve the signed-in user from the token issued at login
+  getSession: async () => {
+    const currentUser = authService.getCurrentUser();
+    if (!currentUser || !currentUser.token) {
+      return null;
+    }
+    try {
+      const response = await authClient.get('/session/', {
+        headers: { Authorization: `Bearer ${currentUser.token}` }
+      });
+      return response.data.data;
+    } catch (error) {
+      console.error('Session lookup error:', error);
+      throw error;
+    }
+  },
+  
   // Logout
   logout: () => {
     // Remove user from local storage to log user out
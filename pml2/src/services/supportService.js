@@ -1,13 +1,17 @@
 ﻿// This file contains functions to interact with the backend API for help requests
 import axios from 'axios';
+import { attachSessionToken } from './authService';
 
 // API base URL - adjust this to match your Django backend URL
 const API_BASE_URL = 'http://127.0.0.1:8000';
 
+// Help requests go through their own client, which sends the session token
+const supportClient = attachSessionToken(axios.create());
+
 // Get all help requests from the Django API
 export const getAllSupportRequests = async () => {
   try {
-    const response = await axios.get(`${API_BASE_URL}/api/help/`);
+    const response = await supportClient.get(`${API_BASE_URL}/api/help/`);
     
     // Transform the response data to match the expected format
     return response.data.map(help => ({
@@ -25,10 +29,64 @@ export const getAllSupportRequests = async () => {
   }
 };
 
+// Get one page of the help feed, newest first. Pass the `next` URL from the
+// previous page to continue, and optional createdAfter/createdBefore dates.
+export const getSupportRequestFeed = async ({ next = null, pageSize = 50, createdAfter, createdBefore } = {}) => {
+  try {
+    const response = next
+      ? await supportClient.get(next)
+      : await supportClient.get(`${API_BASE_URL}/api/help/`, {
+          params: { page_size: pageSize, created_after: createdAfter, created_before: createdBefore }
+        });
+    
+    return {
+      next: response.data.next,
+      results: response.data.results.map(help => ({
+        id: help.help_id,
+        name: help.name,
+        email: help.email,
+        mobile: help.number,
+        subject: help.subject,
+        description: help.description,
+        createdAt: help.created_at || new Date().toISOString()
+      }))
+    };
+  } catch (error) {
+    console.error('Error fetching help feed:', error);
+    throw error;
+  }
+};
+
+// Full-text search over help requests, best matches first
+export const searchSupportRequests = async (query, page = 1, pageSize = 20) => {
+  try {
+    const response = await supportClient.get(`${API_BASE_URL}/api/help/search/`, {
+      params: { q: query, page, page_size: pageSize }
+    });
+    
+    return {
+      count: response.data.count,
+      hasMore: response.data.next !== null,
+      results: response.data.results.map(help => ({
+        id: help.help_id,
+        name: help.name,
+        email: help.email,
+        mobile: help.number,
+        subject: help.subject,
+        description: help.description,
+        createdAt: help.created_at || new Date().toISOString()
+      }))
+    };
+  } catch (error) {
+    console.error('Error searching help requests:', error);
+    throw error;
+  }
+};
+
 // Get a single help request by ID
 export const getSupportRequestById = async (id) => {
   try {
-    const response = await axios.get(`${API_BASE_URL}/api/help/${id}/`);
+    const response = await supportClient.get(`${API_BASE_URL}/api/help/${id}/`);
     
     // Transform the response data to match the expected format
     return {
@@ -58,7 +116,7 @@ export const createSupportRequest = async (requestData) => {
       description: requestData.description
     };
     
-    const response = await axios.post(`${API_BASE_URL}/api/help/create/`, apiData);
+    const response = await supportClient.post(`${API_BASE_URL}/api/help/create/`, apiData);
     
     // Return transformed data
     return {
@@ -87,7 +145,7 @@ export const updateSupportRequest = async (id, updates) => {
     if (updates.subject) apiUpdates.subject = updates.subject;
     if (updates.description) apiUpdates.description = updates.description;
     
-    const response = await axios.put(`${API_BASE_URL}/api/help/update/${id}/`, apiUpdates);
+    const response = await supportClient.put(`${API_BASE_URL}/api/help/update/${id}/`, apiUpdates);
     
     // Return transformed data
     return {
@@ -108,7 +166,7 @@ export const updateSupportRequest = async (id, updates) => {
 // Delete a help request
 export const deleteSupportRequest = async (id) => {
   try {
-    await axios.delete(`${API_BASE_URL}/api/help/delete/${id}/`);
+    await supportClient.delete(`${API_BASE_URL}/api/help/delete/${id}/`);
     return { success: true };
   } catch (error) {
     console.error(`Error deleting help request with ID ${id}:`, error);
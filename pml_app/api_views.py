@@ -1,18 +1,96 @@
+import logging
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Admin, Manager, TeamMember, Project, Task, ProjectTeamMember
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Admin, Manager, TeamMember, Project, Task, ProjectTeamMember, Help
 from .serializers import (AdminSerializer, ManagerSerializer, 
                          TeamMemberSerializer, ProjectSerializer, TaskSerializer, ProjectTeamMemberSerializer)
+from .pagination import TaskCursorPagination, wants_pagination
+from .stats import get_admin_stats
+from .detail_cache import cached_detail, detail_cache_stats
+from .signals import record_change
+from .versions import conditional_get
+from .streaming import stream_json, wants_stream
+from .projections import get_projection
+from .ids import next_id, advance_past, save_with_next_id
+from .progress import apply_task_changes
+from .sync import SYNC_TABLES, SyncTokenExpired, decode_token, sync_changes
+
+logger = logging.getLogger(__name__)
+
+def serializer_options(request, serializer_class, list_view=True):
+    """Turn ?fields= and ?expand= into serializer kwargs, raising ValueError on unknown names.
+    
+    List views nest nothing unless asked; detail views nest everything by default.
+    """
+    params = request.GET
+    expand = None
+    if list_view or 'expand' in params:
+        expand = {name for name in params.get('expand', '').split(',') if name}
+        unknown = expand - set(serializer_class.expandable)
+        if unknown:
+            raise ValueError(f"Cannot expand: {', '.join(sorted(unknown))}")
+    
+    options = {'expand': expand}
+    if params.get('fields'):
+        fields = [name for name in params['fields'].split(',') if name]
+        unknown = set(fields) - set(serializer_class.output_field_names(expand))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        options['fields'] = fields
+    return options
+
+def restrict_queryset(queryset, serializer_class, options):
+    """Join the expanded relations and load only the columns the response needs"""
+    expandable = serializer_class.expandable
+    expand = expandable.keys() if options['expand'] is None else options['expand']
+    fields = options.get('fields')
+    
+    joined = [expandable[relation] for relation in expand if fields is None or relation in fields]
+    if joined:
+        queryset = queryset.select_related(*joined)
+    
+    if fields is not None:
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = set()
+        for name in fields:
+            if name.endswith('_id') and name[:-3] in expandable:
+                name = name[:-3]
+            if name in model_fields:
+                columns.add(name)
+        queryset = queryset.only(*columns)
+    return queryset
+
+def serialize_list(queryset, serializer_class, options=None):
+    """Serialize a queryset, through the compiled projection when there is one"""
+    options = options or {}
+    projection = get_projection(serializer_class, **options)
+    if projection is None:
+        return serializer_class(queryset, many=True, **options).data
+    return projection.rows(queryset)
+
+def serialize_one(queryset, serializer_class, options=None):
+    """Serialize the single row `queryset` selects, returning None if there is none"""
+    options = options or {}
+    projection = get_projection(serializer_class, **options)
+    if projection is None:
+        instance = queryset.first()
+        return None if instance is None else serializer_class(instance, **options).data
+    return projection.row(queryset)
 
 # Admin API views
 @api_view(['GET'])
+@conditional_get(Admin)
 def admin_list(request):
     admins = Admin.objects.all()
     serializer = AdminSerializer(admins, many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
+@conditional_get(Admin, row=Admin)
 def admin_detail(request, pk):
     try:
         admin = Admin.objects.get(pk=pk)
@@ -22,15 +100,48 @@ def admin_detail(request, pk):
     serializer = AdminSerializer(admin)
     return Response(serializer.data)
 
+@api_view(['GET'])
+@conditional_get(Project, Task, Manager, TeamMember, ProjectTeamMember)
+def admin_stats(request):
+    """System-wide dashboard counts, served from a signal-invalidated cache"""
+    return Response(get_admin_stats())
+
+@api_view(['GET'])
+def detail_cache_report(request):
+    """Hit rates of the detail response cache in the process serving this request"""
+    return Response(detail_cache_stats())
+
+def sync_rows(queryset, serializer_class):
+    # Relations as plain ids, like the list endpoints without ?expand=
+    options = {'expand': set()} if getattr(serializer_class, 'expandable', None) else {}
+    return serialize_list(queryset, serializer_class, options)
+
+@api_view(['GET'])
+@conditional_get(Project, Task, ProjectTeamMember, TeamMember, Help)
+def sync(request):
+    """Rows changed and deleted since ?since=<token>, limited to ?tables=; everything without since"""
+    params = request.query_params
+    try:
+        since = decode_token(params['since']) if params.get('since') else None
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    tables = None
+    if params.get('tables'):
+        tables = [name for name in params['tables'].split(',') if name]
+        unknown = set(tables) - set(SYNC_TABLES)
+        if unknown:
+            return Response({'error': f"Unknown tables: {', '.join(sorted(unknown))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return Response(sync_changes(since, tables, serialize=sync_rows))
+    except SyncTokenExpired as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+
 @api_view(['POST'])
 def admin_create(request):
-    # Get the next available admin_id
-    last_admin = Admin.objects.all().order_by('-admin_id').first()
-    next_id = 1 if not last_admin else last_admin.admin_id + 1
-    
-    # Add admin_id to request data
+    # Add the next available admin_id to request data
     data = request.data.copy()
-    data['admin_id'] = next_id
+    data['admin_id'] = next_id(Admin)
     
     serializer = AdminSerializer(data=data)
     if serializer.is_valid():
@@ -63,12 +174,15 @@ def admin_delete(request, pk):
 
 # Manager API views
 @api_view(['GET'])
+@conditional_get(Manager)
 def manager_list(request):
     managers = Manager.objects.all()
     serializer = ManagerSerializer(managers, many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
+@conditional_get(Manager, row=Manager)
+@cached_detail(Manager)
 def manager_detail(request, pk):
     try:
         manager = Manager.objects.get(pk=pk)
@@ -78,29 +192,91 @@ def manager_detail(request, pk):
     serializer = ManagerSerializer(manager)
     return Response(serializer.data)
 
+UPCOMING_DEADLINE_LIMIT = 5
+
+# Projects without progress count as in progress, matching the dashboard
+MANAGER_PROJECT_COUNTS = {
+    'total': Count('project_id'),
+    'completed': Count('project_id', filter=Q(progress__gte=100)),
+}
+
+def manager_task_counts(pk):
+    """Task counts per (priority, status) for a manager, as a lazy values() queryset"""
+    return (Task.objects.filter(manager_id=pk)
+            .values('priority', 'status')
+            .annotate(count=Count('task_id'))
+            .order_by())
+
+def manager_upcoming_deadlines(pk):
+    return (Project.objects.filter(manager_id=pk, deadline__gte=timezone.localdate())
+            .order_by('deadline', 'project_id')
+            .values('project_id', 'project_name', 'deadline', 'progress')[:UPCOMING_DEADLINE_LIMIT])
+
+def build_manager_summary(pk, project_counts, task_rows, upcoming_deadlines):
+    """Assemble the summary response from the results of the queries above"""
+    tasks_by_priority = {
+        priority: {'pending': 0, 'completed': 0} for priority, _ in Task.PRIORITY_CHOICES
+    }
+    for row in task_rows:
+        bucket = tasks_by_priority.setdefault(row['priority'], {'pending': 0, 'completed': 0})
+        key = 'completed' if row['status'] == 'completed' else 'pending'
+        bucket[key] += row['count']
+    
+    return {
+        'manager_id': pk,
+        'projects': {
+            'total': project_counts['total'],
+            'completed': project_counts['completed'],
+            'in_progress': project_counts['total'] - project_counts['completed'],
+        },
+        'tasks': {
+            'total': sum(b['pending'] + b['completed'] for b in tasks_by_priority.values()),
+            'pending': sum(b['pending'] for b in tasks_by_priority.values()),
+            'completed': sum(b['completed'] for b in tasks_by_priority.values()),
+            'by_priority': tasks_by_priority,
+        },
+        'upcoming_deadlines': list(upcoming_deadlines),
+    }
+
+@api_view(['GET'])
+@conditional_get(Project, Task, row=Manager, daily=True)
+def manager_summary(request, pk):
+    """Dashboard counts for a single manager, aggregated in the database"""
+    if not Manager.objects.filter(pk=pk).exists():
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(build_manager_summary(
+        pk,
+        Project.objects.filter(manager_id=pk).aggregate(**MANAGER_PROJECT_COUNTS),
+        manager_task_counts(pk),
+        manager_upcoming_deadlines(pk),
+    ))
+
 @api_view(['POST'])
 def manager_create(request):
     # Check if manager_id is provided in request data
     data = request.data.copy()
     
     # If manager_id is provided, use it; otherwise auto-generate
-    if 'manager_id' not in data or not data['manager_id']:
-        # Get the next available manager_id
-        last_manager = Manager.objects.all().order_by('-manager_id').first()
-        next_id = 1 if not last_manager else last_manager.manager_id + 1
-        data['manager_id'] = next_id
-    else:
-        # Check if the provided manager_id already exists
-        manager_id = data['manager_id']
-        if Manager.objects.filter(manager_id=manager_id).exists():
-            return Response(
-                {'error': f'Manager with ID {manager_id} already exists'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    manual_id = bool(data.get('manager_id'))
+    if not manual_id:
+        serializer = save_with_next_id(ManagerSerializer, data)
+        if serializer.errors:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    # Check if the provided manager_id already exists
+    manager_id = data['manager_id']
+    if Manager.objects.filter(manager_id=manager_id).exists():
+        return Response(
+            {'error': f'Manager with ID {manager_id} already exists'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     serializer = ManagerSerializer(data=data)
     if serializer.is_valid():
-        serializer.save()
+        manager = serializer.save()
+        advance_past(Manager, manager.manager_id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -129,43 +305,45 @@ def manager_delete(request, pk):
 
 # TeamMember API views
 @api_view(['GET'])
+@conditional_get(TeamMember)
 def team_member_list(request):
     team_members = TeamMember.objects.all()
-    serializer = TeamMemberSerializer(team_members, many=True)
-    return Response(serializer.data)
+    return Response(serialize_list(team_members, TeamMemberSerializer))
 
 @api_view(['GET'])
+@conditional_get(TeamMember, row=TeamMember)
+@cached_detail(TeamMember)
 def team_member_detail(request, pk):
-    try:
-        team_member = TeamMember.objects.get(pk=pk)
-    except TeamMember.DoesNotExist:
+    data = serialize_one(TeamMember.objects.filter(pk=pk), TeamMemberSerializer)
+    if data is None:
         return Response(status=status.HTTP_404_NOT_FOUND)
-    
-    serializer = TeamMemberSerializer(team_member)
-    return Response(serializer.data)
+    return Response(data)
 
 @api_view(['POST'])
 def team_member_create(request):
     # Check if team_member_id is provided, otherwise auto-generate
     data = request.data.copy()
     
-    if 'team_member_id' in data and data['team_member_id']:
-        # Manual team_member_id provided - check if it already exists
-        team_member_id = data['team_member_id']
-        if TeamMember.objects.filter(team_member_id=team_member_id).exists():
-            return Response(
-                {'error': f'Team Member with ID {team_member_id} already exists'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    else:
+    manual_id = bool(data.get('team_member_id'))
+    if not manual_id:
         # Auto-generate team_member_id
-        last_team_member = TeamMember.objects.all().order_by('-team_member_id').first()
-        next_id = 1 if not last_team_member else last_team_member.team_member_id + 1
-        data['team_member_id'] = next_id
+        serializer = save_with_next_id(TeamMemberSerializer, data)
+        if serializer.errors:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    # Manual team_member_id provided - check if it already exists
+    team_member_id = data['team_member_id']
+    if TeamMember.objects.filter(team_member_id=team_member_id).exists():
+        return Response(
+            {'error': f'Team Member with ID {team_member_id} already exists'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     serializer = TeamMemberSerializer(data=data)
     if serializer.is_valid():
-        serializer.save()
+        team_member = serializer.save()
+        advance_past(TeamMember, team_member.team_member_id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -194,30 +372,38 @@ def team_member_delete(request, pk):
 
 # Project API views
 @api_view(['GET'])
+@conditional_get(Project, Manager)
 def project_list(request):
-    projects = Project.objects.all()
-    serializer = ProjectSerializer(projects, many=True)
-    return Response(serializer.data)
+    try:
+        options = serializer_options(request, ProjectSerializer)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    projects = restrict_queryset(Project.objects.all(), ProjectSerializer, options)
+    if wants_stream(request):
+        return stream_json(projects, ProjectSerializer, **options)
+    return Response(serialize_list(projects, ProjectSerializer, options))
 
 @api_view(['GET'])
+@conditional_get(Manager, row=Project)
+@cached_detail(Project, Manager)
 def project_detail(request, pk):
     try:
-        project = Project.objects.get(pk=pk)
-    except Project.DoesNotExist:
-        return Response(status=status.HTTP_404_NOT_FOUND)
+        options = serializer_options(request, ProjectSerializer, list_view=False)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    serializer = ProjectSerializer(project)
-    return Response(serializer.data)
+    data = serialize_one(restrict_queryset(Project.objects.filter(pk=pk), ProjectSerializer, options),
+                         ProjectSerializer, options)
+    if data is None:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    return Response(data)
 
 @api_view(['POST'])
 def project_create(request):
-    # Get the next available project_id
-    last_project = Project.objects.all().order_by('-project_id').first()
-    next_id = 1 if not last_project else last_project.project_id + 1
-    
-    # Add project_id to request data
+    # Add the next available project_id to request data
     data = request.data.copy()
-    data['project_id'] = next_id
+    data['project_id'] = next_id(Project)
     
     serializer = ProjectSerializer(data=data)
     if serializer.is_valid():
@@ -232,7 +418,7 @@ def project_update(request, pk):
     except Project.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
     
-    print(f"Updating project {pk} with data: {request.data}")  # Debug log
+    logger.debug('Updating project %s', pk, extra={'project_id': pk, 'payload': request.data})
     
     # Use partial=True for PATCH requests or when only some fields are provided
     partial = request.method == 'PATCH' or len(request.data) < 3
@@ -240,10 +426,11 @@ def project_update(request, pk):
     
     if serializer.is_valid():
         serializer.save()
-        print(f"Project {pk} updated successfully with progress: {serializer.data.get('progress')}")
+        logger.info('Project %s updated', pk,
+                    extra={'project_id': pk, 'progress': serializer.data.get('progress')})
         return Response(serializer.data)
     
-    print(f"Serializer errors: {serializer.errors}")  # Debug log
+    logger.warning('Project %s update rejected', pk, extra={'project_id': pk, 'errors': serializer.errors})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['DELETE'])
@@ -257,70 +444,286 @@ def project_delete(request, pk):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 # Task API views
+def filter_tasks(queryset, params):
+    """Apply the task list query parameters, raising ValueError on bad input"""
+    for param in ('manager_id', 'team_member_id', 'project_id'):
+        value = params.get(param)
+        if value not in (None, ''):
+            try:
+                queryset = queryset.filter(**{param: int(value)})
+            except (ValueError, TypeError):
+                raise ValueError(f'{param} must be a number')
+    
+    for param, choices in (('status', Task.STATUS_CHOICES), ('priority', Task.PRIORITY_CHOICES)):
+        value = params.get(param)
+        if value not in (None, ''):
+            if value not in dict(choices):
+                raise ValueError(f'Invalid {param}: {value}')
+            queryset = queryset.filter(**{param: value})
+    
+    return queryset
+
 @api_view(['GET'])
+@conditional_get(Task, Manager)
 def task_list(request):
-    tasks = Task.objects.all()
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data)
+    """List tasks, optionally filtered by manager_id, team_member_id, project_id, status and priority.
+    
+    Passing `page_size` or `cursor` switches to keyset pagination on task_id,
+    and `stream=1` streams the full result set.
+    """
+    try:
+        options = serializer_options(request, TaskSerializer)
+        tasks = filter_tasks(restrict_queryset(Task.objects.all(), TaskSerializer, options),
+                             request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    paginator = TaskCursorPagination()
+    if wants_pagination(request, paginator):
+        projection = get_projection(TaskSerializer, **options)
+        if projection is None:
+            page = paginator.paginate_queryset(tasks, request)
+            data = TaskSerializer(page, many=True, **options).data
+        else:
+            # The cursor paginator reads its position from row dicts too
+            page = paginator.paginate_queryset(tasks.values(*projection.columns), request)
+            data = [projection.build(row) for row in page]
+        return paginator.get_paginated_response(data)
+    
+    if wants_stream(request):
+        return stream_json(tasks, TaskSerializer, **options)
+    
+    return Response(serialize_list(tasks.order_by('task_id'), TaskSerializer, options))
 
 @api_view(['GET'])
+@conditional_get(Manager, row=Task)
+@cached_detail(Task, Manager)
 def task_detail(request, pk):
     try:
-        task = Task.objects.get(pk=pk)
-    except Task.DoesNotExist:
-        return Response(status=status.HTTP_404_NOT_FOUND)
+        options = serializer_options(request, TaskSerializer, list_view=False)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    serializer = TaskSerializer(task)
-    return Response(serializer.data)
+    data = serialize_one(restrict_queryset(Task.objects.filter(pk=pk), TaskSerializer, options),
+                         TaskSerializer, options)
+    if data is None:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    return Response(data)
 
 @api_view(['POST'])
 def task_create(request):
     serializer = TaskSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        # Keeps the task and its project's progress counters in step
+        with transaction.atomic():
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+MAX_BULK_TASKS = 1000
+
+def last_insert_range(count):
+    """Keys given to the `count` rows of this connection's last multi-row INSERT, on MySQL.
+    
+    MySQL cannot return rows from an INSERT, but LAST_INSERT_ID() is the key of
+    its first row. InnoDB gives the rows of a single INSERT with a known row
+    count consecutive keys, auto_increment_increment apart; with
+    innodb_autoinc_lock_mode = 2 that only fails while INSERT ... SELECT or
+    LOAD DATA run on the same table.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT LAST_INSERT_ID(), @@auto_increment_increment')
+        first, step = cursor.fetchone()
+    return range(first, first + count * step, step)
+
+@api_view(['POST'])
+def task_bulk_create(request):
+    """Create many tasks in one transaction.
+    
+    Accepts a list of task objects (or {"tasks": [...]}). Every item is
+    validated first; if any fail, nothing is inserted and the per-item errors
+    are returned keyed by their index in the request.
+    """
+    items = request.data.get('tasks') if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'A non-empty list of tasks is required'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BULK_TASKS:
+        return Response({'error': f'At most {MAX_BULK_TASKS} tasks can be created at once'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    errors = []
+    validated = []
+    for index, item in enumerate(items):
+        serializer = TaskSerializer(data=item)
+        if serializer.is_valid():
+            validated.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+    
+    # Resolve every referenced manager and project with a single query each
+    manager_ids = {data['manager_id'] for _, data in validated if data.get('manager_id')}
+    managers = Manager.objects.in_bulk(manager_ids)
+    project_ids = {data['project_id'] for _, data in validated if data.get('project_id') is not None}
+    existing_projects = set(Project.objects.filter(pk__in=project_ids).values_list('pk', flat=True))
+    
+    tasks = []
+    for index, data in validated:
+        data = dict(data)
+        manager_id = data.pop('manager_id', None)
+        if manager_id:
+            if manager_id not in managers:
+                errors.append({'index': index,
+                               'errors': {'manager_id': [f'Manager with id {manager_id} does not exist']}})
+                continue
+            data['manager'] = managers[manager_id]
+        project_id = data.get('project_id')
+        if project_id is not None and project_id not in existing_projects:
+            errors.append({'index': index,
+                           'errors': {'project_id': [f'Project with id {project_id} does not exist']}})
+            continue
+        tasks.append(Task(**data))
+    
+    if errors:
+        errors.sort(key=lambda error: error['index'])
+        return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    
+    with transaction.atomic():
+        # One INSERT: MAX_BULK_TASKS rows stay well within any backend's statement limits
+        created = Task.objects.bulk_create(tasks)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            for task, task_id in zip(created, last_insert_range(len(created))):
+                task.pk = task_id
+        # bulk_create bypasses post_save, so count the tasks into their projects here
+        apply_task_changes([(None, (task.project_id, task.status)) for task in created])
+    record_change(Task, [task.pk for task in created])
+    
+    return Response({
+        'created': TaskSerializer(created, many=True).data,
+        'errors': []
+    }, status=status.HTTP_201_CREATED)
+
 @api_view(['PUT'])
 def task_update(request, pk):
-    try:
-        task = Task.objects.get(pk=pk)
-    except Task.DoesNotExist:
-        return Response(status=status.HTTP_404_NOT_FOUND)
-    
-    serializer = TaskSerializer(task, data=request.data)
-    if serializer.is_valid():
+    # The row stays locked until the save commits, so concurrent updates adjust the
+    # project counters from each other's results rather than from the same old state
+    with transaction.atomic():
+        try:
+            task = Task.objects.select_for_update().get(pk=pk)
+        except Task.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = TaskSerializer(task, data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         serializer.save()
-        return Response(serializer.data)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return Response(serializer.data)
 
 @api_view(['DELETE'])
 def task_delete(request, pk):
-    try:
-        task = Task.objects.get(pk=pk)
-    except Task.DoesNotExist:
-        return Response(status=status.HTTP_404_NOT_FOUND)
-    
-    task.delete()
+    with transaction.atomic():
+        try:
+            task = Task.objects.select_for_update().get(pk=pk)
+        except Task.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        task.delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 # ProjectTeamMember API views
 @api_view(['GET'])
+@conditional_get(ProjectTeamMember, Project, Manager, TeamMember)
 def project_team_member_list(request):
-    project_team_members = ProjectTeamMember.objects.all()
-    serializer = ProjectTeamMemberSerializer(project_team_members, many=True)
+    try:
+        options = serializer_options(request, ProjectTeamMemberSerializer)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    project_team_members = restrict_queryset(ProjectTeamMember.objects.all(), ProjectTeamMemberSerializer, options)
+    serializer = ProjectTeamMemberSerializer(project_team_members, many=True, **options)
     return Response(serializer.data)
 
-@api_view(['GET'])
+@api_view(['GET', 'PUT'])
+@conditional_get(ProjectTeamMember, Project, Manager, TeamMember)
 def project_team_members_by_project(request, project_id):
-    """Get all team members for a specific project"""
+    """Get all team members for a specific project, or replace them with PUT"""
+    if request.method == 'PUT':
+        return replace_project_team(request, project_id)
+    
     try:
-        project_team_members = ProjectTeamMember.objects.filter(project__project_id=project_id)
-        serializer = ProjectTeamMemberSerializer(project_team_members, many=True)
+        options = serializer_options(request, ProjectTeamMemberSerializer)
+        project_team_members = restrict_queryset(
+            ProjectTeamMember.objects.filter(project__project_id=project_id),
+            ProjectTeamMemberSerializer, options
+        )
+        serializer = ProjectTeamMemberSerializer(project_team_members, many=True, **options)
         return Response(serializer.data)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+def replace_project_team(request, project_id):
+    """Make the project's team exactly the given team_member_ids.
+    
+    The current assignments are read once and only the difference is applied:
+    one delete for removed members and one bulk insert for added ones.
+    The response is the new team in the GET format, honouring ?fields= and ?expand=.
+    """
+    try:
+        options = serializer_options(request, ProjectTeamMemberSerializer)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    team_member_ids = request.data.get('team_member_ids')
+    if not isinstance(team_member_ids, list):
+        return Response({'error': 'team_member_ids must be a list'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        desired_ids = {int(team_member_id) for team_member_id in team_member_ids}
+    except (ValueError, TypeError):
+        return Response({'error': 'team_member_ids must be numbers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        project = Project.objects.get(project_id=project_id)
+    except Project.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    
+    with transaction.atomic():
+        current = dict(
+            ProjectTeamMember.objects.select_for_update()
+            .filter(project=project)
+            .values_list('team_member_id', 'id')
+        )
+        to_add = desired_ids - current.keys()
+        to_remove = [current[team_member_id] for team_member_id in current.keys() - desired_ids]
+        
+        if to_add:
+            existing_members = set(
+                TeamMember.objects.filter(team_member_id__in=to_add).values_list('team_member_id', flat=True)
+            )
+            missing = sorted(to_add - existing_members)
+            if missing:
+                return Response({'error': f'Team members do not exist: {missing}'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        
+        if to_remove:
+            ProjectTeamMember.objects.filter(id__in=to_remove).delete()
+        if to_add:
+            ProjectTeamMember.objects.bulk_create(
+                [ProjectTeamMember(project=project, team_member_id=team_member_id) for team_member_id in sorted(to_add)]
+            )
+            # bulk_create skips post_save and does not return ids on every backend;
+            # deletes already fired post_delete
+            record_change(ProjectTeamMember, ProjectTeamMember.objects.filter(
+                project=project, team_member_id__in=to_add
+            ).values_list('id', flat=True))
+    
+    project_team_members = restrict_queryset(
+        ProjectTeamMember.objects.filter(project=project).order_by('id'),
+        ProjectTeamMemberSerializer, options
+    )
+    serializer = ProjectTeamMemberSerializer(project_team_members, many=True, **options)
+    return Response(serializer.data)
+
 @api_view(['POST'])
 def project_team_member_create(request):
     """Assign a team member to a project"""
@@ -335,7 +738,16 @@ def project_team_member_create(request):
 
 @api_view(['POST'])
 def project_team_member_bulk_create(request):
-    """Assign multiple team members to a project"""
+    """Assign multiple team members to a project.
+    
+    `created` rows use the GET format; `errors` has one "Team member <id>: <reason>"
+    line for each member that was not assigned.
+    """
+    try:
+        options = serializer_options(request, ProjectTeamMemberSerializer)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
     project_id = request.data.get('project_id')
     team_member_ids = request.data.get('team_member_ids', [])
     
@@ -346,20 +758,53 @@ def project_team_member_bulk_create(request):
     created_assignments = []
     errors = []
     
+    requested_ids = []
     for team_member_id in team_member_ids:
-        data = {
-            'project_id': project_id,
-            'team_member_id': team_member_id
-        }
-        serializer = ProjectTeamMemberSerializer(data=data)
-        if serializer.is_valid():
-            try:
-                assignment = serializer.save()
-                created_assignments.append(ProjectTeamMemberSerializer(assignment).data)
-            except Exception as e:
-                errors.append(f"Team member {team_member_id}: {str(e)}")
+        try:
+            requested_ids.append(int(team_member_id))
+        except (ValueError, TypeError):
+            errors.append(f"Team member {team_member_id}: A valid integer is required.")
+    
+    try:
+        project = Project.objects.select_related('manager').filter(project_id=int(project_id)).first()
+    except (ValueError, TypeError):
+        project = None
+    if project is None:
+        errors.extend(f"Team member {team_member_id}: Project with id {project_id} does not exist"
+                      for team_member_id in requested_ids)
+        return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # One query each for the members and for the assignments that already exist
+    team_members = TeamMember.objects.in_bulk(requested_ids)
+    already_assigned = set(
+        ProjectTeamMember.objects.filter(project=project, team_member_id__in=requested_ids)
+        .values_list('team_member_id', flat=True)
+    )
+    
+    new_assignments = []
+    for team_member_id in requested_ids:
+        if team_member_id not in team_members:
+            errors.append(f"Team member {team_member_id}: Team member with id {team_member_id} does not exist")
+        elif team_member_id in already_assigned:
+            errors.append(f"Team member {team_member_id}: already assigned to this project")
         else:
-            errors.append(f"Team member {team_member_id}: {serializer.errors}")
+            already_assigned.add(team_member_id)
+            new_assignments.append(ProjectTeamMember(project=project, team_member=team_members[team_member_id]))
+    
+    if new_assignments:
+        with transaction.atomic():
+            # Rows inserted concurrently since the check above are skipped, not errors
+            ProjectTeamMember.objects.bulk_create(new_assignments, ignore_conflicts=True)
+        # ignore_conflicts leaves primary keys unset, so read the new rows back
+        created = restrict_queryset(
+            ProjectTeamMember.objects.filter(
+                project=project,
+                team_member_id__in=[assignment.team_member_id for assignment in new_assignments]
+            ).order_by('id'),
+            ProjectTeamMemberSerializer, options
+        )
+        created_assignments = ProjectTeamMemberSerializer(created, many=True, **options).data
+        record_change(ProjectTeamMember, [row.pk for row in created])
     
     return Response({
         'created': created_assignments,
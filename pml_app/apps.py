@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    # SQLite schema changes can rebuild the help table and drop the index triggers
+    from .search import install_search_index
+    connection = connections[using]
+    if 'help' in connection.introspection.table_names():
+        install_search_index(connection)
 
 
 class PmlAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pml_app'
+
+    def ready(self):
+        from . import signals, progress, sync  # noqa: F401
+        post_migrate.connect(ensure_search_index, sender=self, dispatch_uid='pml_app.ensure_search_index')
@@ -0,0 +1,173 @@
+"""Async variants of the dashboard read endpoints, for ASGI deployments.
+
+Each view answers the same query parameters with the same body, ETag and
+status as its counterpart in api_views.py, under /api/async/. Rows are read
+through the async ORM and built with the compiled projections; a serializer
+that has no projection runs in a worker thread via sync_to_async.
+
+Pagination and ?stream=1 are only offered by the sync endpoints.
+Under WSGI these views still work, each request getting its own event loop.
+
+event_stream serves the change feed (see events.py) as Server-Sent Events;
+it holds its connection open, so it is only served under ASGI.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET, require_safe
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from .api_views import (MANAGER_PROJECT_COUNTS, build_manager_summary, filter_tasks, manager_task_counts,
+                        manager_upcoming_deadlines, restrict_queryset, serialize_list, serialize_one,
+                        serializer_options)
+from .events import event_channels, sse_stream
+from .models import Manager, Project, Task, TeamMember
+from .projections import get_projection
+from .serializers import ManagerSerializer, ProjectSerializer, TaskSerializer, TeamMemberSerializer
+from .versions import conditional_get
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """Render `data` exactly as a DRF Response with the JSON renderer would"""
+    response = HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status_code)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def error_response(message):
+    return json_response({'error': message}, status_code=status.HTTP_400_BAD_REQUEST)
+
+
+def not_found():
+    return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+
+async def aserialize_list(queryset, serializer_class, options=None):
+    options = options or {}
+    projection = get_projection(serializer_class, **options)
+    if projection is None:
+        return await sync_to_async(serialize_list)(queryset, serializer_class, options)
+    return await projection.arows(queryset)
+
+
+async def aserialize_one(queryset, serializer_class, options=None):
+    options = options or {}
+    projection = get_projection(serializer_class, **options)
+    if projection is None:
+        return await sync_to_async(serialize_one)(queryset, serializer_class, options)
+    return await projection.arow(queryset)
+
+
+async def list_response(request, queryset, serializer_class, filter_queryset=None):
+    try:
+        options = serializer_options(request, serializer_class)
+        queryset = restrict_queryset(queryset, serializer_class, options)
+        if filter_queryset is not None:
+            queryset = filter_queryset(queryset, request.GET)
+    except ValueError as e:
+        return error_response(str(e))
+    return json_response(await aserialize_list(queryset, serializer_class, options))
+
+
+async def detail_response(request, queryset, serializer_class):
+    try:
+        options = serializer_options(request, serializer_class, list_view=False)
+    except ValueError as e:
+        return error_response(str(e))
+    data = await aserialize_one(restrict_queryset(queryset, serializer_class, options), serializer_class, options)
+    if data is None:
+        return not_found()
+    return json_response(data)
+
+
+# Manager views
+@require_safe
+@conditional_get(Manager)
+async def manager_list(request):
+    return json_response(await aserialize_list(Manager.objects.all(), ManagerSerializer))
+
+
+@require_safe
+@conditional_get(Manager, row=Manager)
+async def manager_detail(request, pk):
+    data = await aserialize_one(Manager.objects.filter(pk=pk), ManagerSerializer)
+    if data is None:
+        return not_found()
+    return json_response(data)
+
+
+@require_safe
+@conditional_get(Project, Task, row=Manager, daily=True)
+async def manager_summary(request, pk):
+    if not await Manager.objects.filter(pk=pk).aexists():
+        return not_found()
+
+    return json_response(build_manager_summary(
+        pk,
+        await Project.objects.filter(manager_id=pk).aaggregate(**MANAGER_PROJECT_COUNTS),
+        [row async for row in manager_task_counts(pk)],
+        [row async for row in manager_upcoming_deadlines(pk)],
+    ))
+
+
+# TeamMember views
+@require_safe
+@conditional_get(TeamMember)
+async def team_member_list(request):
+    return json_response(await aserialize_list(TeamMember.objects.all(), TeamMemberSerializer))
+
+
+@require_safe
+@conditional_get(TeamMember, row=TeamMember)
+async def team_member_detail(request, pk):
+    data = await aserialize_one(TeamMember.objects.filter(pk=pk), TeamMemberSerializer)
+    if data is None:
+        return not_found()
+    return json_response(data)
+
+
+# Project views
+@require_safe
+@conditional_get(Project, Manager)
+async def project_list(request):
+    return await list_response(request, Project.objects.all(), ProjectSerializer)
+
+
+@require_safe
+@conditional_get(Manager, row=Project)
+async def project_detail(request, pk):
+    return await detail_response(request, Project.objects.filter(pk=pk), ProjectSerializer)
+
+
+# Task views
+@require_safe
+@conditional_get(Task, Manager)
+async def task_list(request):
+    """The task list, with the same filters as api_views.task_list"""
+    return await list_response(request, Task.objects.order_by('task_id'), TaskSerializer, filter_tasks)
+
+
+@require_safe
+@conditional_get(Manager, row=Task)
+async def task_detail(request, pk):
+    return await detail_response(request, Task.objects.filter(pk=pk), TaskSerializer)
+
+
+# Change feed
+@require_GET
+async def event_stream(request):
+    """Task and project change events for ?manager_id= and/or ?team_member_id=, as Server-Sent Events"""
+    try:
+        channels = event_channels(request.GET)
+    except ValueError as e:
+        return error_response(str(e))
+    if not isinstance(request, ASGIRequest):
+        return json_response({'error': 'The event stream is only served under ASGI (pml.asgi)'},
+                             status_code=status.HTTP_501_NOT_IMPLEMENTED)
+    response = StreamingHttpResponse(sse_stream(channels, request.headers.get('Last-Event-ID')),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
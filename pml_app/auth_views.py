@@ -1,151 +1,106 @@
+import json
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from .async_views import json_response
 from .models import Admin, Manager, TeamMember
+from .passwords import hash_password, verify_password
+from .signals import record_change
+from .tokens import issue_token
 
-@api_view(['POST'])
-def admin_login(request):
-    try:
-        admin_id = request.data.get('admin_id')
-        password = request.data.get('password')
-        
-        if admin_id is None or not password:
-            return Response(
-                {'error': 'Please provide both admin ID and password'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Try converting admin_id to integer
-        try:
-            admin_id = int(admin_id)
-        except (ValueError, TypeError):
-            return Response(
-                {'error': 'Admin ID must be a number'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Check if admin exists with provided credentials
-        try:
-            admin = Admin.objects.get(admin_id=admin_id, password=password)
-            
-            # Return success response with admin details
-            return Response({
-                'status': 'success',
-                'message': 'Login successful',
-                'data': {
-                    'admin_id': admin.admin_id,
-                    'name': admin.name
-                }
-            }, status=status.HTTP_200_OK)
-            
-        except Admin.DoesNotExist:
-            return Response(
-                {'error': 'Invalid credentials'}, 
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-            
-    except Exception as e:
-        return Response(
-            {'error': str(e)}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+async def password_matches(user, password):
+    """Check a login password, replacing a legacy plain-text one with its hash.
+    
+    The hashing runs in a thread of its own (see passwords.py), so the event
+    loop goes on serving other requests while it is computed.
+    """
+    matches, needs_upgrade = await sync_to_async(verify_password, thread_sensitive=False)(password, user.password)
+    if matches and needs_upgrade:
+        encoded = await sync_to_async(hash_password, thread_sensitive=False)(password)
+        await type(user).objects.filter(pk=user.pk).aupdate(password=encoded)
+        await sync_to_async(record_change)(type(user), [user.pk])
+    return matches
 
-@api_view(['POST'])
-def manager_login(request):
+def request_data(request):
+    """The submitted fields, from a JSON body or a form post; ValueError if malformed"""
+    if request.content_type != 'application/json':
+        return request.POST
+    data = json.loads(request.body or b'{}')
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    return data
+
+async def login(request, model, role, label, name_field):
+    """Verify `model`'s ID and password and issue a session token for `role`"""
+    id_field = model._meta.pk.name
     try:
-        manager_id = request.data.get('manager_id')
-        password = request.data.get('password')
+        try:
+            data = request_data(request)
+        except ValueError as e:
+            return json_response({'error': f'JSON parse error - {e}'}, status.HTTP_400_BAD_REQUEST)
+        user_id = data.get(id_field)
+        password = data.get('password')
         
-        if manager_id is None or not password:
-            return Response(
-                {'error': 'Please provide both manager ID and password'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if user_id is None or not password:
+            return json_response({'error': f'Please provide both {label} ID and password'},
+                                 status.HTTP_400_BAD_REQUEST)
         
-        # Try converting manager_id to integer
+        # Try converting the ID to integer
         try:
-            manager_id = int(manager_id)
+            user_id = int(user_id)
         except (ValueError, TypeError):
-            return Response(
-                {'error': 'Manager ID must be a number'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            return json_response({'error': f'{label.title()} ID must be a number'},
+                                 status.HTTP_400_BAD_REQUEST)
         
-        # Check if manager exists with provided credentials
-        try:
-            manager = Manager.objects.get(manager_id=manager_id, password=password)
-            
-            # Return success response with manager details
-            return Response({
-                'status': 'success',
-                'message': 'Login successful',
-                'data': {
-                    'manager_id': manager.manager_id,
-                    'name': manager.name
-                }
-            }, status=status.HTTP_200_OK)
-            
-        except Manager.DoesNotExist:
-            return Response(
-                {'error': 'Invalid credentials'}, 
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-            
+        # Check if the account exists with provided credentials
+        user = await model.objects.filter(pk=user_id).afirst()
+        if user is None or not await password_matches(user, password):
+            return json_response({'error': 'Invalid credentials'}, status.HTTP_401_UNAUTHORIZED)
+        
+        # Return success response with account details
+        return json_response({
+            'status': 'success',
+            'message': 'Login successful',
+            'data': {
+                id_field: user.pk,
+                'name': getattr(user, name_field),
+                'token': issue_token(role, user.pk)
+            }
+        })
+    
     except Exception as e:
-        return Response(
-            {'error': str(e)}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+        return json_response({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['POST'])
-def team_member_login(request):
-    try:
-        team_member_id = request.data.get('team_member_id')
-        password = request.data.get('password')
+# Login views are async so that password hashing does not hold a worker; under
+# WSGI each still runs in its own event loop, and waits for the hash.
+@csrf_exempt
+@require_POST
+async def admin_login(request):
+    return await login(request, Admin, 'admin', 'admin', 'name')
 
-        if team_member_id is None or not password:
-            return Response(
-                {'error': 'Please provide both team member ID and password'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        if team_member_id is None or not password:
-            return Response(
-                {'error': 'Please provide both team member ID and password'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Try converting team_member_id to integer
-        try:
-            team_member_id = int(team_member_id)
-        except (ValueError, TypeError):
-            return Response(
-                {'error': 'Team Member ID must be a number'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Check if team member exists with provided credentials
-        try:
-            team_member = TeamMember.objects.get(team_member_id=team_member_id, password=password)
-            
-            # Return success response with team member details
-            return Response({
-                'status': 'success',
-                'message': 'Login successful',
-                'data': {
-                    'team_member_id': team_member.team_member_id,
-                    'name': team_member.team_member_name
-                }
-            }, status=status.HTTP_200_OK)
-            
-        except TeamMember.DoesNotExist:
-            return Response(
-                {'error': 'Invalid credentials'}, 
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-            
-    except Exception as e:
+@csrf_exempt
+@require_POST
+async def manager_login(request):
+    return await login(request, Manager, 'manager', 'manager', 'name')
+
+@csrf_exempt
+@require_POST
+async def team_member_login(request):
+    return await login(request, TeamMember, 'team_member', 'team member', 'team_member_name')
+
+@api_view(['GET'])
+def current_session(request):
+    """Return the principal behind the request's bearer token"""
+    if not getattr(request.user, 'is_authenticated', False) or not hasattr(request.user, 'role'):
         return Response(
-            {'error': str(e)}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {'error': 'Authentication required'}, 
+            status=status.HTTP_401_UNAUTHORIZED
         )
+    
+    return Response({
+        'status': 'success',
+        'data': request.user.record
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,116 @@
+"""Response cache for single-row detail endpoints.
+
+Each row has one entry in the PML_DETAIL_CACHE cache, keyed by model and
+primary key. It holds the response data for every query string the row has
+been requested with, together with the version stamps (see versions.py)
+of the row and of the tables nested in the response at the time it was
+built. A write deletes the row's entry and bumps the stamps when it commits
+(see signals.record_change). An entry whose stamps no longer match is treated as
+a miss, which covers changes to nested rows and a reader that stored an
+entry just after a write deleted it.
+
+Hit and miss counts are kept per process and per model; detail_cache_stats()
+reports them.
+"""
+import threading
+from collections import defaultdict
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+from .versions import get_versions, replica_may_lag, row_key, table_key
+
+DETAIL_KEY_PREFIX = 'pml:detail'
+
+# Query strings stored per row; further variants are served but not cached
+MAX_VARIANTS = 8
+
+
+def detail_key(model, pk):
+    return f'{DETAIL_KEY_PREFIX}:{model._meta.db_table}:{pk}'
+
+
+def detail_cache():
+    alias = settings.PML_DETAIL_CACHE
+    return None if alias is None else caches[alias]
+
+
+class DetailCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0, 'invalidations': 0})
+
+    def add(self, model, outcome, count=1):
+        with self._lock:
+            self._counts[model._meta.db_table][outcome] += count
+
+    def snapshot(self):
+        with self._lock:
+            tables = {table: dict(counts) for table, counts in sorted(self._counts.items())}
+        for counts in tables.values():
+            lookups = counts['hits'] + counts['misses']
+            counts['hit_rate'] = round(counts['hits'] / lookups, 4) if lookups else None
+        return tables
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = DetailCacheStats()
+
+
+def detail_cache_stats():
+    return {
+        'cache': settings.PML_DETAIL_CACHE,
+        'timeout': settings.PML_DETAIL_CACHE_TIMEOUT,
+        'tables': stats.snapshot(),
+    }
+
+
+def invalidate_detail(model, pks):
+    cache = detail_cache()
+    if cache is not None and pks:
+        cache.delete_many([detail_key(model, pk) for pk in pks])
+        stats.add(model, 'invalidations', len(pks))
+
+
+def cached_detail(row, *models):
+    """Serve a detail view's 200 responses from the detail cache.
+
+    `row` is the model whose `pk` URL kwarg selects the row and `models`
+    are the other tables nested in the response, as for conditional_get.
+    Place it below @conditional_get.
+    """
+    version_keys = [table_key(model) for model in models]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cache = detail_cache()
+            if cache is None:
+                return view(request, *args, **kwargs)
+
+            pk = kwargs['pk']
+            key = detail_key(row, pk)
+            variant = '&'.join(sorted(request.GET.urlencode().split('&')))
+            entry = cache.get(key)
+            stamps = get_versions(version_keys + [row_key(row, pk)])
+            if entry is not None and entry['stamps'] == stamps and variant in entry['variants']:
+                stats.add(row, 'hits')
+                return Response(entry['variants'][variant])
+
+            stats.add(row, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK or replica_may_lag(stamps):
+                return response
+
+            if entry is None or entry['stamps'] != stamps:
+                entry = {'stamps': stamps, 'variants': {}}
+            if len(entry['variants']) < MAX_VARIANTS:
+                entry['variants'][variant] = response.data
+                cache.set(key, entry, settings.PML_DETAIL_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
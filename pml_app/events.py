@@ -0,0 +1,348 @@
+"""Change events pushed to dashboards over /api/events/ (SSE) and /api/events/ws/.
+
+Task and project writes publish an event once their transaction commits:
+task.updated and project.updated carry the row as the list endpoints render
+it without ?expand=, task.deleted and project.deleted only its primary key.
+Progress changes made by progress.py go through signals.record_change like
+every other write, so they publish project.updated too.
+
+An event goes to the channels of the people it concerns: manager:<id> for
+the task's or project's manager, and team_member:<id> for the assignee and,
+for projects, every assigned team member. When a task changes manager or
+assignee, the previous ones get its task.updated event as well. A stream subscribes to the
+channels of one manager and/or one team member.
+
+settings.PML_EVENT_BROKER picks the broker. InProcessBroker reaches the
+streams served by the process that made the write; CacheBroker fans events
+out to every worker through a shared cache. A client reconnecting with
+Last-Event-ID gets the events it missed, or a `resync` event telling it to
+reload (e.g. through /api/sync/) when they are no longer available.
+"""
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque, namedtuple
+from functools import lru_cache
+from itertools import takewhile
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+from .models import Project, ProjectTeamMember, Task
+from .projections import get_projection
+from .routers import read_from_primary
+from .serializers import ProjectSerializer, TaskSerializer
+
+Event = namedtuple('Event', ['id', 'type', 'data', 'channels'])
+
+RESYNC = 'resync'
+
+# Events a slow subscriber may have waiting before it is sent a resync instead
+MAX_PENDING = 1000
+
+# Milliseconds an EventSource waits before reconnecting
+RETRY_MS = 3000
+
+EVENT_KEY_PREFIX = 'pml:events'
+
+
+def manager_channel(manager_id):
+    return f'manager:{manager_id}'
+
+
+def team_member_channel(team_member_id):
+    return f'team_member:{team_member_id}'
+
+
+def event_channels(params):
+    """Channels for ?manager_id= and/or ?team_member_id=, raising ValueError if neither is valid"""
+    channels = set()
+    for name, channel in (('manager_id', manager_channel), ('team_member_id', team_member_channel)):
+        value = params.get(name)
+        if value:
+            if not value.isdigit():
+                raise ValueError(f'{name} must be a number')
+            channels.add(channel(int(value)))
+    if not channels:
+        raise ValueError('manager_id or team_member_id is required')
+    return frozenset(channels)
+
+
+def channels_for(manager_id, *team_member_ids):
+    channels = {team_member_channel(pk) for pk in team_member_ids if pk is not None}
+    if manager_id is not None:
+        channels.add(manager_channel(manager_id))
+    return channels
+
+
+# Brokers
+
+class QueueSubscription:
+    """An InProcessBroker subscriber; events are handed over to its event loop thread-safely"""
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's loop is gone
+            self.close()
+
+    def _put(self, event):
+        if self.queue.qsize() >= MAX_PENDING:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = Event(event.id, RESYNC, {}, self.channels)
+        self.queue.put_nowait(event)
+
+    async def next_event(self, timeout):
+        """The next event, or None when none arrives within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Delivers events to the subscribers in this process, keeping the last PML_EVENT_BACKLOG for replay"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Event IDs from another process, or from before a restart, cannot be replayed
+        self.epoch = uuid.uuid4().hex[:8]
+        self._last_seq = 0
+        self._backlog = deque(maxlen=settings.PML_EVENT_BACKLOG)
+        self._subscriptions = set()
+
+    def publish(self, channels, event_type, data):
+        with self._lock:
+            self._last_seq += 1
+            event = Event(f'{self.epoch}-{self._last_seq}', event_type, data, frozenset(channels))
+            self._backlog.append((self._last_seq, event))
+            subscribers = [s for s in self._subscriptions if s.channels & event.channels]
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    async def subscribe(self, channels, last_event_id=None):
+        """Subscribe the running event loop to `channels`, replaying the events after `last_event_id`"""
+        subscription = QueueSubscription(self, channels)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if last_event_id:
+                missed = self._missed(last_event_id, subscription.channels)
+                if missed is None:
+                    missed = [Event(f'{self.epoch}-{self._last_seq}', RESYNC, {}, subscription.channels)]
+                for event in missed:
+                    subscription.queue.put_nowait(event)
+        return subscription
+
+    def _missed(self, last_event_id, channels):
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        first_kept = self._backlog[0][0] if self._backlog else self._last_seq + 1
+        if int(seq) + 1 < first_kept:
+            return None
+        return [event for event_seq, event in self._backlog if event_seq > int(seq) and event.channels & channels]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+class PollingSubscription:
+    """A CacheBroker subscriber, polling the shared event log every PML_EVENT_POLL_SECONDS"""
+
+    def __init__(self, broker, channels, position):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.position = position
+        self.pending = deque()
+
+    async def next_event(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self.pending:
+            await self.poll()
+            remaining = deadline - loop.time()
+            if self.pending or remaining <= 0:
+                break
+            await asyncio.sleep(min(settings.PML_EVENT_POLL_SECONDS, remaining))
+        return self.pending.popleft() if self.pending else None
+
+    async def poll(self):
+        cache = self.broker.cache
+        last_seq = await cache.aget(self.broker.seq_key, 0)
+        if last_seq == self.position:
+            return
+        if last_seq < self.position or last_seq - self.position > settings.PML_EVENT_BACKLOG:
+            self.resync(last_seq)
+            return
+        keys = [self.broker.event_key(seq) for seq in range(self.position + 1, last_seq + 1)]
+        found = await cache.aget_many(keys)
+        ready = list(takewhile(lambda key: key in found, keys))
+        if any(key in found for key in keys[len(ready):]):
+            # A gap before stored events: expired, or still being stored by a racing publisher
+            self.resync(last_seq)
+            return
+        # Trailing events not stored yet are picked up by the next poll
+        self.pending.extend(found[key] for key in ready if found[key].channels & self.channels)
+        self.position += len(ready)
+
+    def resync(self, last_seq):
+        self.pending.clear()
+        self.pending.append(Event(str(last_seq), RESYNC, {}, self.channels))
+        self.position = last_seq
+
+    def close(self):
+        pass
+
+
+class CacheBroker:
+    """Publishes events to a log in the PML_EVENT_CACHE cache, which every worker's subscribers poll.
+
+    The cache must be shared by the workers and increment atomically, as
+    Redis and Memcached do; with the local-memory cache it only reaches the
+    current process.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.PML_EVENT_CACHE]
+        self.seq_key = f'{EVENT_KEY_PREFIX}:seq'
+
+    def event_key(self, seq):
+        return f'{EVENT_KEY_PREFIX}:{seq}'
+
+    def publish(self, channels, event_type, data):
+        self.cache.add(self.seq_key, 0, None)
+        seq = self.cache.incr(self.seq_key)
+        event = Event(str(seq), event_type, data, frozenset(channels))
+        self.cache.set(self.event_key(seq), event, settings.PML_EVENT_RETENTION_SECONDS)
+        return event
+
+    async def subscribe(self, channels, last_event_id=None):
+        last_seq = await self.cache.aget(self.seq_key, 0)
+        position = int(last_event_id) if last_event_id and last_event_id.isdigit() else last_seq
+        return PollingSubscription(self, channels, position)
+
+
+@lru_cache
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    return _load_broker(settings.PML_EVENT_BROKER)
+
+
+# Stream formats
+
+def sse_message(event):
+    lines = [f'id: {event.id}'] if event.id else []
+    lines.append(f'event: {event.type}')
+    lines.append(f'data: {json.dumps(event.data, cls=JSONEncoder, separators=(",", ":"))}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def json_message(event):
+    return json.dumps({'id': event.id, 'type': event.type, 'data': event.data}, cls=JSONEncoder)
+
+
+async def sse_stream(channels, last_event_id=None):
+    """Server-Sent Events for `channels`, with a comment line every PML_EVENT_HEARTBEAT_SECONDS"""
+    subscription = await get_broker().subscribe(channels, last_event_id)
+    try:
+        # Sent at once, so the client knows the stream is open and subscribed
+        yield f'retry: {RETRY_MS}\n\n'.encode()
+        while True:
+            event = await subscription.next_event(settings.PML_EVENT_HEARTBEAT_SECONDS)
+            yield b': keep-alive\n\n' if event is None else sse_message(event)
+    finally:
+        subscription.close()
+
+
+# Publishing
+
+def serialize_rows(queryset, serializer_class):
+    projection = get_projection(serializer_class, expand=set())
+    if projection is None:
+        return serializer_class(queryset, many=True, expand=set()).data
+    return projection.rows(queryset)
+
+
+def publish_changes(model, pks):
+    """Publish <task|project>.updated for the given rows once the current transaction commits"""
+    if model in (Task, Project) and pks:
+        pks = list(pks)
+        transaction.on_commit(lambda: publish_rows(model, pks))
+
+
+def publish_rows(model, pks, channels=None):
+    """Publish the rows' current state to their channels, or to `channels` when given"""
+    broker = get_broker()
+    with read_from_primary():
+        if model is Task:
+            for row in serialize_rows(Task.objects.filter(pk__in=pks).order_by('pk'), TaskSerializer):
+                broker.publish(channels or channels_for(row['manager_id'], row['team_member_id']),
+                               'task.updated', row)
+            return
+        rows = serialize_rows(Project.objects.filter(pk__in=pks).order_by('pk'), ProjectSerializer)
+        members = assigned_members([row['project_id'] for row in rows])
+    for row in rows:
+        channels = channels_for(row['manager_id'], row['team_member_id'], *members.get(row['project_id'], ()))
+        broker.publish(channels, 'project.updated', row)
+
+
+def assigned_members(project_ids):
+    members = {}
+    for project_id, team_member_id in (ProjectTeamMember.objects.filter(project_id__in=project_ids)
+                                       .values_list('project_id', 'team_member_id')):
+        members.setdefault(project_id, []).append(team_member_id)
+    return members
+
+
+def task_reassigned(sender, instance, created, **kwargs):
+    # The previous manager and assignee also get the update, so their dashboards drop the task
+    previous = getattr(instance, '_assigned_to', None)
+    current = (instance.manager_id, instance.team_member_id)
+    instance._assigned_to = current
+    if created or previous is None or previous == current:
+        return
+    left = channels_for(*previous) - channels_for(*current)
+    if left:
+        pk = instance.pk
+        transaction.on_commit(lambda: publish_rows(Task, [pk], left))
+
+
+def remember_project_members(sender, instance, **kwargs):
+    # The assignments are deleted (cascade) before the project's post_delete runs
+    instance._event_members = assigned_members([instance.pk]).get(instance.pk, [])
+
+
+def publish_deleted(sender, instance, **kwargs):
+    if sender is Task:
+        channels = channels_for(instance.manager_id, instance.team_member_id)
+        event_type, data = 'task.deleted', {'task_id': instance.pk}
+    else:
+        channels = channels_for(instance.manager_id, instance.team_member_id,
+                                *getattr(instance, '_event_members', ()))
+        event_type, data = 'project.deleted', {'project_id': instance.pk}
+    transaction.on_commit(lambda: get_broker().publish(channels, event_type, data))
+
+
+post_save.connect(task_reassigned, sender=Task, dispatch_uid='events-task-reassigned')
+pre_delete.connect(remember_project_members, sender=Project, dispatch_uid='events-project-members')
+post_delete.connect(publish_deleted, sender=Task, dispatch_uid='events-task-deleted')
+post_delete.connect(publish_deleted, sender=Project, dispatch_uid='events-project-deleted')
@@ -0,0 +1,108 @@
+"""Hi/lo primary key allocation for models numbered by the application.
+
+Each process reserves a block of IDs from the `id_sequences` table in one
+short transaction and then hands them out from memory, so inserts no longer
+read the current maximum first and concurrent creates cannot pick the same
+key. IDs keep increasing from the existing maximum, but a block left unused
+when a process exits leaves a gap.
+"""
+import threading
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from .models import IdSequence
+
+_blocks = {}  # sequence name -> [next, limit)
+_lock = threading.Lock()
+# Keys tried by save_with_next_id() before a duplicate is reported
+ID_ATTEMPTS = 3
+
+
+def _sequence_name(model):
+    return model._meta.db_table
+
+
+def _reserve_block(model, size):
+    name = _sequence_name(model)
+    with transaction.atomic():
+        sequence = IdSequence.objects.select_for_update().filter(name=name).first()
+        if sequence is None:
+            # First use of this sequence: continue after the highest existing key
+            current_max = model.objects.aggregate(value=Max(model._meta.pk.name))['value'] or 0
+            try:
+                with transaction.atomic():
+                    sequence = IdSequence.objects.create(name=name, next_value=current_max + 1)
+            except IntegrityError:
+                # Another process seeded it first
+                sequence = IdSequence.objects.select_for_update().get(name=name)
+        start = sequence.next_value
+        IdSequence.objects.filter(name=name).update(next_value=start + size)
+    return [start, start + size]
+
+
+def next_id(model):
+    """Return an unused primary key for `model`"""
+    name = _sequence_name(model)
+    with _lock:
+        block = _blocks.get(name)
+        if block is None or block[0] >= block[1]:
+            block = _blocks[name] = _reserve_block(model, getattr(settings, 'PML_ID_BLOCK_SIZE', 20))
+        value = block[0]
+        block[0] += 1
+    return value
+
+
+def advance_past(model, value):
+    """Keep the sequence ahead of a key the client supplied explicitly.
+    
+    Only this process drops a block that holds `value`; other processes may
+    still hand it out, which save_with_next_id() recovers from.
+    """
+    name = _sequence_name(model)
+    IdSequence.objects.filter(name=name, next_value__lte=value).update(next_value=value + 1)
+    with _lock:
+        block = _blocks.get(name)
+        if block is not None and block[0] <= value < block[1]:
+            del _blocks[name]
+
+
+def _discard_block(model):
+    with _lock:
+        _blocks.pop(_sequence_name(model), None)
+
+
+def save_with_next_id(serializer_class, data):
+    """Validate and save `data` under a newly allocated primary key.
+    
+    Returns the serializer, saved if it was valid. A key another process
+    already gave to an explicit-ID create fails as a duplicate; the rest of
+    the block is then dropped and the save retried with a key from a fresh
+    one, which starts past every explicit key (see advance_past).
+    """
+    model = serializer_class.Meta.model
+    pk_name = model._meta.pk.name
+    for attempt in range(ID_ATTEMPTS):
+        last_attempt = attempt == ID_ATTEMPTS - 1
+        data[pk_name] = next_id(model)
+        serializer = serializer_class(data=data)
+        if not serializer.is_valid():
+            if pk_name in serializer.errors and not last_attempt:
+                _discard_block(model)
+                continue
+            return serializer
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            # Taken between the validation and the insert
+            if last_attempt or not model.objects.filter(pk=data[pk_name]).exists():
+                raise
+            _discard_block(model)
+            continue
+        return serializer
+
+
+def reset_id_blocks():
+    """Forget the blocks reserved by this process (used by tests)"""
+    with _lock:
+        _blocks.clear()
@@ -0,0 +1,107 @@
+"""Structured, non-blocking logging.
+
+Records are tagged with the current request ID on the calling thread and
+put on a bounded in-memory queue. A listener thread per handler formats
+them as JSON and does the actual I/O, so a slow terminal or disk never
+holds up a request. When the queue is full, records are dropped and
+counted instead of blocking the caller.
+
+Handlers are declared in settings.LOGGING, for example:
+
+    'console': {
+        '()': 'pml_app.log.BackgroundHandler',
+        'handler_class': 'logging.StreamHandler',
+        'formatter': 'json',
+        'filters': ['request_context'],
+    }
+"""
+import copy
+import json
+import logging
+import queue
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from django.utils.module_loading import import_string
+
+request_id_var = ContextVar('pml_request_id', default=None)
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the ID of the request being handled, if any"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: the standard fields followed by any extra={...} fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """Queues records for a wrapped handler that runs on its own listener thread"""
+
+    def __init__(self, handler_class, handler_options=None, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = import_string(handler_class)(**(handler_options or {}))
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self.running = True
+
+    def setFormatter(self, fmt):
+        # Formatting is the expensive part, so it belongs to the target on the listener thread
+        self.target.setFormatter(fmt)
+
+    def setLevel(self, level):
+        super().setLevel(level)
+        self.target.setLevel(level)
+
+    def prepare(self, record):
+        # Resolve the message now, while its arguments still hold the values being logged
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued record has been written by the target"""
+        if self.running:
+            self.listener.stop()
+            self.listener.start()
+        self.target.flush()
+
+    def close(self):
+        # logging.shutdown() calls this at exit, which drains whatever is still queued
+        if self.running:
+            self.listener.stop()
+            self.running = False
+        self.target.close()
+        super().close()
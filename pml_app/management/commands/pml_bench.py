@@ -0,0 +1,385 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import QueryDict
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from pml_app import urls as pml_urls
+from pml_app.events import event_channels, get_broker
+from pml_app.ids import next_id, reset_id_blocks
+from pml_app.middleware import RequestTimings
+from pml_app.sync import encode_token
+from pml_app.tokens import issue_token
+from pml_app.models import User, Admin, Manager, TeamMember, Project, Task, Help, ProjectTeamMember
+
+BENCH_PASSWORD = 'bench-password'
+
+# args() and body(*args) are called per request, body receiving the resolved URL args; query is a dict or a callable returning one;
+# form sends the body form-encoded instead of JSON; headers() returns extra request headers;
+# events > 0 opens an event stream over ASGI, publishes that many events to it and reads them back
+Route = namedtuple('Route', 'name method args body query form headers events',
+                   defaults=(None, None, None, False, None, 0))
+
+# Seconds to wait for each event before the stream read counts as failed
+EVENT_TIMEOUT = 5
+
+
+class Command(BaseCommand):
+    help = ('Seed a synthetic dataset into a throwaway database and report per-endpoint '
+            'latency percentiles, query counts, SQL time and response sizes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--managers', type=int, default=20)
+        parser.add_argument('--team-members', type=int, default=200)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--help-requests', type=int, default=500)
+        parser.add_argument('--iterations', type=int, default=30, help='Requests per endpoint')
+        parser.add_argument('--only', default='', help='Only run routes whose name contains this text')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+
+    def handle(self, *args, **options):
+        # Server errors are reported in the status column rather than as tracebacks
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with throwaway_database():
+                self.random = random.Random(options['seed'])
+                self.seed(options)
+                results = self.run_routes(options)
+        finally:
+            request_logger.setLevel(previous_level)
+
+        self.print_table(results)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump({'dataset': self.dataset, 'results': results}, output, indent=2)
+            self.stdout.write(f"Wrote {options['json_path']}")
+
+    def seed(self, options):
+        password = make_password(BENCH_PASSWORD)
+        self.dataset = {key: options[key] for key in
+                        ('managers', 'team_members', 'projects', 'tasks', 'help_requests')}
+        rng = self.random
+
+        Admin.objects.create(admin_id=1, name='Bench Admin', password=password)
+        managers = Manager.objects.bulk_create(
+            Manager(manager_id=i, name=f'Manager {i}', password=password)
+            for i in range(1, options['managers'] + 1)
+        )
+        members = TeamMember.objects.bulk_create(
+            TeamMember(team_member_id=i, team_member_name=f'Member {i}', password=password, position='Developer')
+            for i in range(1, options['team_members'] + 1)
+        )
+        projects = Project.objects.bulk_create(
+            Project(project_id=i, project_name=f'Project {i}', description='Synthetic benchmark project',
+                    manager=rng.choice(managers), progress=rng.randint(0, 100))
+            for i in range(1, options['projects'] + 1)
+        )
+        Task.objects.bulk_create(
+            Task(task_name=f'Task {i}', manager=rng.choice(managers),
+                 team_member_id=rng.choice(members).team_member_id,
+                 priority=rng.choice(Task.PRIORITY_CHOICES)[0], status=rng.choice(Task.STATUS_CHOICES)[0])
+            for i in range(options['tasks'])
+        )
+        ProjectTeamMember.objects.bulk_create(
+            ProjectTeamMember(project=project, team_member=member)
+            for project in projects
+            for member in rng.sample(members, min(5, len(members)))
+        )
+        Help.objects.bulk_create(
+            Help(help_id=i, name=f'Requester {i}', email=f'user{i}@example.com', number='5550100',
+                 subject=f'Issue {i}', description='Synthetic help request')
+            for i in range(1, options['help_requests'] + 1)
+        )
+        users = User.objects.bulk_create(User(name=f'User {i}', number='5550100') for i in range(100))
+
+        self.manager_ids = [manager.manager_id for manager in managers]
+        self.member_ids = [member.team_member_id for member in members]
+        self.project_ids = [project.project_id for project in projects]
+        self.task_ids = list(Task.objects.values_list('task_id', flat=True))
+        self.user_ids = [user.pk for user in users] or list(User.objects.values_list('pk', flat=True))
+        self.seeded_at = timezone.now()
+
+    # Rows created outside the timed request, for routes that consume one per call
+
+    def fresh_user(self):
+        return User.objects.create(name='Disposable', number='0').pk
+
+    def fresh_help(self):
+        return Help.objects.create(help_id=next_id(Help), name='Disposable', email='d@example.com',
+                                   number='0', subject='Disposable').pk
+
+    def fresh_admin(self):
+        return Admin.objects.create(admin_id=next_id(Admin), name='Disposable', password='x').pk
+
+    def fresh_manager(self):
+        return Manager.objects.create(manager_id=next_id(Manager), name='Disposable', password='x').pk
+
+    def fresh_member(self):
+        return TeamMember.objects.create(team_member_id=next_id(TeamMember), team_member_name='Disposable',
+                                         password='x').pk
+
+    def fresh_project(self):
+        return Project.objects.create(project_id=next_id(Project), project_name='Disposable').pk
+
+    def fresh_task(self):
+        return Task.objects.create(task_name='Disposable').pk
+
+    def fresh_assignment(self):
+        return ProjectTeamMember.objects.create(project_id=self.pick(self.project_ids),
+                                                team_member_id=self.fresh_member()).pk
+
+    def pick(self, ids):
+        return self.random.choice(ids)
+
+    def routes(self):
+        pick = self.pick
+        return [
+            Route('home', 'GET'),
+            Route('insertuser', 'POST', body=lambda *args: {'name': 'Form user', 'number': '1'}, form=True),
+            Route('viewuser', 'GET'),
+            Route('about', 'GET'),
+            Route('services', 'GET'),
+            Route('contact', 'GET'),
+            Route('api-overview', 'GET'),
+
+            Route('user-list', 'GET'),
+            Route('user-list', 'GET', query={'stream': 1}),
+            Route('user-detail', 'GET', args=lambda: [pick(self.user_ids)]),
+            Route('user-create', 'POST', body=lambda *args: {'name': 'New user', 'number': '1'}),
+            Route('user-update', 'PUT', args=lambda: [self.fresh_user()], body=lambda *args: {'name': 'Renamed', 'number': '2'}),
+            Route('user-delete', 'DELETE', args=lambda: [self.fresh_user()]),
+
+            Route('help-list', 'GET'),
+            Route('help-list', 'GET', query={'stream': 1}),
+            Route('help-search', 'GET', query=lambda: {'q': f"Issue {pick(range(1, self.dataset['help_requests'] + 1))}"}),
+            Route('help-search', 'GET', query={'q': 'synthetic request', 'page': 2}),
+            Route('help-detail', 'GET', args=lambda: [pick(range(1, self.dataset['help_requests'] + 1))]),
+            Route('help-create', 'POST', body=lambda *args: {'name': 'Bench', 'email': 'b@example.com',
+                                                       'number': '1', 'subject': 'Benchmark'}),
+            Route('help-update', 'PUT', args=lambda: [self.fresh_help()],
+                  body=lambda pk: {'help_id': pk, 'name': 'Bench', 'email': 'b@example.com', 'number': '1',
+                                   'subject': 'Updated'}),
+            Route('help-delete', 'DELETE', args=lambda: [self.fresh_help()]),
+
+            Route('admin-list', 'GET'),
+            Route('admin-detail', 'GET', args=lambda: [1]),
+            Route('admin-stats', 'GET'),
+            Route('detail-cache-stats', 'GET'),
+            Route('admin-create', 'POST', body=lambda *args: {'name': 'Bench admin', 'password': BENCH_PASSWORD}),
+            Route('admin-update', 'PUT', args=lambda: [self.fresh_admin()],
+                  body=lambda pk: {'admin_id': pk, 'name': 'Renamed', 'password': BENCH_PASSWORD}),
+            Route('admin-delete', 'DELETE', args=lambda: [self.fresh_admin()]),
+
+            Route('manager-list', 'GET'),
+            Route('manager-detail', 'GET', args=lambda: [pick(self.manager_ids)]),
+            Route('manager-summary', 'GET', args=lambda: [pick(self.manager_ids)]),
+            Route('manager-create', 'POST', body=lambda *args: {'name': 'Bench manager', 'password': BENCH_PASSWORD}),
+            Route('manager-update', 'PUT', args=lambda: [self.fresh_manager()],
+                  body=lambda pk: {'manager_id': pk, 'name': 'Renamed', 'password': BENCH_PASSWORD}),
+            Route('manager-delete', 'DELETE', args=lambda: [self.fresh_manager()]),
+
+            Route('team-member-list', 'GET'),
+            Route('team-member-detail', 'GET', args=lambda: [pick(self.member_ids)]),
+            Route('team-member-create', 'POST',
+                  body=lambda *args: {'team_member_name': 'Bench member', 'password': BENCH_PASSWORD}),
+            Route('team-member-update', 'PUT', args=lambda: [self.fresh_member()],
+                  body=lambda pk: {'team_member_id': pk, 'team_member_name': 'Renamed', 'password': BENCH_PASSWORD}),
+            Route('team-member-delete', 'DELETE', args=lambda: [self.fresh_member()]),
+
+            Route('project-list', 'GET'),
+            Route('project-list', 'GET', query={'expand': 'manager'}),
+            Route('project-list', 'GET', query={'stream': 1}),
+            Route('project-detail', 'GET', args=lambda: [pick(self.project_ids)]),
+            Route('project-create', 'POST',
+                  body=lambda *args: {'project_name': 'Bench project', 'manager_id': pick(self.manager_ids)}),
+            Route('project-update', 'PATCH', args=lambda: [pick(self.project_ids)],
+                  body=lambda *args: {'progress': self.random.randint(0, 100)}),
+            Route('project-delete', 'DELETE', args=lambda: [self.fresh_project()]),
+
+            Route('task-list', 'GET'),
+            Route('task-list', 'GET', query={'expand': 'manager'}),
+            Route('task-list', 'GET', query={'stream': 1}),
+            Route('task-list', 'GET', query={'page_size': 50}),
+            Route('task-list', 'GET', query=lambda: {'manager_id': pick(self.manager_ids), 'status': 'in_progress'}),
+            Route('task-detail', 'GET', args=lambda: [pick(self.task_ids)]),
+            Route('task-create', 'POST', body=lambda *args: {'task_name': 'Bench task', 'manager_id': pick(self.manager_ids),
+                                                       'team_member_id': pick(self.member_ids)}),
+            Route('task-bulk-create', 'POST',
+                  body=lambda *args: {'tasks': [{'task_name': f'Bulk {n}', 'manager_id': pick(self.manager_ids)}
+                                          for n in range(50)]}),
+            Route('task-update', 'PUT', args=lambda: [pick(self.task_ids)],
+                  body=lambda *args: {'task_name': 'Updated', 'status': 'completed'}),
+            Route('task-delete', 'DELETE', args=lambda: [self.fresh_task()]),
+
+            Route('project-team-member-list', 'GET'),
+            Route('project-team-member-list', 'GET', query={'expand': 'project,team_member'}),
+            Route('project-team-members-by-project', 'GET', args=lambda: [pick(self.project_ids)]),
+            Route('project-team-members-by-project', 'PUT', args=lambda: [pick(self.project_ids)],
+                  body=lambda *args: {'team_member_ids': self.random.sample(self.member_ids, min(5, len(self.member_ids)))}),
+            Route('project-team-member-create', 'POST',
+                  body=lambda *args: {'project_id': pick(self.project_ids), 'team_member_id': self.fresh_member()}),
+            Route('project-team-member-bulk-create', 'POST',
+                  body=lambda *args: {'project_id': pick(self.project_ids),
+                                'team_member_ids': [self.fresh_member() for _ in range(20)]}),
+            Route('project-team-member-delete', 'DELETE', args=lambda: [self.fresh_assignment()]),
+
+            Route('sync', 'GET'),
+            # Incremental syncs pick up the rows the routes above wrote after seeding
+            Route('sync', 'GET', query=lambda: {'since': encode_token(self.seeded_at)}),
+            Route('sync', 'GET', query=lambda: {'since': encode_token(self.seeded_at), 'tables': 'tasks,projects'}),
+
+            # ASGI variants of the dashboard reads; the test client runs each in its own event loop
+            Route('async-manager-list', 'GET'),
+            Route('async-manager-detail', 'GET', args=lambda: [pick(self.manager_ids)]),
+            Route('async-manager-summary', 'GET', args=lambda: [pick(self.manager_ids)]),
+            Route('async-team-member-list', 'GET'),
+            Route('async-team-member-detail', 'GET', args=lambda: [pick(self.member_ids)]),
+            Route('async-project-list', 'GET'),
+            Route('async-project-list', 'GET', query={'expand': 'manager'}),
+            Route('async-project-detail', 'GET', args=lambda: [pick(self.project_ids)]),
+            Route('async-task-list', 'GET'),
+            Route('async-task-list', 'GET', query=lambda: {'manager_id': pick(self.manager_ids), 'status': 'in_progress'}),
+            Route('async-task-detail', 'GET', args=lambda: [pick(self.task_ids)]),
+
+            Route('event-stream', 'GET', query=lambda: {'manager_id': pick(self.manager_ids)}, events=1),
+            Route('event-stream', 'GET', query=lambda: {'team_member_id': pick(self.member_ids)}, events=10),
+
+            Route('admin-login', 'POST', body=lambda *args: {'admin_id': 1, 'password': BENCH_PASSWORD}),
+            Route('manager-login', 'POST',
+                  body=lambda *args: {'manager_id': pick(self.manager_ids), 'password': BENCH_PASSWORD}),
+            Route('team-member-login', 'POST',
+                  body=lambda *args: {'team_member_id': pick(self.member_ids), 'password': BENCH_PASSWORD}),
+            Route('current-session', 'GET', headers=lambda: {
+                'Authorization': f"Bearer {issue_token('manager', pick(self.manager_ids))}"}),
+        ]
+
+    def run_routes(self, options):
+        client = Client(raise_request_exception=False)
+        routes = [route for route in self.routes() if options['only'] in route.name]
+
+        covered = {route.name for route in self.routes()}
+        for pattern in pml_urls.urlpatterns:
+            if pattern.name and pattern.name not in covered:
+                self.stderr.write(f'No benchmark defined for route {pattern.name}')
+
+        results = []
+        for route in routes:
+            samples = [self.request(client, route) for _ in range(options['iterations'])]
+            latencies = sorted(sample['latency_ms'] for sample in samples)
+            results.append({
+                'route': route.name,
+                'method': route.method,
+                'query': '<varies>' if callable(route.query) else urlencode(route.query or {}),
+                'status': sorted({sample['status'] for sample in samples}),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'queries': max(sample['queries'] for sample in samples),
+                'sql_ms': round(sum(sample['sql_ms'] for sample in samples) / len(samples), 3),
+                'bytes': round(sum(sample['bytes'] for sample in samples) / len(samples)),
+            })
+        return results
+
+    def request(self, client, route):
+        # Everything needed to build the request (including disposable rows) happens before timing
+        args = route.args() if route.args else []
+        path = reverse(route.name, args=args)
+        query = route.query() if callable(route.query) else route.query
+        if query:
+            path = f'{path}?{urlencode(query)}'
+        body = route.body(*args) if route.body else None
+        if route.form:
+            content_type, data = 'application/x-www-form-urlencoded', urlencode(body or {})
+        else:
+            content_type, data = 'application/json', json.dumps(body) if body is not None else ''
+
+        # Timed with perf_counter; captured_queries only keeps whole milliseconds
+        timings = RequestTimings()
+        with connection.execute_wrapper(timings):
+            start = time.perf_counter()
+            if route.events:
+                response, content = async_to_sync(self.read_events)(
+                    path, event_channels(QueryDict(urlencode(query))), route.events)
+            else:
+                response = client.generic(route.method, path, data=data, content_type=content_type,
+                                          headers=route.headers() if route.headers else None)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - start
+
+        return {
+            'status': response.status_code,
+            'latency_ms': elapsed * 1000,
+            'queries': len(timings.queries),
+            'sql_ms': timings.sql_time * 1000,
+            'bytes': len(content),
+        }
+
+    async def read_events(self, path, channels, count):
+        """Open the event stream, publish `count` events to it and read them back, then disconnect"""
+        response = await AsyncClient(raise_request_exception=False).get(path)
+        if not response.streaming:
+            return response, response.content
+        stream = response.streaming_content
+        try:
+            # The retry line shows the subscription is in place
+            chunks = [await asyncio.wait_for(anext(stream), EVENT_TIMEOUT)]
+            broker = get_broker()
+            for n in range(count):
+                broker.publish(channels, 'task.updated', {'task_id': n})
+                chunks.append(await asyncio.wait_for(anext(stream), EVENT_TIMEOUT))
+        finally:
+            await stream.aclose()
+        return response, b''.join(chunks)
+
+    def print_table(self, results):
+        header = f"{'route':<34}{'method':<8}{'query':<26}{'status':<10}{'p50 ms':>9}{'p95 ms':>9}" \
+                 f"{'p99 ms':>9}{'queries':>9}{'sql ms':>9}{'bytes':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in results:
+            self.stdout.write(
+                f"{row['route']:<34}{row['method']:<8}{row['query'][:25]:<26}"
+                f"{','.join(map(str, row['status'])):<10}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+                f"{row['p99_ms']:>9.2f}{row['queries']:>9}{row['sql_ms']:>9.2f}{row['bytes']:>10}"
+            )
+
+
+@contextmanager
+def throwaway_database():
+    """Run the block against a freshly created test database, leaving the configured one untouched"""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        cache.clear()
+        reset_id_blocks()
+        yield
+    finally:
+        reset_id_blocks()
+        cache.clear()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return round(sorted_values[rank - 1], 3)
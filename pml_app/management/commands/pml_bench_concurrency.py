@@ -0,0 +1,183 @@
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urljoin, urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from .pml_bench import percentile
+
+# Dashboard reads, relative to each target's API root
+DEFAULT_PATHS = [
+    'managers/1/summary/',
+    'tasks/?manager_id=1',
+    'tasks/1/',
+    'projects/?fields=project_id,project_name,progress,deadline',
+    'projects/1/',
+    'team-members/',
+]
+
+
+class Command(BaseCommand):
+    help = ('Hold many concurrent keep-alive clients against running servers and report '
+            'sustained requests/sec and latency percentiles per target.\n\n'
+            'Run the same settings and database behind both servers, for example:\n'
+            '  gunicorn pml.wsgi -w 4 --threads 8 -b 127.0.0.1:8000\n'
+            '  uvicorn pml.asgi:application --workers 4 --port 8001\n'
+            '  manage.py pml_bench_concurrency --target wsgi=http://127.0.0.1:8000/api/ '
+            '--target asgi=http://127.0.0.1:8001/api/async/\n'
+            'Run the client on another machine, or at least other cores, than the servers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='NAME=API_ROOT',
+                            help='Server to load, e.g. asgi=http://127.0.0.1:8001/api/async/ (repeatable)')
+        parser.add_argument('--path', action='append', dest='paths', metavar='PATH',
+                            help='Path under the API root to request; repeatable, defaults to the dashboard reads')
+        parser.add_argument('--clients', type=int, default=500, help='Concurrent connections per target')
+        parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds per target')
+        parser.add_argument('--warmup', type=float, default=5.0, help='Unmeasured seconds before each run')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a request counts as failed')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the request mix')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, root = target.partition('=')
+            if not sep or urlsplit(root).scheme != 'http' or not urlsplit(root).hostname:
+                raise CommandError(f'--target must look like NAME=http://host:port/api/, got {target!r}')
+            targets.append((name, root if root.endswith('/') else root + '/'))
+
+        results = []
+        for name, root in targets:
+            self.stdout.write(f"{name}: {options['clients']} clients for {options['duration']:g}s "
+                              f"(+{options['warmup']:g}s warmup) against {root}")
+            run = LoadRun(root, options['paths'] or DEFAULT_PATHS, options)
+            results.append({'target': name, 'url': root, **asyncio.run(run.run())})
+
+        self.print_table(results)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Wrote {options['json_path']}")
+
+    def print_table(self, results):
+        header = f"{'target':<12}{'clients':>8}{'requests':>10}{'req/s':>10}{'errors':>8}{'non-2xx':>9}" \
+                 f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in results:
+            self.stdout.write(
+                f"{row['target']:<12}{row['clients']:>8}{row['requests']:>10}{row['requests_per_sec']:>10.1f}"
+                f"{row['errors']:>8}{row['non_2xx']:>9}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+                f"{row['p99_ms']:>9.2f}{row['max_ms']:>9.2f}"
+            )
+
+
+class LoadRun:
+    """One target's run: `clients` connections, each sending its next request as soon as the last completes"""
+
+    def __init__(self, root, paths, options):
+        parts = urlsplit(root)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.host_header = parts.netloc
+        self.requests = [self.request_bytes(urljoin(root, path)) for path in paths]
+        self.clients = options['clients']
+        self.duration = options['duration']
+        self.warmup = options['warmup']
+        self.timeout = options['timeout']
+        self.random = random.Random(options['seed'])
+        self.latencies = []
+        self.errors = 0
+        self.non_2xx = 0
+
+    def request_bytes(self, url):
+        parts = urlsplit(url)
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        return (f'GET {target} HTTP/1.1\r\nHost: {self.host_header}\r\n'
+                f'Accept: application/json\r\nConnection: keep-alive\r\n\r\n').encode()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.measure_from = loop.time() + self.warmup
+        self.stop_at = self.measure_from + self.duration
+        await asyncio.gather(*(self.client(index) for index in range(self.clients)))
+
+        latencies = sorted(self.latencies)
+        return {
+            'clients': self.clients,
+            'duration_s': self.duration,
+            'requests': len(latencies),
+            'requests_per_sec': round(len(latencies) / self.duration, 1),
+            'errors': self.errors,
+            'non_2xx': self.non_2xx,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+    async def client(self, index):
+        loop = asyncio.get_running_loop()
+        # Stagger connection setup so the run does not open with one big accept storm
+        await asyncio.sleep(index * min(self.warmup, 1.0) / self.clients)
+        order = list(self.requests)
+        self.random.shuffle(order)
+        reader = writer = None
+        sent = 0
+        while loop.time() < self.stop_at:
+            request = order[sent % len(order)]
+            sent += 1
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout)
+                writer.write(request)
+                status, keep_alive = await asyncio.wait_for(read_response(reader), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError, ValueError):
+                if loop.time() >= self.measure_from:
+                    self.errors += 1
+                writer = close(writer)
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if self.measure_from <= loop.time() < self.stop_at:
+                self.latencies.append(elapsed_ms)
+                if not 200 <= status < 300:
+                    self.non_2xx += 1
+            if not keep_alive:
+                writer = close(writer)
+        close(writer)
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response, returning (status, whether the connection stays open)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif status not in (204, 304):
+        # No framing: the body runs until the server closes the connection
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+def close(writer):
+    if writer is not None:
+        writer.close()
+    return None
@@ -0,0 +1,75 @@
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from pml_app.models import Manager, TeamMember, Project, Task
+from pml_app.projections import get_projection
+from pml_app.serializers import ProjectSerializer, TaskSerializer, TeamMemberSerializer
+from .pml_bench import throwaway_database
+
+
+class Command(BaseCommand):
+    help = ('Compare rows/sec of the ModelSerializer and projection read paths. '
+            'Seeds rows into a throwaway database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows seeded per table')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (best is reported)')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.seed(options['rows'])
+            self.run_cases(options['repeat'])
+
+    def seed(self, rows):
+        managers = Manager.objects.bulk_create(
+            Manager(manager_id=i, name=f'Manager {i}', password='x') for i in range(1, max(rows // 50, 1) + 1)
+        )
+        TeamMember.objects.bulk_create(
+            TeamMember(team_member_id=i, team_member_name=f'Member {i}', password='x', position='Dev')
+            for i in range(1, rows + 1)
+        )
+        Project.objects.bulk_create(
+            Project(project_id=i, project_name=f'Project {i}', description='Benchmark project',
+                    manager=managers[i % len(managers)], progress=i % 101)
+            for i in range(1, rows + 1)
+        )
+        Task.objects.bulk_create(
+            Task(task_name=f'Task {i}', manager=managers[i % len(managers)], team_member_id=i)
+            for i in range(1, rows + 1)
+        )
+
+    def run_cases(self, repeat):
+        renderer = JSONRenderer()
+        cases = [
+            ('team members', TeamMemberSerializer, TeamMember.objects.all(), {}),
+            ('projects', ProjectSerializer, Project.objects.all(), {'expand': set()}),
+            ('projects ?expand=manager', ProjectSerializer, Project.objects.select_related('manager'),
+             {'expand': {'manager'}}),
+            ('tasks', TaskSerializer, Task.objects.all(), {'expand': set()}),
+            ('tasks ?expand=manager', TaskSerializer, Task.objects.select_related('manager'),
+             {'expand': {'manager'}}),
+        ]
+        self.stdout.write(f"{'case':<28}{'rows':>8}{'serializer rows/s':>20}{'projection rows/s':>20}{'speedup':>10}")
+        for name, serializer_class, queryset, serializer_options in cases:
+            projection = get_projection(serializer_class, **serializer_options)
+            count = queryset.count()
+            
+            def serializer_path():
+                return renderer.render(serializer_class(queryset.all(), many=True, **serializer_options).data)
+            
+            def projection_path():
+                return renderer.render(projection.rows(queryset.all()))
+            
+            if serializer_path() != projection_path():
+                self.stderr.write(f'{name}: outputs differ')
+            slow = self.best_time(serializer_path, repeat)
+            fast = self.best_time(projection_path, repeat)
+            self.stdout.write(f'{name:<28}{count:>8}{count / slow:>20,.0f}{count / fast:>20,.0f}{slow / fast:>9.1f}x')
+
+    def best_time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,112 @@
+import gzip
+import json
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from pml_app.models import Manager, TeamMember, Project, Task, ProjectTeamMember
+from .pml_bench import throwaway_database
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = ('Compare response size, server time and estimated transfer time of the large list '
+            'endpoints as JSON and MessagePack, uncompressed, gzipped and brotli-compressed. '
+            'Seeds rows into a throwaway database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Tasks and project assignments seeded')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per case (median is reported)')
+        parser.add_argument('--bandwidth-mbps', type=float, default=10.0,
+                            help='Link speed used to estimate transfer time, in megabits per second')
+
+    def handle(self, *args, **options):
+        if msgpack is None or brotli is None:
+            missing = ', '.join(name for name, module in (('msgpack', msgpack), ('brotli', brotli)) if module is None)
+            self.stdout.write(f'Not installed, skipped: {missing}')
+        with throwaway_database():
+            self.seed(options['rows'])
+            self.run_cases(options)
+
+    def seed(self, rows):
+        managers = Manager.objects.bulk_create(
+            Manager(manager_id=i, name=f'Manager {i}', password='x') for i in range(1, max(rows // 50, 1) + 1)
+        )
+        members = TeamMember.objects.bulk_create(
+            TeamMember(team_member_id=i, team_member_name=f'Member {i}', password='x', position='Developer')
+            for i in range(1, max(rows // 10, 1) + 1)
+        )
+        projects = Project.objects.bulk_create(
+            Project(project_id=i, project_name=f'Project {i}', description='Benchmark project',
+                    manager=managers[i % len(managers)], progress=i % 101)
+            for i in range(1, max(rows // 20, 1) + 1)
+        )
+        Task.objects.bulk_create(
+            Task(task_name=f'Task {i}', manager=managers[i % len(managers)],
+                 team_member_id=members[i % len(members)].team_member_id, project=projects[i % len(projects)])
+            for i in range(rows)
+        )
+        ProjectTeamMember.objects.bulk_create(
+            ProjectTeamMember(project=projects[i // len(members) % len(projects)], team_member=members[i % len(members)])
+            for i in range(min(rows, len(projects) * len(members)))
+        )
+
+    def run_cases(self, options):
+        client = Client()
+        endpoints = [
+            ('tasks', reverse('task-list'), {}),
+            ('tasks ?expand=manager', reverse('task-list'), {'expand': 'manager'}),
+            ('assignments', reverse('project-team-member-list'), {}),
+            ('assignments ?expand=all', reverse('project-team-member-list'), {'expand': 'project,team_member'}),
+        ]
+        formats = [('json', 'application/json')] + ([('msgpack', 'application/msgpack')] if msgpack else [])
+        encodings = ['identity', 'gzip'] + (['br'] if brotli else [])
+        bytes_per_ms = options['bandwidth_mbps'] * 1_000_000 / 8 / 1000
+
+        header = f"{'endpoint':<26}{'format':<9}{'encoding':<10}{'bytes':>10}{'ratio':>8}" \
+                 f"{'server ms':>11}{'transfer ms':>13}{'total ms':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, path, params in endpoints:
+            baseline = None
+            expected = None
+            for format_name, media_type in formats:
+                for encoding in encodings:
+                    timings = []
+                    for _ in range(options['repeat']):
+                        start = time.perf_counter()
+                        response = client.get(path, params, HTTP_ACCEPT=media_type, HTTP_ACCEPT_ENCODING=encoding)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    body = response.content
+                    data = decode(body, response.get('Content-Encoding', 'identity'), format_name)
+                    if expected is None:
+                        expected, baseline = data, len(body)
+                    elif data != expected:
+                        self.stderr.write(f'{name} {format_name} {encoding}: decoded data differs from JSON')
+                    server_ms = statistics.median(timings)
+                    transfer_ms = len(body) / bytes_per_ms
+                    self.stdout.write(
+                        f"{name:<26}{format_name:<9}{response.get('Content-Encoding', 'identity'):<10}"
+                        f"{len(body):>10,}{baseline / len(body):>7.1f}x{server_ms:>11.1f}{transfer_ms:>13.1f}"
+                        f"{server_ms + transfer_ms:>10.1f}"
+                    )
+        self.stdout.write(f"transfer ms assumes {options['bandwidth_mbps']:g} Mbit/s; "
+                          f"ratio is against uncompressed JSON")
+
+
+def decode(body, encoding, format_name):
+    if encoding == 'gzip':
+        body = gzip.decompress(body)
+    elif encoding == 'br':
+        body = brotli.decompress(body)
+    return msgpack.unpackb(body) if format_name == 'msgpack' else json.loads(body)
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from pml_app.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = ('Delete tombstones of rows deleted more than PML_SYNC_TOMBSTONE_DAYS ago. '
+            'Sync tokens that old are rejected anyway; run it daily, e.g. from cron.')
+
+    def handle(self, *args, **options):
+        count = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {count} tombstones older than {settings.PML_SYNC_TOMBSTONE_DAYS} days'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from pml_app.progress import recount_projects
+
+
+class Command(BaseCommand):
+    help = ('Rebuild project task counters and progress from the tasks table. '
+            'Only needed after writing tasks outside the API (e.g. raw SQL or imports).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help='Projects to recount (default: all)')
+
+    def handle(self, *args, **options):
+        recount_projects(options['project_ids'] or None)
+        self.stdout.write(self.style.SUCCESS('Project progress recounted'))
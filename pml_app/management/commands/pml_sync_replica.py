@@ -0,0 +1,40 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Copy the SQLite primary into each SQLite replica, standing in for replication '
+            'when running with pml.settings_replica. Real replicas replicate on their own.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep copying every this many seconds')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        replicas = [settings.DATABASES[alias] for alias in settings.PML_DATABASE_REPLICAS]
+        if not replicas:
+            raise CommandError('No replicas configured (PML_DATABASE_REPLICAS is empty)')
+        for database in [primary, *replicas]:
+            if database['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f"Only SQLite databases can be copied, not {database['ENGINE']}")
+        
+        while True:
+            start = time.perf_counter()
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for replica in replicas:
+                    target = sqlite3.connect(replica['NAME'])
+                    try:
+                        # The online backup API copies a consistent snapshot while the primary takes writes
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(f'Copied primary to {len(replicas)} replica(s) in '
+                              f'{(time.perf_counter() - start) * 1000:.0f}ms')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,340 @@
+"""Per-request logging, replica routing and opt-in instrumentation.
+
+RequestLogMiddleware gives every request an ID, which is attached to the
+log records written while it is handled and returned in X-Request-ID,
+and logs each request's outcome and duration to pml.requests.
+
+CompressionMiddleware compresses GET/HEAD responses of at least
+PML_COMPRESSION_MIN_BYTES with brotli when the client accepts it and the
+brotli package is installed, and with gzip otherwise.
+
+ReplicaRoutingMiddleware points the reads of GET/HEAD requests at a read
+replica (see routers.py). A client that sends any other request is pinned
+to the primary for PML_READ_YOUR_WRITES_SECONDS, so it sees its own
+writes even while the replicas lag. Clients are recognised by their
+Authorization header or session cookie; the dashboard (pml2) sends its
+login token as a Bearer header on every call. The write's response also
+sets a short-lived pin cookie for same-origin clients that send neither,
+such as the login request that precedes a token; cross-origin clients only
+return it when they send credentials. Addresses are not used: behind a
+proxy or NAT, one writer would pin every reader to the primary.
+
+With PML_REQUEST_TIMING on, every response carries a Server-Timing header
+with the query count, SQL time, view time and render time, and requests
+over the PML_SLOW_REQUEST_* thresholds are written to the
+pml.slow_requests log together with the SQL they ran. With it off the
+middleware removes itself at startup, so requests pay nothing for it.
+
+The body of a streamed response is produced after the headers go out, so
+its queries and serialization are not part of the figures.
+
+RequestLogMiddleware runs natively under both WSGI and ASGI. The timing
+middleware is sync only, so when it is on under ASGI Django runs the
+request in a thread and async views lose their benefit; leave it off there
+except while investigating a problem.
+"""
+import hashlib
+import logging
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from .log import request_id_var
+from .routers import read_alias_var
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+request_logger = logging.getLogger('pml.requests')
+slow_request_logger = logging.getLogger('pml.slow_requests')
+
+# Incoming X-Request-ID values are reused when they look like an ID rather than arbitrary text
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+ACCEPTS_BROTLI = re.compile(r'\bbr\b')
+
+PIN_KEY_PREFIX = 'pml:pin'
+PIN_COOKIE = 'pml_read_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Distinct statements listed in a slow-request entry, slowest first
+SLOW_LOG_STATEMENTS = 20
+
+
+class RequestLogMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Under ASGI, keep async views on the event loop instead of adapting them to a thread
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = request_id_var.set(self.request_id(request))
+        start = time.perf_counter()
+        try:
+            return self.finish(request, self.get_response(request), start)
+        finally:
+            request_id_var.reset(token)
+
+    async def __acall__(self, request):
+        token = request_id_var.set(self.request_id(request))
+        start = time.perf_counter()
+        try:
+            return self.finish(request, await self.get_response(request), start)
+        finally:
+            request_id_var.reset(token)
+
+    def request_id(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        return request_id
+
+    def finish(self, request, response, start):
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+        if request_logger.isEnabledFor(level):
+            request_logger.log(level, '%s %s -> %s', request.method, request.path, response.status_code,
+                               extra={'method': request.method, 'path': request.path,
+                                      'status': response.status_code, 'duration_ms': duration_ms})
+        response['X-Request-ID'] = request_id_var.get()
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Django's GZipMiddleware with a size threshold and brotli preferred when available"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_bytes = settings.PML_COMPRESSION_MIN_BYTES
+        self.brotli_quality = settings.PML_BROTLI_QUALITY
+
+    def process_response(self, request, response):
+        # Login responses carry tokens; leaving other methods alone keeps secrets out of
+        # compressed bodies that could also reflect attacker-chosen input (BREACH)
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        # Compressors buffer their input, which would hold back server-sent events
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+        if (brotli is None or response.has_header('Content-Encoding')
+                or not ACCEPTS_BROTLI.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = abrotli_sequence(response.streaming_content, self.brotli_quality)
+            else:
+                response.streaming_content = brotli_sequence(response.streaming_content, self.brotli_quality)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # As GZipMiddleware does: the encoded body is no longer byte-identical to the strong ETag's
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+def brotli_sequence(chunks, quality):
+    # Flush per chunk so a streamed response keeps streaming
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def abrotli_sequence(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    async for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PML_DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.replicas = list(settings.PML_DATABASE_REPLICAS)
+        self.pin_seconds = settings.PML_READ_YOUR_WRITES_SECONDS
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pin_key = self.pin_key(request)
+        if request.method in SAFE_METHODS:
+            pinned = request.COOKIES.get(PIN_COOKIE) or (pin_key and cache.get(pin_key))
+            token = read_alias_var.set(None if pinned else random.choice(self.replicas))
+            try:
+                return self.get_response(request)
+            finally:
+                read_alias_var.reset(token)
+        
+        # Pin before the write, so a read racing the response already goes to the primary
+        if pin_key:
+            cache.set(pin_key, True, self.pin_seconds)
+        return self.set_pin_cookie(self.get_response(request))
+
+    async def __acall__(self, request):
+        pin_key = self.pin_key(request)
+        if request.method in SAFE_METHODS:
+            pinned = request.COOKIES.get(PIN_COOKIE) or (pin_key and await cache.aget(pin_key))
+            token = read_alias_var.set(None if pinned else random.choice(self.replicas))
+            try:
+                return await self.get_response(request)
+            finally:
+                read_alias_var.reset(token)
+        
+        if pin_key:
+            await cache.aset(pin_key, True, self.pin_seconds)
+        return self.set_pin_cookie(await self.get_response(request))
+
+    def pin_key(self, request):
+        credential = (request.headers.get('Authorization')
+                      or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        if not credential:
+            return None
+        return f'{PIN_KEY_PREFIX}:{hashlib.sha1(credential.encode()).hexdigest()}'
+
+    def set_pin_cookie(self, response):
+        response.set_cookie(PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class RequestTimings:
+    """Collects the measurements for one request; also used as the database execute wrapper"""
+
+    def __init__(self):
+        self.queries = []
+        self.view_started = None
+        self.view_finished = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def statements(self):
+        """(sql, count, total seconds) per distinct statement, slowest first.
+
+        Statements are grouped on their parameterised text, so an N+1 loop
+        shows up as one line with a high count.
+        """
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, duration in self.queries:
+            grouped[sql][0] += 1
+            grouped[sql][1] += duration
+        return sorted(((sql, count, total) for sql, (count, total) in grouped.items()),
+                      key=lambda statement: statement[2], reverse=True)
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PML_REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = settings.PML_SLOW_REQUEST_MS
+        self.slow_queries = settings.PML_SLOW_REQUEST_QUERIES
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        request.pml_timings = timings
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        total = finished - start
+        if timings.view_started is None:
+            view, render = 0.0, 0.0
+        elif timings.view_finished is None:
+            view, render = finished - timings.view_started, 0.0
+        else:
+            view, render = timings.view_finished - timings.view_started, finished - timings.view_finished
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.sql_time * 1000:.2f};desc="{len(timings.queries)} queries"',
+            f'view;dur={view * 1000:.2f}',
+            f'render;dur={render * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+        if self.is_slow(total, timings):
+            self.log_slow_request(request, response, total, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.pml_timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, which separates view time from render time
+        request.pml_timings.view_finished = time.perf_counter()
+        return response
+
+    def is_slow(self, total, timings):
+        if self.slow_ms is not None and total * 1000 >= self.slow_ms:
+            return True
+        return self.slow_queries is not None and len(timings.queries) >= self.slow_queries
+
+    def log_slow_request(self, request, response, total, timings):
+        statements = timings.statements()
+        slow_request_logger.warning(
+            '%s %s -> %s in %.1fms, %d queries in %.1fms',
+            request.method, request.get_full_path(), response.status_code, total * 1000,
+            len(timings.queries), timings.sql_time * 1000,
+            extra={
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'duration_ms': round(total * 1000, 2),
+                'query_count': len(timings.queries),
+                'sql_ms': round(timings.sql_time * 1000, 2),
+                'statements': [{'sql': sql, 'count': count, 'ms': round(duration * 1000, 2)}
+                               for sql, count, duration in statements[:SLOW_LOG_STATEMENTS]],
+                'omitted_statements': max(len(statements) - SLOW_LOG_STATEMENTS, 0),
+            },
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pml_app', '0011_task_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='deadline',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['manager', 'status', 'task_id'], name='tasks_manager_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team_member_id', 'status', 'task_id'], name='tasks_member_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'priority', 'task_id'], name='tasks_status_priority_idx'),
+        ),
+    ]
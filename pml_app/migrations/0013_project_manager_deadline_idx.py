@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pml_app', '0012_project_deadline_task_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['manager', 'deadline'], name='projects_manager_deadline_idx'),
+        ),
+    ]
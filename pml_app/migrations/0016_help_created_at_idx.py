@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pml_app', '0015_help_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='help',
+            index=models.Index(fields=['created_at', 'help_id'], name='help_created_at_idx'),
+        ),
+    ]
@@ -29,6 +29,7 @@ class TeamMember(models.Model):
     team_member_name = models.CharField(max_length=100)
     password = models.CharField(max_length=255)
     position = models.CharField(max_length=255, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = "team_members"
@@ -49,9 +50,17 @@ class Project(models.Model):
         blank=True,
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
+    # Maintained by progress.py as tasks are linked, completed and removed;
+    # once a project has tasks, progress is derived from these counters
+    total_tasks = models.IntegerField(default=0)
+    completed_tasks = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = "projects"
+        indexes = [
+            models.Index(fields=['manager', 'deadline'], name='projects_manager_deadline_idx'),
+        ]
         
     def __str__(self):
         return self.project_name
@@ -59,6 +68,7 @@ class Project(models.Model):
 class ProjectTeamMember(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     team_member = models.ForeignKey(TeamMember, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         db_table = "project_team_members"
@@ -84,11 +94,32 @@ class Task(models.Model):
     task_name = models.CharField(max_length=150)
     manager = models.ForeignKey(Manager, on_delete=models.CASCADE, null=True, blank=True)
     team_member_id = models.IntegerField(null=True, blank=True)
+    project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='medium')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = "tasks"
+        # Composite indexes matching the task list filters; task_id last so
+        # keyset pagination can walk the index in order
+        indexes = [
+            models.Index(fields=['manager', 'status', 'task_id'], name='tasks_manager_status_idx'),
+            models.Index(fields=['team_member_id', 'status', 'task_id'], name='tasks_member_status_idx'),
+            models.Index(fields=['status', 'priority', 'task_id'], name='tasks_status_priority_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The (project_id, status) this row is counted under, so a save can tell what changed
+        loaded = instance.__dict__
+        if 'project_id' in loaded and 'status' in loaded:
+            instance._counted_as = (loaded['project_id'], loaded['status'])
+        # The manager and assignee whose dashboards show this row, so a reassignment can tell them
+        if 'manager_id' in loaded and 'team_member_id' in loaded:
+            instance._assigned_to = (loaded['manager_id'], loaded['team_member_id'])
+        return instance
         
     def __str__(self):
         return self.task_name
@@ -101,9 +132,14 @@ class Help(models.Model):
     subject = models.CharField(max_length=200)
     description = models.CharField(max_length=500, null=True, blank=True)
     created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         db_table = "help"
+        indexes = [
+            # Newest-first feed and created_at range filters (see HelpFeedPagination)
+            models.Index(fields=['created_at', 'help_id'], name='help_created_at_idx'),
+        ]
         
     def save(self, *args, **kwargs):
         if not self.created_at:
@@ -114,6 +150,29 @@ class Help(models.Model):
     def __str__(self):
         return f"{self.subject} - {self.name}"
 
+class IdSequence(models.Model):
+    """Next unallocated primary key for a manually numbered table (see ids.py)"""
+    name = models.CharField(max_length=100, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    class Meta:
+        db_table = "id_sequences"
+        
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+class Tombstone(models.Model):
+    """A deleted row, kept so /api/sync/ can tell clients to drop it (see sync.py)"""
+    table = models.CharField(max_length=64)
+    object_id = models.IntegerField()
+    deleted_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "tombstones"
+        
+    def __str__(self):
+        return f"{self.table} {self.object_id} deleted at {self.deleted_at}"
+
 # Keep the original User model for backward compatibility
 class User(models.Model):
     name = models.CharField(max_length=20)
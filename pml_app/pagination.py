@@ -0,0 +1,104 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskCursorPagination(CursorPagination):
+    """Keyset pagination over tasks, ordered by the task_id primary key"""
+    ordering = 'task_id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class HelpFeedPagination(BasePagination):
+    """Newest-first keyset pagination over help requests on (created_at, help_id).
+    
+    The cursor is the (created_at, help_id) of the last row served, and each
+    page is a single range scan of help_created_at_idx starting there, so
+    deep pages cost the same as the first one. Rows without a created_at
+    come last, newest help_id first. Pages only go forward, from newest to
+    oldest, so responses have a `next` link but no `previous` one.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        rows = help_feed_page(queryset, self.decode_cursor(request), page_size + 1)
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            created_at, help_id = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            position = (parse_datetime(created_at) if created_at else None, int(help_id))
+        except (ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at and position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = f"{last.created_at.isoformat() if last.created_at else ''}|{last.help_id}"
+        cursor = urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+
+def help_feed_page(queryset, position, limit):
+    """Up to `limit` help requests after the (created_at, help_id) `position`, newest first"""
+    if position is None or position[0] is not None:
+        dated = queryset.filter(created_at__isnull=False)
+        if position is not None:
+            created_at, help_id = position
+            dated = dated.filter(created_at__lte=created_at).exclude(created_at=created_at, help_id__gte=help_id)
+        rows = list(dated.order_by('-created_at', '-help_id')[:limit])
+        undated = queryset.filter(created_at__isnull=True)
+    else:
+        rows = []
+        undated = queryset.filter(created_at__isnull=True, help_id__lt=position[1])
+    if len(rows) < limit:
+        rows += list(undated.order_by('-help_id')[:limit - len(rows)])
+    return rows
+
+
+def iter_help_feed(queryset, chunk_size):
+    """Chunker for streaming the help feed in the same order as the plain list"""
+    position = None
+    while True:
+        chunk = help_feed_page(queryset, position, chunk_size)
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        position = (chunk[-1].created_at, chunk[-1].help_id)
+
+
+def wants_pagination(request, paginator):
+    """Pagination is opt-in so existing clients keep receiving a plain list"""
+    params = request.query_params
+    return paginator.cursor_query_param in params or paginator.page_size_query_param in params
@@ -0,0 +1,35 @@
+"""Password hashing for the Admin, Manager and TeamMember tables.
+
+A hash costs hundreds of milliseconds of CPU with Django's default PBKDF2
+iterations. The login views (auth_views.py) are async and run
+verify_password and hash_password with sync_to_async(thread_sensitive=False),
+so under ASGI the event loop keeps serving requests while a login is being
+checked. Account writes that set a password are rare and still hash in the
+request worker.
+"""
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.utils.crypto import constant_time_compare
+
+def is_hashed(encoded):
+    try:
+        identify_hasher(encoded)
+    except ValueError:
+        return False
+    return True
+
+
+def hash_password(raw):
+    return make_password(raw)
+
+
+def verify_password(raw, encoded):
+    """Return (matches, needs_upgrade) for a submitted password.
+    
+    Rows created before hashing was introduced still hold the plain text;
+    those are compared directly and flagged so the caller can store a hash.
+    """
+    if not encoded:
+        return False, False
+    if not is_hashed(encoded):
+        return constant_time_compare(raw, encoded), True
+    return check_password(raw, encoded), False
@@ -0,0 +1,128 @@
+"""Server-maintained project progress.
+
+Each project keeps total_tasks and completed_tasks counters. Whenever a
+task is created, deleted, moved to another project or changes status,
+the affected counters are adjusted with F() expressions (so concurrent
+writers never lose an update), and progress is recomputed from them in the
+database. Nothing ever re-reads a project's tasks.
+
+Task saves and deletes are handled by the receivers below, as are the
+tasks a project delete unlinks. Task writes that
+bypass signals (bulk_create, QuerySet.update) must call apply_task_changes
+themselves, and recount_projects() rebuilds the counters from scratch.
+Updates and deletes lock the task row first and take its counted state from
+the locked read, so concurrent writers never count the same change twice.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Floor
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+from .models import Project, Task
+from .signals import record_change
+
+COMPLETED = 'completed'
+
+# Percentage of completed tasks, rounded down; 0 once a project has no tasks left
+PROGRESS_FROM_COUNTERS = Case(
+    When(total_tasks__lte=0, then=Value(0)),
+    default=Cast(Floor(Cast(F('completed_tasks'), FloatField()) * 100 / F('total_tasks')), IntegerField()),
+)
+
+
+def counter_deltas(changes):
+    """Sum (old, new) pairs of (project_id, status) into {project_id: [total, completed]}.
+
+    None stands for "not counted anywhere": a task being created, deleted or
+    not linked to a project.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for old, new in changes:
+        for counted_as, sign in ((old, -1), (new, 1)):
+            if counted_as is not None and counted_as[0] is not None:
+                project_id, task_status = counted_as
+                deltas[project_id][0] += sign
+                deltas[project_id][1] += sign if task_status == COMPLETED else 0
+    return {project_id: delta for project_id, delta in deltas.items() if delta != [0, 0]}
+
+
+def apply_task_changes(changes):
+    """Adjust project counters and progress for (old, new) task states"""
+    deltas = counter_deltas(changes)
+    if not deltas:
+        return
+    with transaction.atomic():
+        now = timezone.now()
+        for project_id, (total, completed) in sorted(deltas.items()):
+            # QuerySet.update() skips auto_now, and /api/sync/ finds changed projects by updated_at
+            Project.objects.filter(pk=project_id).update(total_tasks=F('total_tasks') + total,
+                                                         completed_tasks=F('completed_tasks') + completed,
+                                                         updated_at=now)
+        # A separate statement, so progress is computed from the updated counters on every backend
+        Project.objects.filter(pk__in=deltas).update(progress=PROGRESS_FROM_COUNTERS)
+    record_change(Project, list(deltas))
+
+
+def recount_projects(project_ids=None):
+    """Rebuild counters and progress from the tasks table; for repairs and backfills"""
+    projects = Project.objects.all() if project_ids is None else Project.objects.filter(pk__in=project_ids)
+    project_ids = list(projects.values_list('pk', flat=True))
+    counts = {row['project_id']: row for row in Task.objects.filter(project__in=projects)
+              .values('project_id')
+              .annotate(total=Count('task_id'), completed=Count('task_id', filter=Q(status=COMPLETED)))}
+    with transaction.atomic():
+        now = timezone.now()
+        projects.update(total_tasks=0, completed_tasks=0, updated_at=now)
+        for project_id, row in counts.items():
+            Project.objects.filter(pk=project_id).update(total_tasks=row['total'],
+                                                         completed_tasks=row['completed'])
+        projects.filter(total_tasks__gt=0).update(progress=PROGRESS_FROM_COUNTERS)
+    record_change(Project, project_ids)
+
+
+def counted_as(task):
+    return (task.project_id, task.status)
+
+
+def load_counted_state(sender, instance, **kwargs):
+    # Instances built by hand with a primary key may overwrite a row whose state they don't know
+    if instance.pk is not None and not hasattr(instance, '_counted_as'):
+        stored = Task.objects.filter(pk=instance.pk).values_list('project_id', 'status').first()
+        instance._counted_as = stored
+
+
+def task_saved(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, '_counted_as', None)
+    new = counted_as(instance)
+    if old != new:
+        apply_task_changes([(old, new)])
+    instance._counted_as = new
+
+
+def lock_deleted_task(sender, instance, **kwargs):
+    # Runs inside the delete's transaction. A concurrent delete of the same row waits on the
+    # lock and then finds nothing to uncount, since post_delete fires even for 0 deleted rows.
+    instance._counted_as = (Task.objects.select_for_update().filter(pk=instance.pk)
+                            .values_list('project_id', 'status').first())
+
+
+def task_deleted(sender, instance, **kwargs):
+    apply_task_changes([(getattr(instance, '_counted_as', counted_as(instance)), None)])
+
+
+def remember_project_tasks(sender, instance, **kwargs):
+    # on_delete=SET_NULL unlinks the project's tasks with QuerySet.update(), which sends no signals
+    instance._unlinked_tasks = list(Task.objects.filter(project=instance).values_list('pk', flat=True))
+
+
+def project_deleted(sender, instance, **kwargs):
+    record_change(Task, getattr(instance, '_unlinked_tasks', []))
+
+
+pre_save.connect(load_counted_state, sender=Task, dispatch_uid='progress-load-task')
+post_save.connect(task_saved, sender=Task, dispatch_uid='progress-task-saved')
+pre_delete.connect(lock_deleted_task, sender=Task, dispatch_uid='progress-lock-deleted-task')
+post_delete.connect(task_deleted, sender=Task, dispatch_uid='progress-task-deleted')
+pre_delete.connect(remember_project_tasks, sender=Project, dispatch_uid='progress-remember-project-tasks')
+post_delete.connect(project_deleted, sender=Project, dispatch_uid='progress-project-deleted')
@@ -0,0 +1,132 @@
+"""Fast read path for list and detail GETs.
+
+A projection is compiled once per serializer configuration (serializer
+class, expand and fields). It lists the columns to fetch with values() and
+how to turn each row dict into exactly the dict the serializer would have
+produced, so responses skip DRF's per-field machinery but stay byte-identical.
+Serializers using anything beyond plain, date, datetime and nested-model
+fields get no projection and keep the serializer path.
+"""
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+# Fields whose to_representation is the identity for values the database returns
+PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.ChoiceField)
+
+
+def _date_to_representation(value):
+    return value.isoformat() if value else None
+
+
+def _datetime_to_representation(value):
+    # DateTimeField.to_representation with ISO 8601 output and the default timezone
+    if not value:
+        return None
+    if settings.USE_TZ:
+        current = timezone.get_current_timezone()
+        value = value.astimezone(current) if timezone.is_aware(value) else timezone.make_aware(value, current)
+    elif timezone.is_aware(value):
+        value = timezone.make_naive(value, dt_timezone.utc)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class Projection:
+    def __init__(self, columns, build):
+        self.columns = columns
+        self.build = build
+
+    def rows(self, queryset):
+        build = self.build
+        return [build(row) for row in queryset.values(*self.columns)]
+
+    def row(self, queryset):
+        row = queryset.values(*self.columns).first()
+        return None if row is None else self.build(row)
+
+    async def arows(self, queryset):
+        build = self.build
+        return [build(row) async for row in queryset.values(*self.columns)]
+
+    async def arow(self, queryset):
+        row = await queryset.values(*self.columns).afirst()
+        return None if row is None else self.build(row)
+
+
+def _compile(serializer, prefix, columns):
+    """Return a row -> dict builder for `serializer`, or None if it cannot be projected"""
+    steps = []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        source = field.source
+        if source == '*' or '.' in source:
+            return None
+        key = prefix + source
+        
+        if isinstance(field, serializers.ModelSerializer):
+            related_model = field.Meta.model
+            null_key = f'{key}__{related_model._meta.pk.attname}'
+            columns.append(null_key)
+            nested = _compile(field, key + '__', columns)
+            if nested is None:
+                return None
+            steps.append((field.field_name, null_key, None, nested))
+        elif isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            if (not isinstance(output_format, str) or output_format.lower() != 'iso-8601'
+                    or hasattr(field, 'timezone')):
+                return None
+            columns.append(key)
+            steps.append((field.field_name, key, _datetime_to_representation, None))
+        elif isinstance(field, serializers.DateField):
+            output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+            if not isinstance(output_format, str) or output_format.lower() != 'iso-8601':
+                return None
+            columns.append(key)
+            steps.append((field.field_name, key, _date_to_representation, None))
+        elif type(field) in PASSTHROUGH_FIELDS:
+            columns.append(key)
+            steps.append((field.field_name, key, None, None))
+        else:
+            return None
+    
+    def build(row):
+        data = {}
+        for name, key, convert, nested in steps:
+            if nested is not None:
+                data[name] = None if row[key] is None else nested(row)
+            elif convert is not None:
+                data[name] = convert(row[key])
+            else:
+                data[name] = row[key]
+        return data
+    return build
+
+
+@lru_cache(maxsize=None)
+def _projection(serializer_class, expand, fields):
+    kwargs = {}
+    if hasattr(serializer_class, 'expandable'):
+        kwargs = {'expand': None if expand is None else set(expand),
+                  'fields': None if fields is None else list(fields)}
+    columns = []
+    build = _compile(serializer_class(**kwargs), '', columns)
+    if build is None:
+        return None
+    return Projection(list(dict.fromkeys(columns)), build)
+
+
+def get_projection(serializer_class, expand=None, fields=None):
+    """Return the cached Projection for this serializer configuration, or None"""
+    return _projection(
+        serializer_class,
+        None if expand is None else frozenset(expand),
+        None if fields is None else tuple(fields),
+    )
@@ -0,0 +1,50 @@
+"""MessagePack request and response bodies.
+
+Clients opt in with `Accept: application/msgpack` (or ?format=msgpack) and
+may send `Content-Type: application/msgpack` bodies. The data is the same
+as the JSON representation, with dates and other non-native values
+converted the way the JSON renderer converts them.
+
+msgpack is an optional dependency; settings only registers these classes
+when it is installed.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MEDIA_TYPE = 'application/msgpack'
+
+_json_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Same conversions as the JSON renderer: dates to ISO strings, Decimal and UUID to strings, ...
+    return _json_encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
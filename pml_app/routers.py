@@ -0,0 +1,82 @@
+"""Read replica routing.
+
+Writes, and every read outside a replica-eligible request, go to the
+primary ('default'). ReplicaRoutingMiddleware picks one of
+settings.PML_DATABASE_REPLICAS for each GET/HEAD request, unless the
+client wrote within the last PML_READ_YOUR_WRITES_SECONDS, and the router
+sends that request's reads to it.
+
+Replicas lag the primary, so anything computed once and then cached for
+other requests (principals, admin stats) is read from the primary inside
+read_from_primary(). conditional_get also leaves off ETag/Last-Modified
+while a replica may not have caught up with the newest write yet.
+
+Under the test runner a replica configured with TEST MIRROR is the primary
+database under another connection, which cannot see the test's open
+transaction, so reads chosen for it go to the primary instead.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# The replica alias the current request reads from; None reads from the primary
+read_alias_var = ContextVar('pml_read_alias', default=None)
+
+
+@lru_cache(maxsize=None)
+def mirrors_primary(alias):
+    """True for a TEST MIRROR replica while the test runner points it at the primary.
+    
+    Resolved on the first read a request routes to `alias`; the test runner
+    has set up its mirrors by then, and the answer does not change afterwards.
+    """
+    configured = connections.settings.get(alias)
+    if configured is None or configured['TEST'].get('MIRROR') != DEFAULT_DB_ALIAS:
+        return False
+    replica, primary = connections[alias].settings_dict, connections[DEFAULT_DB_ALIAS].settings_dict
+    return all(replica.get(key) == primary.get(key) for key in ('ENGINE', 'NAME', 'HOST', 'PORT'))
+
+
+def read_alias():
+    """The database the current request reads from"""
+    alias = read_alias_var.get()
+    if alias is None or mirrors_primary(alias):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+def reading_replica():
+    return read_alias() != DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def read_from_primary():
+    """Send the reads made inside the block to the primary"""
+    token = read_alias_var.set(None)
+    try:
+        yield
+    finally:
+        read_alias_var.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        pool = {DEFAULT_DB_ALIAS, *settings.PML_DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication
+        if db in settings.PML_DATABASE_REPLICAS:
+            return False
+        return None
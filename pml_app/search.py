@@ -0,0 +1,132 @@
+"""Full-text search over help requests.
+
+SQLite uses an external-content FTS5 table (help_fts) that triggers on the
+help table keep in step with every insert, update and delete, including
+bulk and QuerySet.update() writes. MySQL uses a FULLTEXT index on the help
+table, which InnoDB maintains itself. Other backends, or a SQLite build
+without FTS5, fall back to unranked substring matching.
+
+Search text is split into words and each word must match, as a prefix, in
+one of subject, description, name or email, so "inv pay" finds "Invoice
+payment failed". Matches in the subject rank highest.
+"""
+import re
+from django.db import connections, router
+from django.db.models import Q
+from .models import Help
+
+SEARCH_FIELDS = ('subject', 'description', 'name', 'email')
+
+# bm25 weights for SEARCH_FIELDS, in the same order
+FTS5_WEIGHTS = (4.0, 1.0, 2.0, 2.0)
+
+MYSQL_INDEX_NAME = 'help_fulltext_idx'
+
+WORD_PATTERN = re.compile(r'\w+')
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS help_fts USING fts5(
+        subject, description, name, email, content='help', content_rowid='help_id')""",
+    """CREATE TRIGGER IF NOT EXISTS help_fts_insert AFTER INSERT ON help BEGIN
+        INSERT INTO help_fts(rowid, subject, description, name, email)
+        VALUES (new.help_id, new.subject, new.description, new.name, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS help_fts_delete AFTER DELETE ON help BEGIN
+        INSERT INTO help_fts(help_fts, rowid, subject, description, name, email)
+        VALUES ('delete', old.help_id, old.subject, old.description, old.name, old.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS help_fts_update AFTER UPDATE ON help BEGIN
+        INSERT INTO help_fts(help_fts, rowid, subject, description, name, email)
+        VALUES ('delete', old.help_id, old.subject, old.description, old.name, old.email);
+        INSERT INTO help_fts(rowid, subject, description, name, email)
+        VALUES (new.help_id, new.subject, new.description, new.name, new.email);
+    END""",
+]
+
+
+def search_backend(using):
+    if using.vendor == 'mysql':
+        return 'mysql'
+    if using.vendor == 'sqlite' and has_fts5(using):
+        return 'fts5'
+    return 'like'
+
+
+def has_fts5(using):
+    with using.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def install_search_index(using, rebuild=False):
+    """Create the index for this backend; safe to call repeatedly.
+
+    On SQLite, Django rebuilds a table (dropping its triggers) for many
+    schema changes, so this also runs after every migrate. rebuild
+    re-reads every help row into the FTS table.
+    """
+    backend = search_backend(using)
+    with using.cursor() as cursor:
+        if backend == 'fts5':
+            for statement in SQLITE_DDL:
+                cursor.execute(statement)
+            if rebuild:
+                cursor.execute("INSERT INTO help_fts(help_fts) VALUES ('rebuild')")
+        elif backend == 'mysql':
+            indexes = using.introspection.get_constraints(cursor, Help._meta.db_table)
+            if MYSQL_INDEX_NAME not in indexes:
+                cursor.execute(f"CREATE FULLTEXT INDEX {MYSQL_INDEX_NAME} ON help "
+                               f"({', '.join(SEARCH_FIELDS)})")
+
+
+def uninstall_search_index(using):
+    backend = search_backend(using)
+    with using.cursor() as cursor:
+        if backend == 'fts5':
+            for trigger in ('help_fts_insert', 'help_fts_delete', 'help_fts_update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute('DROP TABLE IF EXISTS help_fts')
+        elif backend == 'mysql':
+            cursor.execute(f'DROP INDEX {MYSQL_INDEX_NAME} ON help')
+
+
+def search_help(text, limit, offset=0):
+    """Return (total matches, help requests for this page in rank order)"""
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return 0, []
+
+    connection = connections[router.db_for_read(Help)]
+    backend = search_backend(connection)
+    if backend == 'like':
+        condition = Q()
+        for word in words:
+            condition &= Q(*[Q(**{f'{field}__icontains': word}) for field in SEARCH_FIELDS], _connector=Q.OR)
+        queryset = Help.objects.filter(condition).order_by('-help_id')
+        return queryset.count(), list(queryset[offset:offset + limit])
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{word}"*' for word in words)
+        where = 'help_fts MATCH %s'
+        count_sql = f'SELECT COUNT(*) FROM help_fts WHERE {where}'
+        page_sql = (f'SELECT rowid FROM help_fts WHERE {where} '
+                    f'ORDER BY bm25(help_fts, {", ".join(map(str, FTS5_WEIGHTS))}), rowid DESC LIMIT %s OFFSET %s')
+        params = [match]
+    else:
+        match = ' '.join(f'+{word}*' for word in words)
+        where = f"MATCH ({', '.join(SEARCH_FIELDS)}) AGAINST (%s IN BOOLEAN MODE)"
+        count_sql = f'SELECT COUNT(*) FROM help WHERE {where}'
+        page_sql = (f'SELECT help_id FROM help WHERE {where} '
+                    f'ORDER BY {where} DESC, help_id DESC LIMIT %s OFFSET %s')
+        params = [match, match]
+
+    with connection.cursor() as cursor:
+        cursor.execute(count_sql, [match])
+        total = cursor.fetchone()[0]
+        if total <= offset:
+            return total, []
+        cursor.execute(page_sql, params + [limit, offset])
+        ids = [row[0] for row in cursor.fetchall()]
+
+    by_id = Help.objects.in_bulk(ids)
+    return total, [by_id[help_id] for help_id in ids if help_id in by_id]
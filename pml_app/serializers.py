@@ -1,33 +1,94 @@
 from rest_framework import serializers
 from .models import User, Admin, Manager, TeamMember, Project, Task, Help, ProjectTeamMember
+from .passwords import hash_password
+
+class DynamicFieldsMixin:
+    """Sparse fieldsets and opt-in nesting for list endpoints.
+    
+    `expand` names the relations in `expandable` (relation -> select_related
+    path) to embed as nested objects; the rest are rendered as their
+    `<relation>_id`. Leaving it as None embeds
+    every relation, which is what detail views return. `fields` then limits
+    the output to the named fields.
+    """
+    expandable = {}
+    
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand is not None:
+            for relation in self.expandable:
+                if relation not in expand:
+                    self.fields.pop(relation)
+                    self.fields[f'{relation}_id'].write_only = False
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+    
+    @classmethod
+    def output_field_names(cls, expand=None):
+        """Names a response can contain for the given `expand`, in output order"""
+        return [name for name, field in cls(expand=expand).fields.items() if not field.write_only]
+
+class HashedPasswordMixin:
+    """Store passwords hashed; an unchanged value sent back on update is kept as is"""
+    def validate_password(self, value):
+        if self.instance is not None and value == self.instance.password:
+            return value
+        return hash_password(value)
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = '__all__'
 
-class AdminSerializer(serializers.ModelSerializer):
+class AdminSerializer(HashedPasswordMixin, serializers.ModelSerializer):
     class Meta:
         model = Admin
         fields = '__all__'
         
-class ManagerSerializer(serializers.ModelSerializer):
+class ManagerSerializer(HashedPasswordMixin, serializers.ModelSerializer):
     class Meta:
         model = Manager
         fields = '__all__'
         
-class TeamMemberSerializer(serializers.ModelSerializer):
+class TeamMemberSerializer(HashedPasswordMixin, serializers.ModelSerializer):
     class Meta:
         model = TeamMember
         fields = '__all__'
         
-class ProjectSerializer(serializers.ModelSerializer):
-    manager = ManagerSerializer(read_only=True)
+class NestedManagerSerializer(serializers.ModelSerializer):
+    """Manager as embedded in other resources, without the password"""
+    class Meta:
+        model = Manager
+        fields = ['manager_id', 'name']
+
+class NestedTeamMemberSerializer(serializers.ModelSerializer):
+    """Team member as embedded in other resources, without the password"""
+    class Meta:
+        model = TeamMember
+        fields = ['team_member_id', 'team_member_name', 'position']
+
+class SyncTeamMemberSerializer(serializers.ModelSerializer):
+    """Team member as sent to syncing dashboards, without the password"""
+    class Meta:
+        model = TeamMember
+        fields = NestedTeamMemberSerializer.Meta.fields + ['updated_at']
+        
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    manager = NestedManagerSerializer(read_only=True)
     manager_id = serializers.IntegerField(write_only=True, required=False)
+    expandable = {'manager': 'manager'}
     
     class Meta:
         model = Project
         fields = '__all__'
+        read_only_fields = ['total_tasks', 'completed_tasks']
+    
+    def validate_progress(self, value):
+        # Projects with tasks get their progress from them (see progress.py)
+        if self.instance is not None and self.instance.total_tasks and value != self.instance.progress:
+            raise serializers.ValidationError('Progress is calculated from the project\'s tasks')
+        return value
     
     def create(self, validated_data):
         manager_id = validated_data.pop('manager_id', None)
@@ -39,13 +100,15 @@ class ProjectSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(f"Manager with id {manager_id} does not exist")
         return super().create(validated_data)
         
-class TaskSerializer(serializers.ModelSerializer):
-    manager = ManagerSerializer(read_only=True)
+class TaskSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    manager = NestedManagerSerializer(read_only=True)
     manager_id = serializers.IntegerField(write_only=True, required=False)
+    project_id = serializers.IntegerField(required=False, allow_null=True)
+    expandable = {'manager': 'manager'}
     
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ['project']
     
     def create(self, validated_data):
         manager_id = validated_data.pop('manager_id', None)
@@ -55,18 +118,30 @@ class TaskSerializer(serializers.ModelSerializer):
                 validated_data['manager'] = manager
             except Manager.DoesNotExist:
                 raise serializers.ValidationError(f"Manager with id {manager_id} does not exist")
+        self.check_project(validated_data)
         return super().create(validated_data)
+    
+    def update(self, instance, validated_data):
+        if validated_data.get('project_id') != instance.project_id:
+            self.check_project(validated_data)
+        return super().update(instance, validated_data)
+    
+    def check_project(self, validated_data):
+        project_id = validated_data.get('project_id')
+        if project_id is not None and not Project.objects.filter(project_id=project_id).exists():
+            raise serializers.ValidationError(f"Project with id {project_id} does not exist")
         
 class HelpSerializer(serializers.ModelSerializer):
     class Meta:
         model = Help
         fields = '__all__'
 
-class ProjectTeamMemberSerializer(serializers.ModelSerializer):
+class ProjectTeamMemberSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     project = ProjectSerializer(read_only=True)
-    team_member = TeamMemberSerializer(read_only=True)
+    team_member = NestedTeamMemberSerializer(read_only=True)
     project_id = serializers.IntegerField(write_only=True)
     team_member_id = serializers.IntegerField(write_only=True)
+    expandable = {'project': 'project__manager', 'team_member': 'team_member'}
     
     class Meta:
         model = ProjectTeamMember
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from .models import User, Admin, Manager, TeamMember, Project, Task, Help, ProjectTeamMember
+from .detail_cache import invalidate_detail
+from .events import publish_changes
+from .stats import invalidate_admin_stats
+from .tokens import invalidate_principal
+from .versions import bump_versions
+
+# Models served by the API; every write to them goes through record_change
+TRACKED_MODELS = (User, Admin, Manager, TeamMember, Project, Task, Help, ProjectTeamMember)
+
+# Models whose writes change the admin dashboard snapshot
+ADMIN_STATS_MODELS = (Project, Task, Manager, TeamMember, ProjectTeamMember)
+
+
+def record_change(model, pks=()):
+    """Invalidate everything derived from the given rows of `model` and publish their change events.
+    
+    Runs from the post_save/post_delete receivers below. Views that write
+    with bulk_create or QuerySet.update send no signals and call it directly.
+    The caches are invalidated and the stamps bumped once the current
+    transaction commits: a reader that runs before the commit still sees the
+    old rows, and must not store them under stamps that outlive the write.
+    """
+    pks = list(pks)
+    
+    def invalidate():
+        if model in ADMIN_STATS_MODELS:
+            invalidate_admin_stats()
+        for pk in pks:
+            invalidate_principal(model, pk)
+        invalidate_detail(model, pks)
+        bump_versions(model, pks)
+    
+    transaction.on_commit(invalidate)
+    publish_changes(model, pks)
+
+
+def record_change_on_write(sender, instance, **kwargs):
+    record_change(sender, [instance.pk])
+
+
+for model in TRACKED_MODELS:
+    post_save.connect(record_change_on_write, sender=model,
+                      dispatch_uid=f'record-change-save-{model.__name__}')
+    post_delete.connect(record_change_on_write, sender=model,
+                        dispatch_uid=f'record-change-delete-{model.__name__}')
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from .models import Manager, TeamMember, Project, Task, ProjectTeamMember
+from .routers import read_from_primary
+
+ADMIN_STATS_CACHE_KEY = 'pml:admin-stats'
+
+
+def compute_admin_stats():
+    """Build the system-wide admin dashboard snapshot from the database"""
+    project_counts = Project.objects.aggregate(
+        total=Count('project_id'),
+        completed=Count('project_id', filter=Q(progress__gte=100)),
+    )
+    task_counts = Task.objects.aggregate(
+        total=Count('task_id'),
+        completed=Count('task_id', filter=Q(status='completed')),
+    )
+    projects_per_manager = list(
+        Manager.objects.annotate(project_count=Count('project'))
+        .order_by('manager_id')
+        .values('manager_id', 'name', 'project_count')
+    )
+    
+    return {
+        'projects': {
+            'total': project_counts['total'],
+            'completed': project_counts['completed'],
+            'in_progress': project_counts['total'] - project_counts['completed'],
+        },
+        'tasks': {
+            'total': task_counts['total'],
+            'completed': task_counts['completed'],
+            'pending': task_counts['total'] - task_counts['completed'],
+        },
+        'managers': len(projects_per_manager),
+        'team_members': TeamMember.objects.count(),
+        'project_assignments': ProjectTeamMember.objects.count(),
+        'projects_per_manager': projects_per_manager,
+    }
+
+
+def get_admin_stats():
+    """Return the cached admin snapshot, rebuilding it after an invalidation"""
+    stats = cache.get(ADMIN_STATS_CACHE_KEY)
+    if stats is None:
+        # Cached until the next write, so never built from a lagging replica
+        with read_from_primary():
+            stats = compute_admin_stats()
+        cache.set(ADMIN_STATS_CACHE_KEY, stats, getattr(settings, 'PML_ADMIN_STATS_TIMEOUT', 300))
+    return stats
+
+
+def invalidate_admin_stats():
+    cache.delete(ADMIN_STATS_CACHE_KEY)
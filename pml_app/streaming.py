@@ -0,0 +1,57 @@
+"""Incremental JSON output for full-table list endpoints.
+
+Rows are fetched in keyset chunks, on the primary key unless the view
+supplies its own chunker (one bounded query per chunk, on every database
+backend), serialized a chunk at a time and
+written out as parts of a single JSON array, so memory stays flat however
+large the table is.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+
+def wants_stream(request):
+    return request.query_params.get('stream') in ('1', 'true')
+
+
+def iter_chunks(queryset, chunk_size):
+    pk_name = queryset.model._meta.pk.name
+    queryset = queryset.order_by(pk_name)
+    last_pk = None
+    while True:
+        chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+def iter_json_array(chunks, serializer_class, serializer_kwargs):
+    renderer = JSONRenderer()
+    yield b'['
+    first = True
+    for chunk in chunks:
+        # Render each chunk as a JSON array and splice its items into the output
+        rendered = renderer.render(serializer_class(chunk, many=True, **serializer_kwargs).data)
+        if not first:
+            yield b','
+        yield rendered[1:-1]
+        first = False
+    yield b']'
+
+
+def stream_json(queryset, serializer_class, chunker=iter_chunks, **serializer_kwargs):
+    """Stream `queryset` as the same JSON array a regular list response would return.
+    
+    `chunker(queryset, chunk_size)` yields the rows in chunks; the default
+    walks the primary key, other orderings need their own keyset chunker.
+    """
+    chunk_size = getattr(settings, 'PML_STREAM_CHUNK_SIZE', 500)
+    return StreamingHttpResponse(
+        iter_json_array(chunker(queryset, chunk_size), serializer_class, serializer_kwargs),
+        content_type='application/json',
+    )
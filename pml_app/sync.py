@@ -0,0 +1,111 @@
+"""Delta sync for dashboards that keep a local copy of the tables.
+
+Synced tables carry an auto_now `updated_at`, and every deleted row leaves a
+Tombstone. A sync token is a watermark timestamp: /api/sync/?since=<token>
+returns the rows updated and the rows deleted at or after it, and a new
+token for the next call. Without `since` every row is returned.
+
+The new watermark is "now" minus PML_SYNC_OVERLAP_SECONDS, so rows written
+by transactions still open during the call, replica lag and clock skew
+between workers are picked up by the following call. Clients upsert rows
+by primary key, so seeing a row twice is harmless.
+
+Writes that bypass auto_now (QuerySet.update) must set updated_at
+themselves; see progress.py and the project pre_delete receiver below.
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db.models.signals import post_delete, pre_delete
+from django.utils import timezone
+from .models import Help, Project, ProjectTeamMember, Task, TeamMember, Tombstone
+from .serializers import (HelpSerializer, ProjectSerializer, ProjectTeamMemberSerializer,
+                          SyncTeamMemberSerializer, TaskSerializer)
+
+# Synced tables by name (db_table) and the serializer their rows are sent with
+SYNC_TABLES = {
+    model._meta.db_table: (model, serializer_class)
+    for model, serializer_class in (
+        (Project, ProjectSerializer),
+        (Task, TaskSerializer),
+        (ProjectTeamMember, ProjectTeamMemberSerializer),
+        (TeamMember, SyncTeamMemberSerializer),
+        (Help, HelpSerializer),
+    )
+}
+
+SYNC_MODELS = tuple(model for model, _ in SYNC_TABLES.values())
+
+
+class SyncTokenExpired(Exception):
+    """The token is older than the tombstones kept, so deletions may have been missed"""
+
+
+def encode_token(watermark):
+    micros = int(watermark.timestamp() * 1_000_000)
+    return base64.urlsafe_b64encode(str(micros).encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Return the watermark a token stands for, raising ValueError if it is malformed"""
+    try:
+        micros = int(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode())
+        return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, UnicodeDecodeError, OverflowError, OSError):
+        raise ValueError('Invalid sync token')
+
+
+def sync_changes(since=None, tables=None, serialize=None):
+    """Rows changed and deleted at or after the watermark `since` (None for everything).
+
+    `serialize(queryset, serializer_class)` turns a queryset into a list of
+    row dicts. Returns {'token', 'changed', 'deleted'}, keyed by table name.
+    """
+    tables = list(SYNC_TABLES) if tables is None else tables
+    now = timezone.now()
+    if since is not None and since < now - timedelta(days=settings.PML_SYNC_TOMBSTONE_DAYS):
+        raise SyncTokenExpired('Sync token has expired; sync again without since')
+
+    changed = {}
+    for table in tables:
+        model, serializer_class = SYNC_TABLES[table]
+        queryset = model.objects.order_by('pk')
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        changed[table] = serialize(queryset, serializer_class)
+
+    deleted = {}
+    if since is not None:
+        tombstones = (Tombstone.objects.filter(deleted_at__gte=since, table__in=tables)
+                      .values_list('table', 'object_id'))
+        for table, object_id in tombstones:
+            deleted.setdefault(table, set()).add(object_id)
+        for table, ids in deleted.items():
+            # A key that was reused after the delete is a live row again
+            model = SYNC_TABLES[table][0]
+            ids.difference_update(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        deleted = {table: sorted(ids) for table, ids in deleted.items() if ids}
+
+    watermark = now - timedelta(seconds=settings.PML_SYNC_OVERLAP_SECONDS)
+    return {'token': encode_token(watermark), 'changed': changed, 'deleted': deleted}
+
+
+def prune_tombstones():
+    """Delete tombstones older than any token still accepted; returns how many"""
+    cutoff = timezone.now() - timedelta(days=settings.PML_SYNC_TOMBSTONE_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(table=sender._meta.db_table, object_id=instance.pk, deleted_at=timezone.now())
+
+
+def touch_project_tasks(sender, instance, **kwargs):
+    # on_delete=SET_NULL unlinks the tasks with QuerySet.update(), which skips auto_now
+    Task.objects.filter(project=instance).update(updated_at=timezone.now())
+
+
+for model in SYNC_MODELS:
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f'sync-tombstone-{model.__name__}')
+pre_delete.connect(touch_project_tasks, sender=Project, dispatch_uid='sync-touch-project-tasks')
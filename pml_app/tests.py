@@ -1,3 +1,1446 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import logging
+import threading
+from asgiref.sync import sync_to_async
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import IntegrityError, connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from .models import Manager, TeamMember, Project, Task, ProjectTeamMember, Help, IdSequence, Tombstone
+from .detail_cache import detail_key, stats as detail_stats
+from .events import get_broker
+from .ids import next_id, reset_id_blocks
+from .log import BackgroundHandler, JsonFormatter, RequestContextFilter
+from .middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from .passwords import is_hashed
+from .progress import recount_projects
+from .projections import get_projection
+from .routers import read_alias_var, read_from_primary
+from .signals import record_change
+from .sync import SYNC_MODELS, encode_token, prune_tombstones
+from .serializers import ProjectSerializer, TaskSerializer, TeamMemberSerializer
+from .tokens import principal_cache
+from .websocket import events_websocket
 
-# Create your tests here.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class TaskListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        other = Manager.objects.create(manager_id=2, name='Bob', password='secret')
+        for i in range(5):
+            Task.objects.create(task_name=f'Task {i}', manager=self.manager, team_member_id=10,
+                                priority='urgent' if i % 2 else 'low',
+                                status='completed' if i < 2 else 'in_progress')
+        Task.objects.create(task_name='Other', manager=other, team_member_id=11)
+
+    def test_unfiltered_list_returns_plain_list(self):
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 6)
+
+    def test_filters(self):
+        url = reverse('task-list')
+        self.assertEqual(len(self.client.get(url, {'manager_id': 1}).data), 5)
+        self.assertEqual(len(self.client.get(url, {'team_member_id': 11}).data), 1)
+        self.assertEqual(len(self.client.get(url, {'manager_id': 1, 'status': 'completed'}).data), 2)
+        self.assertEqual(len(self.client.get(url, {'priority': 'urgent'}).data), 2)
+
+    def test_invalid_filters(self):
+        url = reverse('task-list')
+        self.assertEqual(self.client.get(url, {'manager_id': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'status': 'done'}).status_code, 400)
+
+    def test_keyset_pagination(self):
+        url = reverse('task-list')
+        response = self.client.get(url, {'manager_id': 1, 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        seen = [task['task_id'] for task in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(task['task_id'] for task in response.data['results'])
+        expected = list(Task.objects.filter(manager=self.manager).order_by('task_id').values_list('task_id', flat=True))
+        self.assertEqual(seen, expected)
+
+
+class ListQueryCountTests(TestCase):
+    """Nested managers, projects and team members must be joined, not loaded per row"""
+
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(1, 4):
+            manager = Manager.objects.create(manager_id=i, name=f'Manager {i}', password='secret')
+            project = Project.objects.create(project_id=i, project_name=f'Project {i}', manager=manager)
+            Task.objects.create(task_name=f'Task {i}', manager=manager)
+            for j in range(1, 4):
+                member, _ = TeamMember.objects.get_or_create(
+                    team_member_id=j, defaults={'team_member_name': f'Member {j}', 'password': 'secret'})
+                ProjectTeamMember.objects.create(project=project, team_member=member)
+
+    def test_project_team_member_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('project-team-member-list'), {'expand': 'project,team_member'})
+        self.assertEqual(len(response.data), 9)
+        self.assertEqual(response.data[0]['project']['manager']['name'], 'Manager 1')
+
+    def test_project_team_members_by_project(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('project-team-members-by-project', args=[2]))
+        self.assertEqual(len(response.data), 3)
+
+    def test_project_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('project-list'), {'expand': 'manager'})
+        self.assertEqual(len(response.data), 3)
+
+    def test_task_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('task-list'), {'expand': 'manager'})
+        self.assertEqual(len(response.data), 3)
+
+
+class ManagerSummaryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        other = Manager.objects.create(manager_id=2, name='Bob', password='secret')
+        today = timezone.localdate()
+        Project.objects.create(project_id=1, project_name='Done', manager=self.manager, progress=100)
+        Project.objects.create(project_id=2, project_name='Soon', manager=self.manager, progress=40,
+                               deadline=today + timedelta(days=3))
+        Project.objects.create(project_id=3, project_name='Later', manager=self.manager, progress=None,
+                               deadline=today + timedelta(days=30))
+        Project.objects.create(project_id=4, project_name='Late', manager=self.manager,
+                               deadline=today - timedelta(days=1))
+        Project.objects.create(project_id=5, project_name='Not mine', manager=other, progress=100)
+        Task.objects.create(task_name='A', manager=self.manager, priority='urgent', status='completed')
+        Task.objects.create(task_name='B', manager=self.manager, priority='urgent')
+        Task.objects.create(task_name='C', manager=self.manager, priority='low')
+        Task.objects.create(task_name='D', manager=other, priority='low')
+
+    def test_summary_counts(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('manager-summary', args=[1]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['projects'], {'total': 4, 'completed': 1, 'in_progress': 3})
+        self.assertEqual(response.data['tasks']['pending'], 2)
+        self.assertEqual(response.data['tasks']['completed'], 1)
+        self.assertEqual(response.data['tasks']['by_priority']['urgent'], {'pending': 1, 'completed': 1})
+        self.assertEqual(response.data['tasks']['by_priority']['very_urgent'], {'pending': 0, 'completed': 0})
+        self.assertEqual([p['project_id'] for p in response.data['upcoming_deadlines']], [2, 3])
+
+    def test_unknown_manager(self):
+        self.assertEqual(self.client.get(reverse('manager-summary', args=[99])).status_code, 404)
+
+
+class AdminStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        Project.objects.create(project_id=1, project_name='Done', manager=manager, progress=100)
+        Project.objects.create(project_id=2, project_name='Open', manager=manager, progress=20)
+        TeamMember.objects.create(team_member_id=1, team_member_name='Carol', password='secret')
+
+    def test_stats_are_cached(self):
+        response = self.client.get(reverse('admin-stats'))
+        self.assertEqual(response.data['projects'], {'total': 2, 'completed': 1, 'in_progress': 1})
+        self.assertEqual(response.data['managers'], 1)
+        self.assertEqual(response.data['team_members'], 1)
+        self.assertEqual(response.data['projects_per_manager'][0]['project_count'], 2)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('admin-stats'))
+
+    def test_writes_invalidate_cache(self):
+        self.client.get(reverse('admin-stats'))
+        project = Project.objects.get(pk=2)
+        project.progress = 100
+        with self.captureOnCommitCallbacks(execute=True):
+            project.save()
+        self.assertEqual(self.client.get(reverse('admin-stats')).data['projects']['completed'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            project.delete()
+        self.assertEqual(self.client.get(reverse('admin-stats')).data['projects']['total'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Manager.objects.create(manager_id=2, name='Bob', password='secret')
+        self.assertEqual(self.client.get(reverse('admin-stats')).data['managers'], 2)
+
+
+class IdAllocationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        reset_id_blocks()
+
+    def tearDown(self):
+        reset_id_blocks()
+
+    def test_continues_after_existing_keys(self):
+        Project.objects.create(project_id=7, project_name='Existing')
+        response = self.client.post(reverse('project-create'), {'project_name': 'New'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['project_id'], 8)
+        response = self.client.post(reverse('project-create'), {'project_name': 'Newer'}, format='json')
+        self.assertEqual(response.data['project_id'], 9)
+
+    def test_block_reservation_avoids_per_insert_reads(self):
+        self.assertEqual(next_id(Manager), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(next_id(Manager), 2)
+        self.assertEqual(IdSequence.objects.get(name='managers').next_value, 1 + settings.PML_ID_BLOCK_SIZE)
+
+    def test_explicit_ids_advance_sequence(self):
+        self.client.post(reverse('manager-create'), {'name': 'Alice', 'password': 'secret'}, format='json')
+        response = self.client.post(reverse('manager-create'),
+                                    {'manager_id': 5, 'name': 'Bob', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(reverse('manager-create'), {'name': 'Carol', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn(response.data['manager_id'], (1, 5))
+
+    def test_skips_keys_taken_from_another_block(self):
+        self.assertEqual(next_id(TeamMember), 1)
+        # Another process stores an explicit key from the block this one holds
+        TeamMember.objects.create(team_member_id=2, team_member_name='Tom', password='secret')
+        response = self.client.post(reverse('team-member-create'),
+                                    {'team_member_name': 'Ann', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['team_member_id'], 1 + settings.PML_ID_BLOCK_SIZE)
+        with mock.patch('pml_app.serializers.ManagerSerializer.is_valid', return_value=True), \
+                mock.patch('pml_app.serializers.ManagerSerializer.save', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                # A failure that is not a duplicate key is not retried
+                self.client.post(reverse('manager-create'), {'name': 'Bob', 'password': 'secret'}, format='json')
+
+    def test_help_create_uses_allocator(self):
+        Help.objects.create(help_id=3, name='A', email='a@example.com', number='1', subject='S')
+        response = self.client.post(reverse('help-create'),
+                                    {'name': 'B', 'email': 'b@example.com', 'number': '2', 'subject': 'T'},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['help_id'], 4)
+
+
+class TaskBulkCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        Manager.objects.create(manager_id=2, name='Bob', password='secret')
+
+    def test_bulk_create(self):
+        tasks = [{'task_name': f'Task {i}', 'manager_id': 1 + i % 2, 'priority': 'low'} for i in range(50)]
+        # manager lookup + bulk insert (inside a savepoint under TestCase)
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('task-bulk-create'), {'tasks': tasks}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 50)
+        self.assertEqual(response.data['created'][1]['manager']['name'], 'Bob')
+        self.assertEqual(Task.objects.count(), 50)
+
+    def test_invalid_items_abort_whole_batch(self):
+        tasks = [
+            {'task_name': 'Fine', 'manager_id': 1},
+            {'task_name': 'Bad priority', 'priority': 'whenever'},
+            {'task_name': 'Unknown manager', 'manager_id': 99},
+        ]
+        response = self.client.post(reverse('task-bulk-create'), tasks, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('manager_id', response.data['errors'][1]['errors'])
+        self.assertEqual(Task.objects.count(), 0)
+
+    def test_requires_list(self):
+        response = self.client.post(reverse('task-bulk-create'), {'tasks': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ProjectTeamMemberBulkCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        self.project = Project.objects.create(project_id=1, project_name='Launch', manager=manager)
+        for i in range(1, 201):
+            TeamMember.objects.create(team_member_id=i, team_member_name=f'Member {i}', password='secret')
+        ProjectTeamMember.objects.create(project=self.project, team_member_id=1)
+
+    def test_assigns_in_constant_queries(self):
+        ids = list(range(1, 201))
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse('project-team-member-bulk-create'),
+                                        {'project_id': 1, 'team_member_ids': ids}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 199)
+        self.assertEqual(response.data['errors'], ['Team member 1: already assigned to this project'])
+        self.assertTrue(all(row['id'] for row in response.data['created']))
+        self.assertEqual(ProjectTeamMember.objects.filter(project=self.project).count(), 200)
+
+    def test_created_rows_use_get_format(self):
+        response = self.client.post(reverse('project-team-member-bulk-create'),
+                                    {'project_id': 1, 'team_member_ids': [2]}, format='json')
+        self.assertEqual(response.data['created'][0]['team_member_id'], 2)
+        self.assertNotIn('team_member', response.data['created'][0])
+        response = self.client.post(reverse('project-team-member-bulk-create') + '?expand=team_member',
+                                    {'project_id': 1, 'team_member_ids': [3]}, format='json')
+        self.assertEqual(response.data['created'][0]['team_member']['team_member_name'], 'Member 3')
+
+    def test_records_created_rows(self):
+        with mock.patch('pml_app.api_views.record_change') as record:
+            response = self.client.post(reverse('project-team-member-bulk-create'),
+                                        {'project_id': 1, 'team_member_ids': [1, 2, 3]}, format='json')
+        record.assert_called_once_with(ProjectTeamMember, [row['id'] for row in response.data['created']])
+        self.assertEqual(len(record.call_args.args[1]), 2)
+
+    def test_per_member_errors(self):
+        response = self.client.post(reverse('project-team-member-bulk-create'),
+                                    {'project_id': 1, 'team_member_ids': [1, 999, 'x']}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['errors']), 3)
+        self.assertTrue(response.data['errors'][0].startswith('Team member x:'))
+
+    def test_unknown_project(self):
+        response = self.client.post(reverse('project-team-member-bulk-create'),
+                                    {'project_id': 42, 'team_member_ids': [2, 3]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['errors']), 2)
+
+
+class ReplaceProjectTeamTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.project = Project.objects.create(project_id=1, project_name='Launch')
+        for i in range(1, 6):
+            TeamMember.objects.create(team_member_id=i, team_member_name=f'Member {i}', password='secret')
+        for i in (1, 2, 3):
+            ProjectTeamMember.objects.create(project=self.project, team_member_id=i)
+
+    def current_team(self):
+        return set(ProjectTeamMember.objects.filter(project=self.project).values_list('team_member_id', flat=True))
+
+    def test_applies_diff(self):
+        kept = ProjectTeamMember.objects.get(project=self.project, team_member_id=2).id
+        url = reverse('project-team-members-by-project', args=[1])
+        response = self.client.put(url, {'team_member_ids': [2, 3, 4, 5]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.current_team(), {2, 3, 4, 5})
+        self.assertEqual({row['team_member_id'] for row in response.data}, {2, 3, 4, 5})
+        self.assertEqual(ProjectTeamMember.objects.get(project=self.project, team_member_id=2).id, kept)
+
+    def test_response_matches_get_format(self):
+        url = reverse('project-team-members-by-project', args=[1])
+        response = self.client.put(url, {'team_member_ids': [1, 4]}, format='json')
+        self.assertEqual(response.data, self.client.get(url).data)
+        response = self.client.put(url, {'team_member_ids': [1, 4]}, format='json', QUERY_STRING='expand=team_member')
+        self.assertEqual(response.data, self.client.get(url, {'expand': 'team_member'}).data)
+        self.assertEqual(response.data[0]['team_member']['team_member_name'], 'Member 1')
+
+    def test_empty_list_clears_team(self):
+        url = reverse('project-team-members-by-project', args=[1])
+        response = self.client.put(url, {'team_member_ids': []}, format='json')
+        self.assertEqual(response.data, [])
+        self.assertEqual(self.current_team(), set())
+
+    def test_unknown_member_changes_nothing(self):
+        url = reverse('project-team-members-by-project', args=[1])
+        response = self.client.put(url, {'team_member_ids': [1, 99]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.current_team(), {1, 2, 3})
+
+    def test_records_added_rows(self):
+        url = reverse('project-team-members-by-project', args=[1])
+        with mock.patch('pml_app.api_views.record_change') as record:
+            self.client.put(url, {'team_member_ids': [1, 4, 5]}, format='json')
+        added = ProjectTeamMember.objects.filter(project=self.project, team_member_id__in=[4, 5])
+        record.assert_called_once_with(ProjectTeamMember, mock.ANY)
+        self.assertEqual(sorted(record.call_args.args[1]), sorted(row.pk for row in added))
+
+    def test_unknown_project(self):
+        url = reverse('project-team-members-by-project', args=[9])
+        self.assertEqual(self.client.put(url, {'team_member_ids': [1]}, format='json').status_code, 404)
+
+
+class TokenSessionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        principal_cache.clear()
+        # Legacy row stored before passwords were hashed
+        Manager.objects.create(manager_id=1, name='Alice', password='secret')
+
+    def login(self, password='secret'):
+        return self.client.post(reverse('manager-login'), {'manager_id': 1, 'password': password}, format='json')
+
+    def test_login_upgrades_plain_text_password(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.json()['data'])
+        self.assertTrue(is_hashed(Manager.objects.get(pk=1).password))
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 401)
+
+    async def test_hashing_leaves_the_event_loop_free(self):
+        await sync_to_async(self.login)()
+        hashing, released = threading.Event(), []
+        release = threading.Event()
+
+        def slow_check_password(password, encoded):
+            hashing.set()
+            # Set from the event loop, which cannot run if the hash is blocking it
+            released.append(release.wait(2))
+            return check_password(password, encoded)
+
+        with mock.patch('pml_app.passwords.check_password', slow_check_password):
+            login = asyncio.ensure_future(self.async_client.post(
+                reverse('manager-login'), {'manager_id': 1, 'password': 'secret'}, content_type='application/json'))
+            while not hashing.is_set():
+                await asyncio.sleep(0.01)
+            release.set()
+            response = await login
+        self.assertEqual(released, [True])
+        self.assertEqual(response.status_code, 200)
+
+    def test_created_accounts_store_hashes(self):
+        response = self.client.post(reverse('team-member-create'),
+                                    {'team_member_name': 'Carol', 'password': 'pw12345'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(is_hashed(TeamMember.objects.get().password))
+
+    def test_session_uses_cached_principal(self):
+        token = self.login().json()['data']['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get(reverse('current-session'))
+        self.assertEqual(response.data['data']['name'], 'Alice')
+        with self.assertNumQueries(0):
+            self.client.get(reverse('current-session'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Manager.objects.filter(pk=1).first().delete()
+        self.assertEqual(self.client.get(reverse('current-session')).status_code, 401)
+
+    def test_update_invalidates_principal(self):
+        token = self.login().json()['data']['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.client.get(reverse('current-session'))
+        manager = Manager.objects.get(pk=1)
+        manager.name = 'Alicia'
+        with self.captureOnCommitCallbacks(execute=True):
+            manager.save()
+        self.assertEqual(self.client.get(reverse('current-session')).data['data']['name'], 'Alicia')
+
+    def test_rejects_bad_tokens(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get(reverse('current-session')).status_code, 401)
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('current-session')).status_code, 401)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        Project.objects.create(project_id=1, project_name='Launch', manager=self.manager)
+        Project.objects.create(project_id=2, project_name='Other', manager=self.manager)
+
+    def test_list_revalidation(self):
+        url = reverse('project-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Changes to the nested manager invalidate the project list too
+        self.manager.name = 'Alicia'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_query_string_changes_etag(self):
+        url = reverse('task-list')
+        self.assertNotEqual(self.client.get(url)['ETag'],
+                            self.client.get(url, {'status': 'completed'})['ETag'])
+
+    def test_detail_uses_row_version(self):
+        first = self.client.get(reverse('project-detail', args=[1]))['ETag']
+        project = Project.objects.get(pk=2)
+        project.progress = 50
+        project.save()
+        response = self.client.get(reverse('project-detail', args=[1]), HTTP_IF_NONE_MATCH=first)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse('project-detail', args=[2]))
+        self.assertEqual(response.data['progress'], 50)
+
+    def test_if_modified_since(self):
+        url = reverse('help-list')
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_reads_before_commit_are_stale_after_it(self):
+        url = reverse('project-detail', args=[1])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.patch(reverse('project-update', args=[1]), {'project_name': 'Renamed'}, format='json')
+            # A read that lands between the write and its commit
+            etag = self.client.get(url)['ETag']
+        for callback in callbacks:
+            callback()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bulk_writes_bump_versions(self):
+        url = reverse('task-list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task-bulk-create'), [{'task_name': 'New'}], format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_missing_rows_get_no_etag(self):
+        response = self.client.get(reverse('project-detail', args=[99]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+@override_settings(PML_STREAM_CHUNK_SIZE=3)
+class StreamingListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        manager = Manager.objects.create(manager_id=1, name='Zoë', password='secret')
+        for i in range(1, 9):
+            Project.objects.create(project_id=i, project_name=f'Project {i}', manager=manager)
+            Task.objects.create(task_name=f'Task {i}', manager=manager, status='completed' if i % 2 else 'in_progress')
+            Help.objects.create(help_id=i, name=f'N{i}', email='e@example.com', number='1', subject='S')
+
+    def assertStreamMatches(self, url, params=None):
+        params = params or {}
+        regular = self.client.get(url, params)
+        streamed = self.client.get(url, {**params, 'stream': 1})
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(b''.join(streamed.streaming_content), regular.content)
+
+    def test_streams_identical_json(self):
+        self.assertStreamMatches(reverse('task-list'))
+        self.assertStreamMatches(reverse('task-list'), {'status': 'completed'})
+        self.assertStreamMatches(reverse('project-list'))
+        self.assertStreamMatches(reverse('help-list'))
+        self.assertStreamMatches(reverse('user-list'))
+
+    def test_fetches_in_chunks(self):
+        response = self.client.get(reverse('task-list'), {'stream': 1})
+        with self.assertNumQueries(3):
+            content = b''.join(response.streaming_content)
+        self.assertEqual(len(json.loads(content)), 8)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        project = Project.objects.create(project_id=1, project_name='Launch', manager=manager, progress=10)
+        member = TeamMember.objects.create(team_member_id=1, team_member_name='Carol', password='secret')
+        ProjectTeamMember.objects.create(project=project, team_member=member)
+        Task.objects.create(task_name='Plan', manager=manager)
+
+    def test_lists_default_to_flat_ids(self):
+        project = self.client.get(reverse('project-list')).data[0]
+        self.assertEqual(project['manager_id'], 1)
+        self.assertNotIn('manager', project)
+        assignment = self.client.get(reverse('project-team-member-list')).data[0]
+        self.assertEqual((assignment['project_id'], assignment['team_member_id']), (1, 1))
+
+    def test_expand_never_exposes_passwords(self):
+        project = self.client.get(reverse('project-list'), {'expand': 'manager'}).data[0]
+        self.assertEqual(project['manager'], {'manager_id': 1, 'name': 'Alice'})
+        assignment = self.client.get(reverse('project-team-member-list'), {'expand': 'project,team_member'}).data[0]
+        self.assertNotIn('password', assignment['team_member'])
+        self.assertNotIn('password', assignment['project']['manager'])
+
+    def test_detail_still_nested(self):
+        task = self.client.get(reverse('task-detail', args=[Task.objects.get().pk])).data
+        self.assertEqual(task['manager']['name'], 'Alice')
+
+    def test_fields_limit_output_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('project-list'), {'fields': 'project_id,project_name'})
+        self.assertEqual(response.data, [{'project_id': 1, 'project_name': 'Launch'}])
+        self.assertNotIn('description', queries[0]['sql'])
+        response = self.client.get(reverse('task-list'), {'fields': 'task_name,manager', 'expand': 'manager'})
+        self.assertEqual(response.data[0], {'manager': {'manager_id': 1, 'name': 'Alice'}, 'task_name': 'Plan'})
+
+    def test_unknown_names_rejected(self):
+        self.assertEqual(self.client.get(reverse('project-list'), {'fields': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('project-list'), {'expand': 'team'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('task-list'), {'fields': 'manager'}).status_code, 400)
+
+    def test_write_only_names_rejected(self):
+        task = Task.objects.get()
+        response = self.client.get(reverse('task-detail', args=[task.task_id]), {'fields': 'manager_id'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProjectionTests(TestCase):
+    """The fast read path must render exactly what the serializers render"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        caches[settings.PML_DETAIL_CACHE].clear()
+        manager = Manager.objects.create(manager_id=1, name='Zoë "Z" Ángel', password='secret')
+        Project.objects.create(project_id=1, project_name='Launch', manager=manager, progress=10,
+                               deadline=date(2026, 1, 31), description='Line break')
+        Project.objects.create(project_id=2, project_name='Orphan', description=None, progress=None)
+        TeamMember.objects.create(team_member_id=1, team_member_name='Carol', password='secret', position=None)
+        Task.objects.create(task_name='Plan', manager=manager, team_member_id=1, priority='urgent')
+        Task.objects.create(task_name='Unassigned')
+
+    def assertRendersLike(self, serializer_class, queryset, **options):
+        projection = get_projection(serializer_class, **options)
+        self.assertIsNotNone(projection)
+        renderer = JSONRenderer()
+        expected = renderer.render(serializer_class(queryset, many=True, **options).data)
+        self.assertEqual(renderer.render(projection.rows(queryset)), expected)
+
+    def test_projections_match_serializers(self):
+        self.assertRendersLike(TeamMemberSerializer, TeamMember.objects.all())
+        for serializer_class, queryset in ((ProjectSerializer, Project.objects.order_by('pk')),
+                                           (TaskSerializer, Task.objects.order_by('pk'))):
+            self.assertRendersLike(serializer_class, queryset)
+            self.assertRendersLike(serializer_class, queryset, expand=set())
+            self.assertRendersLike(serializer_class, queryset, expand={'manager'})
+            self.assertRendersLike(serializer_class, queryset, expand={'manager'}, fields=['manager'])
+            self.assertRendersLike(serializer_class, queryset, expand=set(), fields=['manager_id'])
+
+    def test_detail_responses_match_serializers(self):
+        project = Project.objects.get(pk=1)
+        response = self.client.get(reverse('project-detail', args=[1]))
+        self.assertEqual(response.content, JSONRenderer().render(ProjectSerializer(project).data))
+        task = Task.objects.get(task_name='Unassigned')
+        response = self.client.get(reverse('task-detail', args=[task.pk]))
+        self.assertEqual(response.content, JSONRenderer().render(TaskSerializer(task).data))
+
+    def test_paginated_tasks_use_projection(self):
+        response = self.client.get(reverse('task-list'), {'page_size': 1, 'expand': 'manager'})
+        self.assertEqual(response.data['results'][0]['manager']['name'], 'Zoë "Z" Ángel')
+        response = self.client.get(response.data['next'])
+        self.assertIsNone(response.data['results'][0]['manager'])
+
+
+@override_settings(PML_REQUEST_TIMING=True, PML_SLOW_REQUEST_MS=None, PML_SLOW_REQUEST_QUERIES=None)
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        for i in range(3):
+            Task.objects.create(task_name=f'Task {i}', manager=manager)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('task-list'))
+        metrics = {part.split(';')[0]: part for part in response['Server-Timing'].split(', ')}
+        self.assertEqual(set(metrics), {'db', 'view', 'render', 'total'})
+        self.assertIn('desc="1 queries"', metrics['db'])
+
+    @override_settings(PML_REQUEST_TIMING=False)
+    def test_disabled_by_default(self):
+        response = APIClient().get(reverse('task-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PML_SLOW_REQUEST_QUERIES=2)
+    def test_slow_request_log_groups_statements(self):
+        client = APIClient()
+        with self.assertNoLogs('pml.slow_requests'):
+            client.get(reverse('task-list'))
+        with self.assertLogs('pml.slow_requests', level='WARNING') as logs:
+            client.get(reverse('manager-summary', args=[1]))
+        self.assertIn('GET /api/managers/1/summary/ -> 200', logs.output[0])
+        record = logs.records[0]
+        self.assertEqual(record.query_count, sum(statement['count'] for statement in record.statements))
+        self.assertTrue(all(statement['sql'].startswith('SELECT') for statement in record.statements))
+
+
+class StructuredLoggingTests(TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.handler = BackgroundHandler('logging.StreamHandler', {'stream': self.stream})
+        self.handler.setFormatter(JsonFormatter())
+        self.handler.addFilter(RequestContextFilter())
+        self.logger = logging.getLogger('pml_app.views')
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'propagate', True)
+        self.addCleanup(self.handler.close)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def entries(self):
+        self.handler.flush()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_are_json_with_extra_fields(self):
+        self.logger.warning('Disk at %d%%', 91, extra={'volume': 'data'})
+        entry, = self.entries()
+        self.assertEqual(entry['message'], 'Disk at 91%')
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['volume'], 'data')
+        self.assertIsNone(entry['request_id'])
+
+    def test_records_carry_the_request_id(self):
+        response = APIClient().post(reverse('help-create'), {'name': 'A', 'email': 'a@example.com',
+                                                             'number': '1', 'subject': 'Hi'},
+                                    format='json', HTTP_X_REQUEST_ID='req-42')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['X-Request-ID'], 'req-42')
+        saved = [entry for entry in self.entries() if entry['message'].endswith('saved')]
+        self.assertEqual(saved[0]['request_id'], 'req-42')
+        self.assertEqual(saved[0]['help_id'], response.data['help_id'])
+
+    def test_unusable_request_ids_are_replaced(self):
+        response = APIClient().get(reverse('api-overview'), HTTP_X_REQUEST_ID='not an id\n')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = BackgroundHandler('logging.NullHandler', queue_size=1)
+        handler.listener.stop()
+        handler.running = False
+        for _ in range(3):
+            handler.handle(logging.makeLogRecord({'msg': 'x'}))
+        self.assertEqual(handler.dropped, 2)
+        handler.close()
+
+
+class HelpSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Help.objects.create(help_id=1, name='Alice', email='alice@example.com', number='1',
+                            subject='Invoice payment failed', description='Card declined twice')
+        Help.objects.create(help_id=2, name='Bob', email='bob@example.com', number='2',
+                            subject='Login trouble', description='Password reset for the invoice portal')
+        Help.objects.create(help_id=3, name='Carol', email='carol@example.com', number='3',
+                            subject='Feature idea', description=None)
+
+    def search(self, **params):
+        response = self.client.get(reverse('help-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def ids(self, response):
+        return [row['help_id'] for row in response.data['results']]
+
+    def test_ranks_subject_matches_first(self):
+        response = self.search(q='invoice')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(self.ids(response), [1, 2])
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self.ids(self.search(q='inv pay')), [1])
+        self.assertEqual(self.ids(self.search(q='carol@example')), [3])
+        # Query syntax characters are treated as plain text rather than raising errors
+        self.assertEqual(self.ids(self.search(q='"invoice*(:')), [1, 2])
+
+    def test_index_follows_writes(self):
+        Help.objects.filter(pk=3).update(subject='Invoice copy needed')
+        self.assertIn(3, self.ids(self.search(q='invoice')))
+        Help.objects.filter(pk=1).delete()
+        self.assertNotIn(1, self.ids(self.search(q='invoice')))
+        self.assertEqual(self.ids(self.search(q='declined')), [])
+
+    def test_pagination(self):
+        first = self.search(q='invoice', page_size=1)
+        self.assertEqual(self.ids(first), [1])
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.ids(second), [2])
+        self.assertIsNone(second.data['next'])
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get(reverse('help-search')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('help-search'), {'q': 'x', 'page': 0}).status_code, 400)
+
+
+class HelpFeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        base = timezone.make_aware(timezone.datetime(2026, 3, 1, 9, 0))
+        stamps = {1: base, 2: base + timedelta(days=1), 3: base + timedelta(days=1), 4: base + timedelta(days=5),
+                  5: base - timedelta(days=40)}
+        for help_id, created_at in stamps.items():
+            Help.objects.create(help_id=help_id, name='N', email='e@example.com', number='1',
+                                subject=f'Ticket {help_id}', created_at=created_at)
+        # Rows from before created_at existed
+        Help.objects.bulk_create([Help(help_id=help_id, name='N', email='e@example.com', number='1',
+                                       subject='Legacy') for help_id in (6, 7)])
+        self.newest_first = [4, 3, 2, 1, 5, 7, 6]
+
+    def ids(self, rows):
+        return [row['help_id'] for row in rows]
+
+    def test_plain_list_is_newest_first(self):
+        self.assertEqual(self.ids(self.client.get(reverse('help-list')).data), self.newest_first)
+
+    def test_cursor_pages_cover_every_row_once(self):
+        seen = []
+        response = self.client.get(reverse('help-list'), {'page_size': 2})
+        while True:
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += self.ids(response.data['results'])
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, self.newest_first)
+
+    def test_deep_page_is_a_single_query(self):
+        first = self.client.get(reverse('help-list'), {'page_size': 2})
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(first.data['next'])
+        self.assertEqual(self.ids(second.data['results']), [2, 1])
+        self.assertEqual(sum('FROM "help"' in query['sql'] for query in queries.captured_queries), 1)
+
+    def test_date_range(self):
+        response = self.client.get(reverse('help-list'), {'created_after': '2026-03-01',
+                                                          'created_before': '2026-03-02T09:00:00'})
+        self.assertEqual(self.ids(response.data), [1])
+        response = self.client.get(reverse('help-list'), {'created_after': '2026-03-02', 'page_size': 10})
+        self.assertEqual(self.ids(response.data['results']), [4, 3, 2])
+
+    def test_bad_input(self):
+        self.assertEqual(self.client.get(reverse('help-list'), {'created_after': 'March'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('help-list'), {'created_before': '2026-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('help-list'), {'cursor': 'bm9wZQ=='}).status_code, 404)
+
+
+class ProjectProgressTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.project = Project.objects.create(project_id=1, project_name='Launch', progress=40)
+        self.other = Project.objects.create(project_id=2, project_name='Other')
+
+    def create_task(self, **data):
+        response = self.client.post(reverse('task-create'), {'task_name': 'Task', **data}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['task_id']
+
+    def assertCounters(self, project, total, completed, progress):
+        project.refresh_from_db()
+        self.assertEqual((project.total_tasks, project.completed_tasks, project.progress),
+                         (total, completed, progress))
+
+    def test_counters_follow_task_writes(self):
+        first = self.create_task(project_id=1)
+        self.create_task(project_id=1)
+        self.create_task(project_id=1, status='completed')
+        self.assertCounters(self.project, 3, 1, 33)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.put(reverse('task-update', args=[first]),
+                            {'task_name': 'Task', 'project_id': 1, 'status': 'completed'}, format='json')
+        self.assertCounters(self.project, 3, 2, 66)
+        # Counters are adjusted in place; no query reads the project's tasks back
+        self.assertFalse([q for q in queries.captured_queries
+                          if q['sql'].startswith('SELECT') and 'project_id" = ' in q['sql']])
+        
+        self.client.put(reverse('task-update', args=[first]),
+                        {'task_name': 'Task', 'project_id': 2, 'status': 'completed'}, format='json')
+        self.assertCounters(self.project, 2, 1, 50)
+        self.assertCounters(self.other, 1, 1, 100)
+        
+        self.client.delete(reverse('task-delete', args=[first]))
+        self.assertCounters(self.other, 0, 0, 0)
+
+    def test_bulk_create_counts_tasks(self):
+        response = self.client.post(reverse('task-bulk-create'), [
+            {'task_name': 'A', 'project_id': 1, 'status': 'completed'},
+            {'task_name': 'B', 'project_id': 1},
+            {'task_name': 'C'},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertCounters(self.project, 2, 1, 50)
+        
+        response = self.client.post(reverse('task-bulk-create'), [{'task_name': 'D', 'project_id': 99}],
+                                    format='json')
+        self.assertEqual(response.data['errors'][0]['errors']['project_id'],
+                         ['Project with id 99 does not exist'])
+
+    def test_bulk_create_without_returning_inserts(self):
+        def sqlite_insert_range(count):
+            # Stands in for LAST_INSERT_ID(): SQLite reports the last row's key, not the first's
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT last_insert_rowid()')
+                last = cursor.fetchone()[0]
+            return range(last - count + 1, last + 1)
+
+        def bulk_create(count):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('task-bulk-create'), [
+                    {'task_name': f'Task {n}', 'project_id': 1, 'status': 'completed' if n else 'in_progress'}
+                    for n in range(count)
+                ], format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            return response, len(queries)
+
+        # As on MySQL, where bulk_create cannot set the primary keys
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                mock.patch('pml_app.api_views.last_insert_range', sqlite_insert_range):
+            response, few = bulk_create(2)
+            _, many = bulk_create(20)
+        self.assertEqual(few, many)
+        ids = [task['task_id'] for task in response.data['created']]
+        self.assertEqual(list(Task.objects.order_by('task_id').values_list('task_id', flat=True))[:2], ids)
+        self.assertEqual(Task.objects.get(pk=ids[1]).task_name, 'Task 1')
+        self.assertCounters(self.project, 22, 20, 90)
+
+    def test_progress_is_only_editable_without_tasks(self):
+        response = self.client.patch(reverse('project-update', args=[1]), {'progress': 70}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.create_task(project_id=1)
+        response = self.client.patch(reverse('project-update', args=[1]), {'progress': 90}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post(reverse('task-create'), {'task_name': 'X', 'project_id': 99},
+                                          format='json').status_code, 400)
+
+    def test_deleting_a_task_twice_uncounts_it_once(self):
+        self.create_task(project_id=1)
+        task_id = self.create_task(project_id=1, status='completed')
+        # Two requests that loaded the same task before either deleted it
+        first, second = Task.objects.get(pk=task_id), Task.objects.get(pk=task_id)
+        first.delete()
+        second.delete()
+        self.assertCounters(self.project, 1, 0, 0)
+
+    def test_deleting_project_invalidates_unlinked_tasks(self):
+        task_id = self.create_task(project_id=1)
+        self.assertEqual(self.client.get(reverse('task-detail', args=[task_id])).data['project_id'], 1)
+        listed = self.client.get(reverse('task-list'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('project-delete', args=[1]))
+        self.assertIsNone(self.client.get(reverse('task-detail', args=[task_id])).data['project_id'])
+        response = self.client.get(reverse('task-list'), HTTP_IF_NONE_MATCH=listed['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data[0]['project_id'])
+
+    def test_recount_repairs_counters(self):
+        Task.objects.bulk_create([Task(task_name='Raw', project=self.project, status='completed'),
+                                  Task(task_name='Raw', project=self.project)])
+        self.assertCounters(self.project, 0, 0, 40)
+        recount_projects()
+        self.assertCounters(self.project, 2, 1, 50)
+        self.assertCounters(self.other, 0, 0, 0)
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        TeamMember.objects.create(team_member_id=10, team_member_name='Tom', password='secret', position='Dev')
+        Project.objects.create(project_id=1, project_name='Launch', manager=manager,
+                               deadline=timezone.localdate() + timedelta(days=3))
+        for i in range(3):
+            Task.objects.create(task_name=f'Task {i}', manager=manager, team_member_id=10, project_id=1,
+                                status='completed' if i == 0 else 'in_progress')
+        self.task_id = Task.objects.order_by('task_id').first().task_id
+
+    async def test_matches_sync_endpoints(self):
+        cases = [
+            ('manager-list', [], {}),
+            ('manager-detail', [1], {}),
+            ('manager-summary', [1], {}),
+            ('team-member-list', [], {}),
+            ('team-member-detail', [10], {}),
+            ('project-list', [], {}),
+            ('project-list', [], {'expand': 'manager', 'fields': 'project_id,manager'}),
+            ('project-detail', [1], {}),
+            ('task-list', [], {'status': 'in_progress', 'project_id': 1}),
+            ('task-detail', [self.task_id], {'expand': ''}),
+        ]
+        for name, args, params in cases:
+            with self.subTest(name=name, params=params):
+                expected = await self.async_client.get(reverse(name, args=args), params)
+                response = await self.async_client.get(reverse(f'async-{name}', args=args), params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response['Content-Type'], 'application/json')
+
+    async def test_revalidation(self):
+        url = reverse('async-project-detail', args=[1])
+        response = await self.async_client.get(url)
+        cached = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        def rename():
+            with self.captureOnCommitCallbacks(execute=True):
+                Project.objects.filter(pk=1).update(project_name='Renamed')
+                record_change(Project, [1])
+        await sync_to_async(rename)()
+        self.assertEqual((await self.async_client.get(url, headers={'If-None-Match': response['ETag']})).status_code,
+                         200)
+
+    async def test_errors(self):
+        self.assertEqual((await self.async_client.get(reverse('async-task-detail', args=[999]))).status_code, 404)
+        self.assertEqual((await self.async_client.get(reverse('async-manager-summary', args=[9]))).status_code, 404)
+        response = await self.async_client.get(reverse('async-task-list'), {'priority': 'someday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {'error': 'Invalid priority: someday'})
+        self.assertEqual((await self.async_client.post(reverse('async-task-list'))).status_code, 405)
+
+
+@override_settings(PML_DATABASE_REPLICAS=['replica'], PML_READ_YOUR_WRITES_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(self.record_alias)
+        self.seen = []
+
+    def record_alias(self, request):
+        # The replica the middleware picked; the router sends it to the primary while it is a test mirror
+        self.seen.append((read_alias_var.get() or 'default', router.db_for_write(Task)))
+        return HttpResponse()
+
+    def send(self, method, token=None, address='10.0.0.1', cookies=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        request = self.factory.generic(method, '/api/tasks/', REMOTE_ADDR=address, headers=headers)
+        request.COOKIES.update(cookies or {})
+        self.response = self.middleware(request)
+        return self.seen[-1]
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.send('GET'), ('replica', 'default'))
+        self.assertEqual(self.send('POST'), ('default', 'default'))
+        # Outside a request everything uses the primary
+        self.assertEqual(router.db_for_read(Task), 'default')
+
+    def test_writer_reads_from_primary_for_a_while(self):
+        self.send('PUT', token='a', address='10.0.0.1')
+        self.assertEqual(self.send('GET', token='a', address='10.0.0.2')[0], 'default')
+        # Other clients behind the same address are not pinned
+        self.assertEqual(self.send('GET', address='10.0.0.1')[0], 'replica')
+        self.assertEqual(self.send('GET', token='b', address='10.0.0.1')[0], 'replica')
+        cache.clear()
+        self.assertEqual(self.send('GET', token='a', address='10.0.0.1')[0], 'replica')
+
+    def test_writer_without_credentials_is_pinned_by_cookie(self):
+        self.send('POST')
+        cookie = self.response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertEqual(self.send('GET', cookies={PIN_COOKIE: cookie.value})[0], 'default')
+        self.assertEqual(self.send('GET')[0], 'replica')
+
+    def test_cached_lookups_read_from_primary(self):
+        token = read_alias_var.set('replica')
+        try:
+            with read_from_primary():
+                self.assertIsNone(read_alias_var.get())
+                self.assertEqual(router.db_for_read(Manager), 'default')
+            self.assertEqual(read_alias_var.get(), 'replica')
+        finally:
+            read_alias_var.reset(token)
+
+    @override_settings(PML_DATABASE_REPLICAS=[])
+    def test_no_validators_while_replica_may_lag(self):
+        Project.objects.create(project_id=1, project_name='Launch')
+        # The primary stands in for a replica that has caught up
+        with mock.patch('pml_app.versions.reading_replica', return_value=True):
+            response = self.client.get(reverse('project-detail', args=[1]))
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('ETag', response)
+            with override_settings(PML_READ_YOUR_WRITES_SECONDS=0):
+                self.assertIn('ETag', self.client.get(reverse('project-detail', args=[1])))
+        self.assertIn('ETag', self.client.get(reverse('project-detail', args=[1])))
+
+    @override_settings(PML_DATABASE_REPLICAS=[])
+    def test_disabled_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(self.record_alias)
+
+
+class DetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches[settings.PML_DETAIL_CACHE].clear()
+        self.client = APIClient()
+        self.manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        Project.objects.create(project_id=1, project_name='Launch', manager=self.manager)
+        detail_stats.reset()
+
+    def get_project(self, **params):
+        response = self.client.get(reverse('project-detail', args=[1]), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeat_reads_skip_the_database(self):
+        first = self.get_project()
+        with CaptureQueriesContext(connection) as queries:
+            second = self.get_project()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(detail_stats.snapshot()['projects'], {'hits': 1, 'misses': 1, 'invalidations': 0,
+                                                              'hit_rate': 0.5})
+
+    def test_query_strings_are_cached_separately(self):
+        self.get_project(fields='project_id,project_name')
+        self.assertEqual(self.get_project().data['manager']['name'], 'Alice')
+        self.assertEqual(list(self.get_project(fields='project_id,project_name').data),
+                         ['project_id', 'project_name'])
+
+    def test_writes_invalidate(self):
+        self.get_project()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('project-update', args=[1]), {'project_name': 'Renamed'},
+                                         format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(caches[settings.PML_DETAIL_CACHE].get(detail_key(Project, 1)))
+        self.assertEqual(self.get_project().data['project_name'], 'Renamed')
+        # The nested manager is another row; its stamp makes the entry stale
+        self.manager.name = 'Alicia'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.save()
+        self.assertEqual(self.get_project().data['manager']['name'], 'Alicia')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('project-delete', args=[1]))
+        self.assertEqual(self.client.get(reverse('project-detail', args=[1])).status_code, 404)
+
+    def test_reads_before_commit_are_not_served_after_it(self):
+        self.get_project()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.patch(reverse('project-update', args=[1]), {'project_name': 'Renamed'}, format='json')
+            # A read that lands between the write and its commit refills the entry
+            self.get_project()
+        self.assertIsNotNone(caches[settings.PML_DETAIL_CACHE].get(detail_key(Project, 1)))
+        for callback in callbacks:
+            callback()
+        detail_stats.reset()
+        self.get_project()
+        self.assertEqual(detail_stats.snapshot()['projects']['hits'], 0)
+
+    def test_other_detail_endpoints(self):
+        help_request = Help.objects.create(help_id=1, name='N', email='e@example.com', number='1', subject='Hi')
+        for name, pk in (('manager-detail', 1), ('help-detail', help_request.pk)):
+            self.client.get(reverse(name, args=[pk]))
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(name, args=[pk])).status_code, 200)
+            self.assertEqual(len(queries), 0, name)
+        report = self.client.get(reverse('detail-cache-stats')).data
+        self.assertEqual(report['tables']['help']['hit_rate'], 0.5)
+
+    @override_settings(PML_DETAIL_CACHE=None)
+    def test_can_be_disabled(self):
+        self.get_project()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_project()
+        self.assertGreater(len(queries), 0)
+
+
+@override_settings(PML_COMPRESSION_MIN_BYTES=1024)
+class WireFormatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        Task.objects.bulk_create(Task(task_name=f'Task {i}', manager=manager, team_member_id=10)
+                                 for i in range(50))
+
+    def test_gzip_above_threshold(self):
+        response = self.client.get(reverse('task-list'), {'expand': 'manager'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 50)
+        # Compression weakens the ETag, which still revalidates
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        cached = self.client.get(reverse('task-list'), {'expand': 'manager'}, HTTP_ACCEPT_ENCODING='gzip',
+                                 HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_small_and_unsafe_responses_are_not_compressed(self):
+        response = self.client.get(reverse('task-detail', args=[Task.objects.first().pk]),
+                                   HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.post(reverse('manager-login'), {'manager_id': 1, 'password': 'secret'},
+                                    format='json', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        response = self.client.get(reverse('task-list'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(brotli.decompress(response.content))), 50)
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_messagepack(self):
+        json_response = self.client.get(reverse('task-list'), {'expand': 'manager'})
+        response = self.client.get(reverse('task-list'), {'expand': 'manager'}, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(json_response.content))
+        self.assertNotEqual(response['ETag'], json_response['ETag'])
+
+        response = self.client.post(reverse('task-create'), msgpack.packb({'task_name': 'Packed', 'manager': 1}),
+                                    content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Task.objects.filter(task_name='Packed').exists())
+        response = self.client.post(reverse('task-create'), b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.project = Project.objects.create(project_id=1, project_name='Launch')
+        self.other = Project.objects.create(project_id=2, project_name='Other')
+        self.member = TeamMember.objects.create(team_member_id=1, team_member_name='Alice', password='x')
+        self.assignment = ProjectTeamMember.objects.create(project=self.project, team_member=self.member)
+        self.task = Task.objects.create(task_name='Write docs', project=self.project)
+        self.untouched = Task.objects.create(task_name='Untouched', project=self.other)
+        # Everything above was last written an hour ago
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        for model in SYNC_MODELS:
+            model.objects.update(updated_at=an_hour_ago)
+        self.token = encode_token(timezone.now() - timedelta(minutes=1))
+
+    def sync(self, **params):
+        response = self.client.get(reverse('sync'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_full_snapshot_without_token(self):
+        data = self.sync()
+        self.assertEqual([row['task_id'] for row in data['changed']['tasks']], [self.task.pk, self.untouched.pk])
+        self.assertEqual(len(data['changed']['project_team_members']), 1)
+        self.assertEqual(data['deleted'], {})
+        # Rows match the list endpoints without ?expand=
+        self.assertEqual(data['changed']['projects'], self.client.get(reverse('project-list')).data)
+
+    def test_team_members_sent_without_passwords(self):
+        member = self.sync(tables='team_members')['changed']['team_members'][0]
+        self.assertEqual(member['team_member_name'], 'Alice')
+        self.assertIn('updated_at', member)
+        self.assertNotIn('password', member)
+
+    def test_changes_since_token(self):
+        self.client.put(reverse('task-update', args=[self.task.pk]),
+                        {'task_name': 'Write docs', 'project_id': 1, 'status': 'completed'}, format='json')
+        self.client.delete(reverse('project-team-member-delete', args=[self.assignment.pk]))
+
+        data = self.sync(since=self.token)
+        self.assertEqual([row['task_id'] for row in data['changed']['tasks']], [self.task.pk])
+        # The counter update made by progress.py marks the project as changed
+        self.assertEqual([(row['project_id'], row['progress']) for row in data['changed']['projects']], [(1, 100)])
+        self.assertEqual(data['changed']['team_members'], [])
+        self.assertEqual(data['deleted'], {'project_team_members': [self.assignment.pk]})
+
+        # Nothing changed since: only rows inside the overlap window come back again
+        again = self.sync(since=data['token'])
+        self.assertEqual([row['task_id'] for row in again['changed']['tasks']], [self.task.pk])
+
+    def test_deleting_project_unlinks_tasks_and_leaves_tombstones(self):
+        self.client.delete(reverse('project-delete', args=[self.project.pk]))
+        data = self.sync(since=self.token, tables='tasks,projects,project_team_members')
+        self.assertEqual(set(data['changed']), {'tasks', 'projects', 'project_team_members'})
+        self.assertEqual([(row['task_id'], row['project_id']) for row in data['changed']['tasks']],
+                         [(self.task.pk, None)])
+        self.assertEqual(data['deleted'], {'projects': [1], 'project_team_members': [self.assignment.pk]})
+
+    def test_recreated_row_is_not_reported_deleted(self):
+        self.other.delete()
+        Project.objects.create(project_id=2, project_name='Other again')
+        data = self.sync(since=self.token, tables='projects')
+        self.assertEqual([row['project_id'] for row in data['changed']['projects']], [2])
+        self.assertEqual(data['deleted'], {})
+
+    def test_invalid_requests(self):
+        response = self.client.get(reverse('sync'), {'since': 'not a token'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('sync'), {'tables': 'tasks,passwords'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Unknown tables: passwords'})
+        expired = encode_token(timezone.now() - timedelta(days=settings.PML_SYNC_TOMBSTONE_DAYS + 1))
+        response = self.client.get(reverse('sync'), {'since': expired})
+        self.assertEqual(response.status_code, 410)
+        self.assertIn('error', response.data)
+
+    def test_prune_tombstones(self):
+        self.other.delete()
+        Tombstone.objects.create(table='projects', object_id=99,
+                                 deleted_at=timezone.now() - timedelta(days=settings.PML_SYNC_TOMBSTONE_DAYS + 1))
+        self.assertEqual(prune_tombstones(), 1)
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [2])
+
+    def test_projection_matches_serializer_for_datetimes(self):
+        queryset = Task.objects.order_by('pk')
+        projection = get_projection(TaskSerializer, expand=set())
+        self.assertIsNotNone(projection)
+        self.assertEqual(projection.rows(queryset), TaskSerializer(queryset, many=True, expand=set()).data)
+
+
+class RecordingBroker:
+    """Collects published events, for asserting on what writes publish"""
+    events = []
+
+    def publish(self, channels, event_type, data):
+        self.events.append((event_type, set(channels), data))
+
+
+@override_settings(PML_EVENT_BROKER='pml_app.tests.RecordingBroker')
+class ChangeEventPublishingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        manager = Manager.objects.create(manager_id=1, name='Alice', password='secret')
+        TeamMember.objects.create(team_member_id=10, team_member_name='Tom', password='secret')
+        TeamMember.objects.create(team_member_id=11, team_member_name='Ann', password='secret')
+        self.project = Project.objects.create(project_id=1, project_name='Launch', manager=manager)
+        ProjectTeamMember.objects.create(project=self.project, team_member_id=11)
+        self.task = Task.objects.create(task_name='Write docs', manager=manager, team_member_id=10, project=self.project)
+        RecordingBroker.events.clear()
+
+    def published(self):
+        return {event_type: (channels, data) for event_type, channels, data in RecordingBroker.events}
+
+    def test_task_update_publishes_task_and_progress(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('task-update', args=[self.task.pk]),
+                            {'task_name': 'Write docs', 'project_id': 1, 'team_member_id': 10,
+                             'status': 'completed'}, format='json')
+        events = self.published()
+        self.assertEqual(set(events), {'task.updated', 'project.updated'})
+        channels, data = events['task.updated']
+        self.assertEqual(channels, {'manager:1', 'team_member:10'})
+        self.assertEqual((data['task_id'], data['status']), (self.task.pk, 'completed'))
+        channels, data = events['project.updated']
+        self.assertEqual(channels, {'manager:1', 'team_member:11'})
+        self.assertEqual(data['progress'], 100)
+
+    def test_reassignment_reaches_previous_assignee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('task-update', args=[self.task.pk]),
+                            {'task_name': 'Write docs', 'project_id': 1, 'team_member_id': 11}, format='json')
+        channels = [channels for event_type, channels, _ in RecordingBroker.events if event_type == 'task.updated']
+        self.assertEqual(set().union(*channels), {'manager:1', 'team_member:10', 'team_member:11'})
+        self.assertTrue(all(data['team_member_id'] == 11 for _, _, data in RecordingBroker.events))
+
+    def test_bulk_create_publishes_tasks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('task-bulk-create'), [
+                {'task_name': 'A', 'manager_id': 1, 'team_member_id': 10},
+                {'task_name': 'B', 'team_member_id': 11},
+            ], format='json')
+        self.assertEqual(response.status_code, 201)
+        published = [(channels, data['task_name']) for event_type, channels, data in RecordingBroker.events
+                     if event_type == 'task.updated']
+        self.assertEqual(published, [({'manager:1', 'team_member:10'}, 'A'), ({'team_member:11'}, 'B')])
+
+    def test_nothing_published_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.patch(reverse('project-update', args=[1]), {'description': 'Soon'}, format='json')
+        self.assertEqual(RecordingBroker.events, [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.published()['project.updated'][1]['description'], 'Soon')
+
+    def test_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('project-delete', args=[1]))
+        self.assertEqual(self.published()['project.deleted'],
+                         ({'manager:1', 'team_member:11'}, {'project_id': 1}))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('task-delete', args=[self.task.pk]))
+        self.assertEqual(self.published()['task.deleted'],
+                         ({'manager:1', 'team_member:10'}, {'task_id': self.task.pk}))
+
+
+class ChangeFeedStreamTests(TestCase):
+    async def test_server_sent_events(self):
+        response = await self.async_client.get(reverse('event-stream'), {'manager_id': 1})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        try:
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            get_broker().publish({'manager:2'}, 'task.updated', {'task_id': 4})
+            event = get_broker().publish({'manager:1', 'team_member:10'}, 'task.updated', {'task_id': 5})
+            chunk = await asyncio.wait_for(anext(stream), 5)
+            self.assertEqual(chunk, f'id: {event.id}\nevent: task.updated\ndata: {{"task_id":5}}\n\n'.encode())
+        finally:
+            await stream.aclose()
+
+    async def test_replay_after_last_event_id(self):
+        broker = get_broker()
+        seen = broker.publish({'manager:1'}, 'task.updated', {'task_id': 1})
+        broker.publish({'manager:2'}, 'task.updated', {'task_id': 2})
+        missed = broker.publish({'manager:1'}, 'task.deleted', {'task_id': 3})
+        subscription = await broker.subscribe({'manager:1'}, seen.id)
+        try:
+            self.assertEqual(await subscription.next_event(1), missed)
+            self.assertIsNone(await subscription.next_event(0.01))
+        finally:
+            subscription.close()
+
+        subscription = await broker.subscribe({'manager:1'}, 'from-another-process-7')
+        try:
+            self.assertEqual((await subscription.next_event(1)).type, 'resync')
+        finally:
+            subscription.close()
+
+    async def test_errors(self):
+        response = await self.async_client.get(reverse('event-stream'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {'error': 'manager_id or team_member_id is required'})
+        response = await self.async_client.get(reverse('event-stream'), {'team_member_id': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_wsgi_is_refused(self):
+        response = self.client.get(reverse('event-stream'), {'manager_id': 1})
+        self.assertEqual(response.status_code, 501)
+
+    async def test_websocket(self):
+        incoming, outgoing = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/api/events/ws/', 'query_string': b'team_member_id=10'}
+        connection = asyncio.ensure_future(events_websocket(scope, incoming.get, outgoing.put))
+        await incoming.put({'type': 'websocket.connect'})
+        self.assertEqual(await asyncio.wait_for(outgoing.get(), 5), {'type': 'websocket.accept'})
+
+        event = get_broker().publish({'team_member:10'}, 'project.updated', {'project_id': 1, 'progress': 50})
+        message = await asyncio.wait_for(outgoing.get(), 5)
+        self.assertEqual(json.loads(message['text']),
+                         {'id': event.id, 'type': 'project.updated', 'data': {'project_id': 1, 'progress': 50}})
+        await incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(connection, 5)
+
+        scope['query_string'] = b''
+        connection = asyncio.ensure_future(events_websocket(scope, incoming.get, outgoing.put))
+        await incoming.put({'type': 'websocket.connect'})
+        self.assertEqual((await asyncio.wait_for(outgoing.get(), 5))['code'], 4400)
+        await connection
+
+    @override_settings(PML_EVENT_BROKER='pml_app.events.CacheBroker', PML_EVENT_POLL_SECONDS=0.01)
+    async def test_cache_broker(self):
+        await cache.aclear()
+        broker = get_broker()
+        subscription = await broker.subscribe({'manager:1'})
+        broker.publish({'manager:2'}, 'task.updated', {'task_id': 1})
+        event = broker.publish({'manager:1'}, 'task.updated', {'task_id': 2})
+        self.assertEqual(await subscription.next_event(1), event)
+        self.assertIsNone(await subscription.next_event(0.05))
+
+        # Replay from an event ID, and resync once the events are gone
+        replay = await broker.subscribe({'manager:1'}, '0')
+        self.assertEqual(await replay.next_event(1), event)
+        await cache.adelete(broker.event_key(1))
+        replay = await broker.subscribe({'manager:1'}, '0')
+        self.assertEqual((await replay.next_event(1)).type, 'resync')
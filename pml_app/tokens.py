@@ -0,0 +1,133 @@
+"""Signed session tokens for admins, managers and team members.
+
+A token is a signed, timestamped payload naming the role and primary key,
+so verifying it needs no database access. The principal record behind a
+token is kept in a per-process LRU cache that the model signals clear when
+the row is updated or deleted.
+"""
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core import signing
+from rest_framework import authentication, exceptions
+from .models import Admin, Manager, TeamMember
+from .routers import read_from_primary
+
+TOKEN_SALT = 'pml_app.tokens'
+
+ROLE_MODELS = {
+    'admin': Admin,
+    'manager': Manager,
+    'team_member': TeamMember,
+}
+
+# Fields exposed for each role; passwords never enter the cache
+PRINCIPAL_FIELDS = {
+    'admin': ('admin_id', 'name'),
+    'manager': ('manager_id', 'name'),
+    'team_member': ('team_member_id', 'team_member_name', 'position'),
+}
+
+
+def issue_token(role, pk):
+    return signing.dumps({'role': role, 'id': pk}, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token):
+    """Return (role, pk) for a valid token, raising signing.BadSignature otherwise"""
+    payload = signing.loads(token, salt=TOKEN_SALT,
+                            max_age=getattr(settings, 'PML_TOKEN_MAX_AGE', 60 * 60 * 12))
+    if payload.get('role') not in ROLE_MODELS:
+        raise signing.BadSignature('Unknown role')
+    return payload['role'], payload['id']
+
+
+class PrincipalCache:
+    """Thread-safe LRU of principal records keyed by (role, pk)"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            record = self._data.get(key)
+            if record is not None:
+                self._data.move_to_end(key)
+            return record
+
+    def set(self, key, record):
+        with self._lock:
+            self._data[key] = record
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+principal_cache = PrincipalCache(getattr(settings, 'PML_PRINCIPAL_CACHE_SIZE', 1024))
+
+
+def get_principal(role, pk):
+    """Return the cached principal record, or None if the row no longer exists"""
+    record = principal_cache.get((role, pk))
+    if record is None:
+        # A replica could still hold a deleted or renamed account
+        with read_from_primary():
+            record = (ROLE_MODELS[role].objects.filter(pk=pk)
+                      .values(*PRINCIPAL_FIELDS[role]).first())
+        if record is None:
+            return None
+        record['role'] = role
+        principal_cache.set((role, pk), record)
+    return record
+
+
+def invalidate_principal(model, pk):
+    for role, role_model in ROLE_MODELS.items():
+        if role_model is model:
+            principal_cache.discard((role, pk))
+
+
+class Principal:
+    """The authenticated admin, manager or team member behind a token"""
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, record):
+        self.record = record
+        self.role = record['role']
+        self.pk = record[PRINCIPAL_FIELDS[self.role][0]]
+
+
+class TokenSessionAuthentication(authentication.BaseAuthentication):
+    """Authenticate `Authorization: Bearer <token>` headers issued at login"""
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header')
+        
+        try:
+            role, pk = read_token(header[1].decode())
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed('Invalid or expired token')
+        
+        record = get_principal(role, pk)
+        if record is None:
+            raise exceptions.AuthenticationFailed('Account no longer exists')
+        return Principal(record), header[1].decode()
+
+    def authenticate_header(self, request):
+        return self.keyword
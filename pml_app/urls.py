@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from pml_app import views
 from pml_app import api_views
+from pml_app import async_views
 from pml_app import auth_views
 
 urlpatterns = [
@@ -25,6 +26,7 @@ urlpatterns = [
     
     # Help endpoints (replacing support requests)
     path('api/help/', views.help_list, name="help-list"),
+    path('api/help/search/', views.help_search, name="help-search"),
     path('api/help/<int:pk>/', views.help_detail, name="help-detail"),
     path('api/help/create/', views.help_create, name="help-create"),
     path('api/help/update/<int:pk>/', views.help_update, name="help-update"),
@@ -33,6 +35,8 @@ urlpatterns = [
     # Admin endpoints
     path('api/admins/', api_views.admin_list, name="admin-list"),
     path('api/admins/<int:pk>/', api_views.admin_detail, name="admin-detail"),
+    path('api/admin/stats/', api_views.admin_stats, name="admin-stats"),
+    path('api/admin/detail-cache/', api_views.detail_cache_report, name="detail-cache-stats"),
     path('api/admins/create/', api_views.admin_create, name="admin-create"),
     path('api/admins/update/<int:pk>/', api_views.admin_update, name="admin-update"),
     path('api/admins/delete/<int:pk>/', api_views.admin_delete, name="admin-delete"),
@@ -40,6 +44,7 @@ urlpatterns = [
     # Manager endpoints
     path('api/managers/', api_views.manager_list, name="manager-list"),
     path('api/managers/<int:pk>/', api_views.manager_detail, name="manager-detail"),
+    path('api/managers/<int:pk>/summary/', api_views.manager_summary, name="manager-summary"),
     path('api/managers/create/', api_views.manager_create, name="manager-create"),
     path('api/managers/update/<int:pk>/', api_views.manager_update, name="manager-update"),
     path('api/managers/delete/<int:pk>/', api_views.manager_delete, name="manager-delete"),
@@ -62,6 +67,7 @@ urlpatterns = [
     path('api/tasks/', api_views.task_list, name="task-list"),
     path('api/tasks/<int:pk>/', api_views.task_detail, name="task-detail"),
     path('api/tasks/create/', api_views.task_create, name="task-create"),
+    path('api/tasks/bulk-create/', api_views.task_bulk_create, name="task-bulk-create"),
     path('api/tasks/update/<int:pk>/', api_views.task_update, name="task-update"),
     path('api/tasks/delete/<int:pk>/', api_views.task_delete, name="task-delete"),
     
@@ -72,8 +78,26 @@ urlpatterns = [
     path('api/project-team-members/bulk-create/', api_views.project_team_member_bulk_create, name="project-team-member-bulk-create"),
     path('api/project-team-members/delete/<int:pk>/', api_views.project_team_member_delete, name="project-team-member-delete"),
     
+    # Delta sync for dashboards
+    path('api/sync/', api_views.sync, name="sync"),
+    
+    # Async read endpoints, for ASGI deployments
+    path('api/async/managers/', async_views.manager_list, name="async-manager-list"),
+    path('api/async/managers/<int:pk>/', async_views.manager_detail, name="async-manager-detail"),
+    path('api/async/managers/<int:pk>/summary/', async_views.manager_summary, name="async-manager-summary"),
+    path('api/async/team-members/', async_views.team_member_list, name="async-team-member-list"),
+    path('api/async/team-members/<int:pk>/', async_views.team_member_detail, name="async-team-member-detail"),
+    path('api/async/projects/', async_views.project_list, name="async-project-list"),
+    path('api/async/projects/<int:pk>/', async_views.project_detail, name="async-project-detail"),
+    path('api/async/tasks/', async_views.task_list, name="async-task-list"),
+    path('api/async/tasks/<int:pk>/', async_views.task_detail, name="async-task-detail"),
+    
+    # Change feed; the WebSocket variant at api/events/ws/ is served by pml.asgi
+    path('api/events/', async_views.event_stream, name="event-stream"),
+    
     # Authentication endpoints
     path('api/admin/login/', auth_views.admin_login, name="admin-login"),
     path('api/manager/login/', auth_views.manager_login, name="manager-login"),
     path('api/team-member/login/', auth_views.team_member_login, name="team-member-login"),
+    path('api/session/', auth_views.current_session, name="current-session"),
 ]
@@ -0,0 +1,152 @@
+"""Table and row version stamps backing ETag / Last-Modified on GET endpoints.
+
+Every write bumps the stamp of its table and of the written row when it
+commits (see signals.py). A conditional GET only reads those stamps from the cache, so a
+matching If-None-Match or If-Modified-Since is answered with 304 without
+running the view's queryset or serializer.
+
+Responses read from a replica get no validators until the newest write
+they depend on is older than PML_READ_YOUR_WRITES_SECONDS: the replica may
+not have applied it yet, and a stale body must not be cached under the
+new stamps.
+"""
+import hashlib
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .routers import reading_replica
+
+VERSION_KEY_PREFIX = 'pml:version'
+# Stamps outlive any realistic polling interval; a missing stamp just restarts at "now"
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def table_key(model):
+    return f'{VERSION_KEY_PREFIX}:{model._meta.db_table}'
+
+
+def row_key(model, pk):
+    return f'{VERSION_KEY_PREFIX}:{model._meta.db_table}:{pk}'
+
+
+def bump_versions(model, pks=()):
+    """Mark the table, and the given rows of it, as changed now"""
+    stamp = time.time_ns()
+    keys = [table_key(model)] + [row_key(model, pk) for pk in pks]
+    cache.set_many({key: stamp for key in keys}, VERSION_TIMEOUT)
+
+
+def get_versions(keys):
+    """Return the stamps for `keys`, starting any that are unknown at the current time"""
+    stamps = cache.get_many(keys)
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            # add() keeps a stamp another worker stored in the meantime
+            cache.add(key, now, VERSION_TIMEOUT)
+        stamps.update(cache.get_many(missing))
+        stamps.update({key: now for key in missing if key not in stamps})
+    return [stamps[key] for key in keys]
+
+
+async def aget_versions(keys):
+    """get_versions() for async views"""
+    stamps = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            await cache.aadd(key, now, VERSION_TIMEOUT)
+        stamps.update(await cache.aget_many(missing))
+        stamps.update({key: now for key in missing if key not in stamps})
+    return [stamps[key] for key in keys]
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # Weak comparison, so ETags weakened by response compression still match
+        return (etag in (tag.removeprefix('W/') for tag in parse_etags(if_none_match))
+                or if_none_match.strip() == '*')
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def replica_may_lag(stamps):
+    """True when this request reads a replica that may not have applied the writes behind `stamps`"""
+    if not reading_replica():
+        return False
+    return time.time_ns() - max(stamps) < settings.PML_READ_YOUR_WRITES_SECONDS * 1_000_000_000
+
+
+def conditional_get(*models, row=None, daily=False):
+    """Add ETag/Last-Modified to a GET view and answer revalidations with 304.
+    
+    `models` are the tables the response is built from (including nested
+    ones); `row` is the model whose `pk` URL kwarg selects a single row.
+    `daily` is for responses that also depend on today's date.
+    Place it below @api_view. Async views are wrapped with an async wrapper
+    that reads the stamps through the cache's async API.
+    """
+    def version_keys(kwargs):
+        keys = [table_key(model) for model in models]
+        if row is not None:
+            keys.append(row_key(row, kwargs['pk']))
+        return keys
+    
+    def validators(request, stamps):
+        fingerprint = '|'.join([
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            timezone.localdate().isoformat() if daily else '',
+            *(str(stamp) for stamp in stamps),
+        ])
+        etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest())
+        return etag, max(stamps) // 1_000_000_000
+    
+    def add_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+    
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+                
+                stamps = await aget_versions(version_keys(kwargs))
+                etag, last_modified = validators(request, stamps)
+                if _not_modified(request, etag, last_modified):
+                    return add_validators(HttpResponseNotModified(), etag, last_modified)
+                response = await view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK or replica_may_lag(stamps):
+                    return response
+                return add_validators(response, etag, last_modified)
+            return async_wrapper
+        
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            
+            stamps = get_versions(version_keys(kwargs))
+            etag, last_modified = validators(request, stamps)
+            if _not_modified(request, etag, last_modified):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK or replica_may_lag(stamps):
+                    return response
+            return add_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -1,12 +1,28 @@
+import logging
+from datetime import datetime, time
 from django.shortcuts import render, HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.http import JsonResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.utils.urls import replace_query_param
 from .models import User, Admin, Manager, TeamMember, Project, Task, Help
 from .serializers import (UserSerializer, AdminSerializer, ManagerSerializer, 
                          TeamMemberSerializer, ProjectSerializer, TaskSerializer, 
                          HelpSerializer)
+from .ids import next_id
+from .versions import conditional_get
+from .detail_cache import cached_detail
+from .streaming import stream_json, wants_stream
+from .search import search_help
+from .pagination import HelpFeedPagination, iter_help_feed, wants_pagination
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
 
 def index(request):
     return render(request,'index.html')
@@ -49,6 +65,8 @@ def api_overview(request):
         'Admins': {
             'List': '/api/admins/',
             'Detail': '/api/admins/<id>/',
+            'Stats': '/api/admin/stats/',
+            'Detail Cache': '/api/admin/detail-cache/',
             'Create': '/api/admins/create/',
             'Update': '/api/admins/update/<id>/',
             'Delete': '/api/admins/delete/<id>/',
@@ -56,6 +74,7 @@ def api_overview(request):
         'Managers': {
             'List': '/api/managers/',
             'Detail': '/api/managers/<id>/',
+            'Summary': '/api/managers/<id>/summary/',
             'Create': '/api/managers/create/',
             'Update': '/api/managers/update/<id>/',
             'Delete': '/api/managers/delete/<id>/',
@@ -78,26 +97,50 @@ def api_overview(request):
             'List': '/api/tasks/',
             'Detail': '/api/tasks/<id>/',
             'Create': '/api/tasks/create/',
+            'Bulk Create': '/api/tasks/bulk-create/',
             'Update': '/api/tasks/update/<id>/',
             'Delete': '/api/tasks/delete/<id>/',
         },
         'Help': {
             'List': '/api/help/',
             'Detail': '/api/help/<id>/',
+            'Search': '/api/help/search/?q=<text>',
             'Create': '/api/help/create/',
             'Update': '/api/help/update/<id>/',
             'Delete': '/api/help/delete/<id>/',
-        }
+        },
+        'Sync': {
+            'Changes': '/api/sync/?since=<token>&tables=<table>,<table>',
+        },
+        'Async reads (ASGI)': {
+            'Managers': '/api/async/managers/',
+            'Manager Detail': '/api/async/managers/<id>/',
+            'Manager Summary': '/api/async/managers/<id>/summary/',
+            'TeamMembers': '/api/async/team-members/',
+            'TeamMember Detail': '/api/async/team-members/<id>/',
+            'Projects': '/api/async/projects/',
+            'Project Detail': '/api/async/projects/<id>/',
+            'Tasks': '/api/async/tasks/',
+            'Task Detail': '/api/async/tasks/<id>/',
+        },
+        'Change feed (ASGI)': {
+            'Server-Sent Events': '/api/events/?manager_id=<id>&team_member_id=<id>',
+            'WebSocket': '/api/events/ws/?manager_id=<id>&team_member_id=<id>',
+        },
     }
     return Response(api_urls)
 
 @api_view(['GET'])
+@conditional_get(User)
 def user_list(request):
     users = User.objects.all()
+    if wants_stream(request):
+        return stream_json(users, UserSerializer)
     serializer = UserSerializer(users, many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
+@conditional_get(User, row=User)
 def user_detail(request, pk):
     try:
         user = User.objects.get(pk=pk)
@@ -139,13 +182,78 @@ def user_delete(request, pk):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 # Help API endpoints
+def parse_created_bound(value):
+    """Accept a date (meaning midnight) or a datetime; naive values are in the current timezone"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+def filter_help(queryset, params):
+    """Apply created_after (inclusive) and created_before (exclusive), raising ValueError on bad input"""
+    for param, lookup in (('created_after', 'created_at__gte'), ('created_before', 'created_at__lt')):
+        value = params.get(param)
+        if value not in (None, ''):
+            try:
+                queryset = queryset.filter(**{lookup: parse_created_bound(value)})
+            except ValueError:
+                raise ValueError(f'{param} must be a date or datetime')
+    return queryset
+
 @api_view(['GET'])
+@conditional_get(Help)
 def help_list(request):
-    help_requests = Help.objects.all()
-    serializer = HelpSerializer(help_requests, many=True)
+    """List help requests newest first, optionally within created_after/created_before.
+    
+    Passing `page_size` or `cursor` switches to keyset pagination on
+    (created_at, help_id), and `stream=1` streams the full result set.
+    """
+    try:
+        help_requests = filter_help(Help.objects.all(), request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    paginator = HelpFeedPagination()
+    if wants_pagination(request, paginator):
+        page = paginator.paginate_queryset(help_requests, request)
+        return paginator.get_paginated_response(HelpSerializer(page, many=True).data)
+    
+    if wants_stream(request):
+        return stream_json(help_requests, HelpSerializer, chunker=iter_help_feed)
+    serializer = HelpSerializer(help_requests.order_by('-created_at', '-help_id'), many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
+@conditional_get(Help)
+def help_search(request):
+    """Ranked full-text search over subject, description, name and email, paged with ?page=&page_size="""
+    text = request.query_params.get('q', '').strip()
+    if not text:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = int(request.query_params.get('page', 1))
+        page_size = int(request.query_params.get('page_size', SEARCH_PAGE_SIZE))
+    except ValueError:
+        return Response({'error': 'page and page_size must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+    if page < 1 or page_size < 1:
+        return Response({'error': 'page and page_size must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+    page_size = min(page_size, MAX_SEARCH_PAGE_SIZE)
+    
+    count, results = search_help(text, limit=page_size, offset=(page - 1) * page_size)
+    url = request.build_absolute_uri()
+    return Response({
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page * page_size < count else None,
+        'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+        'results': HelpSerializer(results, many=True).data,
+    })
+
+@api_view(['GET'])
+@conditional_get(Help, row=Help)
+@cached_detail(Help)
 def help_detail(request, pk):
     try:
         help_request = Help.objects.get(pk=pk)
@@ -157,49 +265,34 @@ def help_detail(request, pk):
 
 @api_view(['POST'])
 def help_create(request):
-    # Print all request information for debugging
-    print("\n---- HELP CREATE REQUEST ----")
-    print(f"Request method: {request.method}")
-    print(f"Request headers: {request.headers}")
-    print(f"Request data: {request.data}")
-    # Don't access request.body here as it conflicts with request.data
-    print("------------------------------\n")
+    logger.debug('Help request received', extra={'content_type': request.content_type,
+                                                 'payload': request.data})
     
     # Get the next available help_id
-    last_help = Help.objects.all().order_by('-help_id').first()
-    next_id = 1 if not last_help else last_help.help_id + 1
+    help_id = next_id(Help)
     
     # Add help_id to request data
     data = request.data.copy()
-    data['help_id'] = next_id
-    
-    # Print debug info
-    print("Processed data:", data)
+    data['help_id'] = help_id
     
     try:
         # Create help object directly
         help_obj = Help(
-            help_id=next_id,
+            help_id=help_id,
             name=data.get('name', ''),
             email=data.get('email', ''),
             number=data.get('number', data.get('mobile', '')),  # Try both 'number' and 'mobile'
             subject=data.get('subject', ''),
             description=data.get('description', '')
         )
-        
-        print(f"Creating help object: help_id={help_obj.help_id}, name={help_obj.name}, email={help_obj.email}, number={help_obj.number}")
-        
-        # Try to save
-        help_obj.save()
-        print("Help object saved successfully!")
+        help_obj.save(force_insert=True)
+        logger.info('Help request %s saved', help_id, extra={'help_id': help_id})
         
         # Serialize for the response
         serializer = HelpSerializer(help_obj)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     except Exception as e:
-        print("Error saving help object:", str(e))
-        import traceback
-        traceback.print_exc()
+        logger.exception('Error saving help request %s', help_id, extra={'help_id': help_id})
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['PUT'])
@@ -0,0 +1,55 @@
+"""The change feed (see events.py) over WebSocket, at /api/events/ws/.
+
+Django's ASGI handler only speaks HTTP, so pml.asgi hands WebSocket
+connections to events_websocket directly. It takes the same query
+parameters as /api/events/ (plus last_event_id, since browsers cannot set
+headers on a WebSocket) and sends each event as a JSON text message,
+{"id", "type", "data"}. Messages from the client are ignored.
+"""
+import asyncio
+from django.conf import settings
+from django.http import QueryDict
+from .events import event_channels, get_broker, json_message
+
+EVENTS_PATH = '/api/events/ws/'
+
+# Close codes for rejected connections (4000-4999 are for applications)
+CLOSE_NOT_FOUND = 4404
+CLOSE_BAD_REQUEST = 4400
+
+
+async def events_websocket(scope, receive, send):
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if scope['path'] != EVENTS_PATH:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    params = QueryDict(scope.get('query_string', b'').decode('latin-1'))
+    try:
+        channels = event_channels(params)
+    except ValueError as e:
+        await send({'type': 'websocket.close', 'code': CLOSE_BAD_REQUEST, 'reason': str(e)})
+        return
+
+    subscription = await get_broker().subscribe(channels, params.get('last_event_id'))
+    await send({'type': 'websocket.accept'})
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while True:
+            next_event = asyncio.ensure_future(subscription.next_event(settings.PML_EVENT_HEARTBEAT_SECONDS))
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_event.cancel()
+                break
+            event = next_event.result()
+            if event is not None:
+                await send({'type': 'websocket.send', 'text': json_message(event)})
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'websocket.disconnect':
+        pass